@@ -0,0 +1,44 @@
+import os
+import time
+import argparse
+import pygame
+
+from game.asset_bundle import asset_bundle
+from game.tiled_level import TiledLevel, load_all_tile_data
+from game.level_bake import bake_level, write_baked_level, BAKE_DIRECTORY
+
+
+def main(level_path, cache_directory):
+    # works out the data the game would otherwise make when it loads a level and writes it to the bake cache, filed
+    # under a hash of the level and tile files. Baking a level that hasn't changed writes the same file again.
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    asset_bundle.load()
+
+    start_time = time.perf_counter()
+    tile_map = TiledLevel.load_tile_table("images/tiles/tile_map.png", 64, 64, False)
+    all_tile_data, default_tile = load_all_tile_data(tile_map)
+    baked_level = bake_level(level_path, all_tile_data)
+    baked_file_name = write_baked_level(baked_level, cache_directory)
+
+    blocked_cells = sum(baked_level.los_mask)
+    print("Baked " + level_path + " to " + baked_file_name + " in " +
+          str(round((time.perf_counter() - start_time) * 1000.0, 1)) + "ms (line of sight mask " +
+          str(baked_level.los_mask_size[0]) + "x" + str(baked_level.los_mask_size[1]) + ", " +
+          str(blocked_cells) + " cells blocked)")
+    pygame.quit()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Bakes the data the game works out from a Time Runs level, so it "
+                                                 "can be loaded instead of made at startup")
+    parser.add_argument("level", nargs="?", default="data/level.trl", help="binary level file to bake, .trl")
+    parser.add_argument("--cache-directory", default=BAKE_DIRECTORY,
+                        help="directory the baked data is written to, which the game looks in")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    main(arguments.level, arguments.cache_directory)
@@ -0,0 +1,201 @@
+import os
+import json
+import math
+import random
+import argparse
+import pygame
+
+from time_runs import ScreenData
+from game.world import World
+from game.player import Scheme
+from game.standard_monster import StandardMonster
+from game.bullet import Bullet
+from game.missile import Missile
+from game.explosion import Explosion, explosion_frame_cache
+from game.damage import DamageType
+from game.frame_timer import FrameTimer
+from game.asset_cache import asset_cache
+from game.asset_bundle import asset_bundle
+
+
+class Scenario:
+    def __init__(self, name, level_tile_size=None, monsters_per_type=5, projectiles=0, explosions=0):
+        self.name = name
+        if level_tile_size is None:
+            level_tile_size = [32, 64]
+        self.level_tile_size = level_tile_size
+        self.monsters_per_type = monsters_per_type
+        self.projectiles = projectiles
+        self.explosions = explosions
+
+
+def create_scenarios():
+    # sweep one thing at a time away from a small base world so each sweep gives one scaling curve
+    scenarios = [Scenario("base")]
+    for monsters_per_type in [0, 10, 25, 50]:
+        scenarios.append(Scenario("monsters_" + str(monsters_per_type), monsters_per_type=monsters_per_type))
+    for projectiles in [50, 200, 800]:
+        scenarios.append(Scenario("projectiles_" + str(projectiles), projectiles=projectiles))
+    for projectiles in [200, 800]:
+        # projectiles among a crowd of guards, where each hit test has the most to look through
+        scenarios.append(Scenario("crowd_projectiles_" + str(projectiles), monsters_per_type=50,
+                                  projectiles=projectiles))
+    for explosions in [5, 20, 50]:
+        scenarios.append(Scenario("explosions_" + str(explosions), explosions=explosions))
+    for level_tile_size in [[64, 128], [128, 256], [256, 512]]:
+        scenarios.append(Scenario("level_" + str(level_tile_size[0]) + "x" + str(level_tile_size[1]),
+                                  level_tile_size=level_tile_size))
+    return scenarios
+
+
+def build_level(tiled_level):
+    # a floor with a pillar every few tiles, so there are collidable tiles on screen wherever the camera is
+    for tile_x in range(0, tiled_level.level_tile_size[0]):
+        for tile_y in range(0, tiled_level.level_tile_size[1]):
+            tile_id = "tile_floor_1"
+            if tile_x % 6 == 3 and tile_y % 6 == 3:
+                tile_id = "tile_pillar_1"
+            tiled_level.place_tile(tile_id, [(tile_x * 64) + 32, (tile_y * 64) + 32], 0, 0)
+
+
+def get_random_position_near(tiled_level, centre, x_range, y_range):
+    while True:
+        x_pos = min(max(32, centre[0] + random.uniform(-x_range, x_range)), tiled_level.level_pixel_size[0] - 32)
+        y_pos = min(max(32, centre[1] + random.uniform(-y_range, y_range)), tiled_level.level_pixel_size[1] - 32)
+        if tiled_level.is_walkable(int(x_pos / 64), int(y_pos / 64)):
+            return [x_pos, y_pos]
+
+
+def top_up_projectiles(world, target_count, explosions_sprite_sheet):
+    while len(world.projectiles) < target_count:
+        start_pos = get_random_position_near(world.tiled_level, world.player.position, 480, 240)
+        heading_angle = random.uniform(0.0, 2.0 * math.pi)
+        heading = [math.cos(heading_angle), math.sin(heading_angle)]
+        is_ai_projectile = len(world.projectiles) % 2 == 0
+        if len(world.projectiles) % 8 == 0:
+            world.projectiles.append(Missile(start_pos, heading, 100, explosions_sprite_sheet, is_ai_projectile))
+        else:
+            world.projectiles.append(Bullet(start_pos, heading, 15, explosions_sprite_sheet, is_ai_projectile))
+
+
+def top_up_explosions(world, target_count, explosions_sprite_sheet):
+    while len(world.explosions) < target_count:
+        start_pos = get_random_position_near(world.tiled_level, world.player.position, 480, 240)
+        world.explosions.append(Explosion(start_pos, explosions_sprite_sheet, 96, 100, DamageType.MISSILE))
+
+
+def run_scenario(scenario, screen, background, screen_data, explosions_sprite_sheet, frames, warm_up_frames, seed,
+                 ai_worker):
+    random.seed(seed)
+    world = World(scenario.level_tile_size, screen_data, explosions_sprite_sheet)
+    build_level(world.tiled_level)
+    if ai_worker:
+        world.start_monster_ai_worker()
+    player = world.spawn_player(Scheme(), [])
+
+    # keep the player alive and time running at full speed however long the benchmark stands still
+    player.max_health = 1000000000
+    player.health = player.max_health
+    player.time_min_speed = player.time_max_speed
+
+    for type_id in ["rifle", "shotgun", "launcher"]:
+        for monster_index in range(0, scenario.monsters_per_type):
+            start_pos = get_random_position_near(world.tiled_level, player.position, 480, 240)
+            world.monsters.append(StandardMonster(type_id, start_pos, world.tiled_level.guards_sprite_map,
+                                                  world.all_monster_sprites, screen_data.play_area,
+                                                  world.tiled_level, explosions_sprite_sheet))
+
+    simulation_step = 1.0 / 60.0
+    frame_timer = FrameTimer(keep_frame_records=True)
+    for frame in range(0, warm_up_frames + frames):
+        if frame == warm_up_frames:
+            frame_timer = FrameTimer(keep_frame_records=True)
+
+        # keep the numbers of projectiles and explosions steady; this happens outside the timed part of the frame
+        top_up_projectiles(world, scenario.projectiles, explosions_sprite_sheet)
+        top_up_explosions(world, scenario.explosions, explosions_sprite_sheet)
+        pygame.event.get()
+
+        frame_timer.begin_frame()
+        world.update(simulation_step, (0, 0), frame_timer)
+        screen.blit(background, (0, 0))
+        frame_timer.lap("draw_background")
+        world.draw(screen, 1.0, frame_timer)
+        pygame.display.flip()
+        frame_timer.lap("flip")
+        frame_timer.end_frame()
+    world.close()
+
+    frame_times_ms = sorted([frame_time * 1000.0 for frame_phase_times, frame_time in frame_timer.frame_records])
+    phase_average_ms = {}
+    for phase_name in frame_timer.phase_names:
+        phase_average_ms[phase_name] = round(frame_timer.get_average_ms(phase_name), 4)
+
+    return {"name": scenario.name,
+            "level_tile_size": scenario.level_tile_size,
+            "monsters_per_type": scenario.monsters_per_type,
+            "projectiles": scenario.projectiles,
+            "explosions": scenario.explosions,
+            "frames": frames,
+            "mean_ms": round(frame_timer.get_average_frame_ms(), 4),
+            "p50_ms": round(get_percentile(frame_times_ms, 0.50), 4),
+            "p95_ms": round(get_percentile(frame_times_ms, 0.95), 4),
+            "p99_ms": round(get_percentile(frame_times_ms, 0.99), 4),
+            "phase_mean_ms": phase_average_ms}
+
+
+def get_percentile(sorted_values, fraction):
+    # nearest rank percentile
+    if len(sorted_values) == 0:
+        return 0.0
+    rank = int(math.ceil(fraction * len(sorted_values)))
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank - 1))]
+
+
+def main(frames, warm_up_frames, seed, output_path, scenario_names, ai_worker):
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    pygame.init()
+    screen_data = ScreenData([1024, 112], [1024, 184], [1024, 600])
+    screen = pygame.display.set_mode(screen_data.screen_size)
+    background = pygame.Surface(screen.get_size()).convert(screen)
+    background.fill((95, 140, 95))
+    asset_bundle.load()  # rebuilds the bundle first if any of the asset files have changed
+    asset_cache.load_atlas()
+    explosions_sprite_sheet = asset_cache.get_image("images/explosions.png")
+    explosion_frame_cache.prewarm(explosions_sprite_sheet, 96)  # the size of a missile explosion
+
+    results = []
+    for scenario in create_scenarios():
+        if scenario_names is not None and scenario.name not in scenario_names:
+            continue
+        result = run_scenario(scenario, screen, background, screen_data, explosions_sprite_sheet,
+                              frames, warm_up_frames, seed, ai_worker)
+        print("{:<20} p50 {:>8.3f} ms  p95 {:>8.3f} ms  p99 {:>8.3f} ms".format(result["name"], result["p50_ms"],
+                                                                              result["p95_ms"], result["p99_ms"]))
+        results.append(result)
+
+    pygame.quit()
+
+    with open(output_path, "w") as output_file:
+        json.dump({"frames": frames, "seed": seed, "ai_worker": ai_worker, "scenarios": results}, output_file,
+                  indent=2)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Time Runs game loop benchmarks")
+    parser.add_argument("--frames", type=int, default=300, help="frames to time in each scenario")
+    parser.add_argument("--warm-up-frames", type=int, default=30,
+                        help="frames to run before timing starts in each scenario")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the random number generator")
+    parser.add_argument("--output", default="benchmark_results.json", help="json file to write the results to")
+    parser.add_argument("--scenario", action="append", default=None,
+                        help="only run the named scenario, can be given more than once")
+    parser.add_argument("--ai-worker", action="store_true",
+                        help="make the guards' AI decisions on a second process")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    main(arguments.frames, arguments.warm_up_frames, arguments.seed, arguments.output, arguments.scenario,
+         arguments.ai_worker)
@@ -0,0 +1,106 @@
+import os
+import csv
+import argparse
+import pygame
+
+from game.asset_bundle import get_signature, ATLAS_MANIFEST
+
+# the images packed into each atlas page. Opaque images are the ones the game converts without per-pixel alpha.
+ALPHA_IMAGES = ["images/bullet.png",
+                "images/missile.png",
+                "images/player.png",
+                "images/guards.png",
+                "images/explosions.png",
+                "images/remove_guard_icon.png",
+                "images/pick_ups/health.png",
+                "images/pick_ups/launcher_ammo.png",
+                "images/pick_ups/shotgun_ammo.png",
+                "images/pick_ups/time_crystal.png"]
+
+OPAQUE_IMAGES = ["images/tiles/tile_map.png",
+                 "images/hud_icons/rifle_icon_selected.png",
+                 "images/hud_icons/rifle_icon_unselected.png",
+                 "images/hud_icons/shotgun_icon_selected.png",
+                 "images/hud_icons/shotgun_icon_unselected.png",
+                 "images/hud_icons/launcher_icon_selected.png",
+                 "images/hud_icons/launcher_icon_unselected.png"]
+
+ATLAS_PADDING = 1
+
+
+def pack_shelves(image_sizes, page_width):
+    # shelf packing: place the tallest images first, left to right, starting a new shelf when a row is full
+    positions = {}
+    shelf_x = 0
+    shelf_y = 0
+    shelf_height = 0
+    for file_name in sorted(image_sizes, key=lambda name: (-image_sizes[name][1], name)):
+        width, height = image_sizes[file_name]
+        if shelf_x + width > page_width:
+            shelf_y += shelf_height + ATLAS_PADDING
+            shelf_x = 0
+            shelf_height = 0
+        positions[file_name] = [shelf_x, shelf_y]
+        shelf_x += width + ATLAS_PADDING
+        shelf_height = max(shelf_height, height)
+    return positions, shelf_y + shelf_height
+
+
+def build_page(file_names, page_file_name, page_width):
+    images = {}
+    for file_name in file_names:
+        images[file_name] = pygame.image.load(file_name)
+    image_sizes = {}
+    for file_name, image in images.items():
+        image_sizes[file_name] = image.get_size()
+    page_width = max([page_width] + [size[0] for size in image_sizes.values()])
+    positions, page_height = pack_shelves(image_sizes, page_width)
+
+    page = pygame.Surface((page_width, page_height), pygame.SRCALPHA, 32)
+    page.fill((0, 0, 0, 0))
+    regions = []
+    for file_name in file_names:
+        position = positions[file_name]
+        page.blit(images[file_name], position)
+        # the game checks the image against its modified time and size, so an image edited after packing isn't used
+        modified_time, file_size = get_signature(file_name)
+        regions.append([file_name, position[0], position[1], image_sizes[file_name][0], image_sizes[file_name][1],
+                        modified_time, file_size])
+    pygame.image.save(page, page_file_name)
+    return regions
+
+
+def main(output_directory, page_width):
+    pygame.init()
+    if not os.path.exists(output_directory):
+        os.makedirs(output_directory)
+
+    alpha_page_file_name = os.path.join(output_directory, "atlas_alpha.png").replace("\\", "/")
+    opaque_page_file_name = os.path.join(output_directory, "atlas_opaque.png").replace("\\", "/")
+    alpha_regions = build_page(ALPHA_IMAGES, alpha_page_file_name, page_width)
+    opaque_regions = build_page(OPAQUE_IMAGES, opaque_page_file_name, page_width)
+
+    manifest_file_name = os.path.join(output_directory, os.path.basename(ATLAS_MANIFEST))
+    with open(manifest_file_name, "w", newline='') as manifest_file:
+        writer = csv.writer(manifest_file)
+        for page_file_name, use_alpha, regions in [(alpha_page_file_name, 1, alpha_regions),
+                                                   (opaque_page_file_name, 0, opaque_regions)]:
+            for file_name, x_pos, y_pos, width, height, modified_time, file_size in regions:
+                writer.writerow([file_name, page_file_name, use_alpha, x_pos, y_pos, width, height,
+                                 modified_time, file_size])
+
+    pygame.quit()
+    print("Packed " + str(len(alpha_regions) + len(opaque_regions)) + " images into " + output_directory)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Packs the game's sprites into atlas pages with a manifest")
+    parser.add_argument("--output", default=os.path.dirname(ATLAS_MANIFEST),
+                        help="directory to write the atlas pages and manifest to")
+    parser.add_argument("--page-width", type=int, default=1024, help="width of each atlas page in pixels")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    main(arguments.output, arguments.page_width)
@@ -0,0 +1,40 @@
+import argparse
+
+from game.level_file import read_level_file, write_level_file, read_level_csv, write_level_csv
+from game.level_file import read_level_regions, write_level_regions
+
+
+def main(input_path, output_path, level_tile_size):
+    # converts between the old csv level format, the binary one and a directory of region files, going by the file
+    # extensions. Anything without a .csv or .trl extension is a region directory.
+    if input_path.endswith(".csv"):
+        level_data = read_level_csv(input_path, level_tile_size)
+    elif input_path.endswith(".trl"):
+        level_data = read_level_file(input_path)
+    else:
+        level_data = read_level_regions(input_path)
+
+    if output_path.endswith(".csv"):
+        write_level_csv(output_path, level_data)
+    elif output_path.endswith(".trl"):
+        write_level_file(output_path, level_data)
+    else:
+        write_level_regions(output_path, level_data)
+
+    print("Converted " + input_path + " (" + str(level_data.level_tile_size[0]) + "x" +
+          str(level_data.level_tile_size[1]) + " tiles, " + str(len(level_data.spawns)) + " spawns) to " + output_path)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Converts Time Runs levels between the csv, binary and region formats")
+    parser.add_argument("input", help="level file to read, .csv or .trl, or a region directory")
+    parser.add_argument("output", help="level file to write, .csv or .trl, or a region directory")
+    parser.add_argument("--size", type=int, nargs=2, default=None, metavar=("WIDTH", "HEIGHT"),
+                        help="size of the level in tiles when reading a csv level, which doesn't store it. "
+                             "Defaults to just big enough to hold every tile.")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    main(arguments.input, arguments.output, arguments.size)
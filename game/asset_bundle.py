@@ -0,0 +1,143 @@
+import os
+import csv
+import pickle
+import pygame
+
+BUNDLE_FILE = "data/asset_bundle.bin"
+BUNDLE_VERSION = 4
+
+# written by build_atlas.py; when it is missing the images are loaded from their own files
+ATLAS_MANIFEST = "images/atlas/atlas_manifest.csv"
+
+# every file under these directories with the matching extension goes in the bundle, along with the atlas manifest
+BUNDLE_SOURCE_DIRECTORIES = [("images", ".png"), ("data/tiles", ".csv")]
+
+
+class AssetBundle:
+    """
+    One file holding the decoded pixels of every image and the parsed rows of every tile csv file, so startup reads
+    one file instead of decoding each PNG and parsing each csv. The bundle keeps the modified time and size of each
+    source file it was built from and is rebuilt when any of them change. A source that has changed since the bundle
+    was loaded is read from its own file.
+
+    When there is an atlas, the bundle holds its pages and not the images packed into them, as the game only ever
+    takes those images from the pages. An image that has changed since it was packed is bundled on its own again.
+
+    Images are kept as RGBA bytes rather than surfaces converted to the display's pixel format. pygame surfaces can't
+    be pickled, and the display's format isn't known until the display is set up, which can differ between runs. So
+    each image still gets one convert() or convert_alpha() from the asset cache, which is a copy of pixels that are
+    already decoded.
+    """
+    def __init__(self, file_name=BUNDLE_FILE):
+        self.file_name = file_name
+        self.images = {}
+        self.csv_rows = {}
+        self.signatures = {}
+        self.atlas_images = set()
+
+    def load(self):
+        sources = find_bundle_sources()
+        if os.path.isfile(self.file_name):
+            with open(self.file_name, "rb") as bundle_file:
+                try:
+                    bundle = pickle.load(bundle_file)
+                except (pickle.UnpicklingError, EOFError, ValueError):
+                    bundle = None
+            if (bundle is not None and bundle.get("version") == BUNDLE_VERSION and
+                    bundle["signatures"] == get_signatures(sources)):
+                self.images = bundle["images"]
+                self.csv_rows = bundle["csv_rows"]
+                self.signatures = bundle["signatures"]
+                self.atlas_images = bundle["atlas_images"]
+                return False
+        self.build(sources)
+        return True
+
+    def build(self, sources):
+        self.images = {}
+        self.csv_rows = {}
+        self.signatures = get_signatures(sources)
+        self.atlas_images = find_fresh_atlas_images(self.signatures)
+        for file_name in sources:
+            if file_name.endswith(".png"):
+                if file_name not in self.atlas_images:
+                    image = pygame.image.load(file_name)
+                    self.images[file_name] = (image.get_size(), pygame.image.tobytes(image, "RGBA"))
+            else:
+                self.csv_rows[file_name] = read_csv_file(file_name)
+
+        with open(self.file_name + ".tmp", "wb") as bundle_file:
+            pickle.dump({"version": BUNDLE_VERSION,
+                         "signatures": self.signatures,
+                         "images": self.images,
+                         "csv_rows": self.csv_rows,
+                         "atlas_images": self.atlas_images}, bundle_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(self.file_name + ".tmp", self.file_name)
+
+    def is_fresh(self, file_name):
+        return file_name in self.signatures and self.signatures[file_name] == get_signature(file_name)
+
+    def load_image(self, file_name):
+        # an unconverted surface, the same as pygame.image.load() gives
+        file_name = file_name.replace("\\", "/")
+        if file_name in self.images and self.is_fresh(file_name):
+            size, pixels = self.images[file_name]
+            return pygame.image.frombuffer(pixels, size, "RGBA")
+        return pygame.image.load(file_name)
+
+    def is_in_atlas(self, file_name):
+        # whether the atlas holds an image as it is now. The bundle is rebuilt when an image or the atlas manifest
+        # changes, which is when this is worked out again.
+        return file_name in self.atlas_images
+
+    def read_csv_rows(self, file_name):
+        file_name = file_name.replace("\\", "/")
+        if file_name in self.csv_rows and self.is_fresh(file_name):
+            return self.csv_rows[file_name]
+        return read_csv_file(file_name)
+
+
+def find_bundle_sources():
+    sources = []
+    for directory, extension in BUNDLE_SOURCE_DIRECTORIES:
+        for root, directory_names, file_names in os.walk(directory):
+            for file_name in file_names:
+                if file_name.endswith(extension):
+                    sources.append(os.path.join(root, file_name).replace("\\", "/"))
+    if os.path.isfile(ATLAS_MANIFEST):
+        sources.append(ATLAS_MANIFEST)
+    return sorted(sources)
+
+
+def get_signature(file_name):
+    if not os.path.isfile(file_name):
+        return None
+    file_stat = os.stat(file_name)
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def get_signatures(sources):
+    signatures = {}
+    for file_name in sources:
+        signatures[file_name] = get_signature(file_name)
+    return signatures
+
+
+def find_fresh_atlas_images(signatures):
+    # the images in the atlas manifest that haven't changed since they were packed, going by the modified time and
+    # size build_atlas.py kept for each of them
+    if ATLAS_MANIFEST not in signatures:
+        return set()
+    atlas_images = set()
+    for line in read_csv_file(ATLAS_MANIFEST):
+        if len(line) >= 9 and signatures.get(line[0]) == (int(line[7]), int(line[8])):
+            atlas_images.add(line[0])
+    return atlas_images
+
+
+def read_csv_file(file_name):
+    with open(file_name, "r") as csv_file:
+        return list(csv.reader(csv_file))
+
+
+asset_bundle = AssetBundle()
@@ -0,0 +1,54 @@
+import os
+import pygame
+
+from game.asset_bundle import asset_bundle, ATLAS_MANIFEST
+
+
+class AssetCache:
+    """
+    Loads each image file once, converted to the display's pixel format, and hands out the same surface to
+    everything that asks for it afterwards. Surfaces from the cache are shared, so copy one before drawing on it.
+    """
+    def __init__(self):
+        self.images = {}
+
+    def load_atlas(self, manifest_file_name=ATLAS_MANIFEST):
+        # loads the atlas pages listed in the manifest in one go, after which the images packed into them are handed
+        # out as regions of the pages instead of being loaded from their own files. An image that has changed since
+        # it was packed, which the asset bundle keeps track of, is loaded from its own file instead until
+        # build_atlas.py is run again.
+        if not os.path.exists(manifest_file_name):
+            return False
+        pages = {}
+        for line in asset_bundle.read_csv_rows(manifest_file_name):
+            if len(line) < 9:
+                continue
+            file_name = line[0]
+            page_file_name = line[1]
+            use_alpha = line[2] == "1"
+            if not asset_bundle.is_in_atlas(file_name):
+                continue
+            if page_file_name not in pages:
+                if use_alpha:
+                    pages[page_file_name] = asset_bundle.load_image(page_file_name).convert_alpha()
+                else:
+                    pages[page_file_name] = asset_bundle.load_image(page_file_name).convert()
+            region = pygame.Rect(int(line[3]), int(line[4]), int(line[5]), int(line[6]))
+            self.images[(file_name, use_alpha)] = pages[page_file_name].subsurface(region)
+        return True
+
+    def get_image(self, file_name, use_alpha=True):
+        key = (file_name, use_alpha)
+        if key not in self.images:
+            if use_alpha:
+                self.images[key] = asset_bundle.load_image(file_name).convert_alpha()
+            else:
+                self.images[key] = asset_bundle.load_image(file_name).convert()
+        return self.images[key]
+
+    def clear(self):
+        self.images.clear()
+
+
+# the display has to be set up before the first image is asked for, so it can be converted
+asset_cache = AssetCache()
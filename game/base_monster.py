@@ -4,60 +4,10 @@ import pygame
 
 from game.bullet import Bullet
 from game.missile import Missile
+from game.rotation_cache import rotation_cache
+from game.flash_cache import flash_cache
 
 
-class LOSLine:
-    def __init__(self, start_pos, end_pos):
-        self.start_pos = [start_pos[0], start_pos[1]]
-        self.end_pos = [end_pos[0], end_pos[1]]
-        self.line_list = self.create_line_list(int(self.start_pos[0]),
-                                               int(self.start_pos[1]),
-                                               int(self.end_pos[0]),
-                                               int(self.end_pos[1]))
-        
-    @staticmethod
-    def create_line_list(x0, y0, x1, y1):
-        line = []
-        dx = abs(x1 - x0)    # distance to travel in X
-        dy = abs(y1 - y0)    # distance to travel in Y
-
-        if x0 < x1:
-            ix = 1           # x will increase at each step
-        else:
-            ix = -1          # x will decrease at each step
-
-        if y0 < y1:
-            iy = 1           # y will increase at each step
-        else:
-            iy = -1          # y will decrease at each step
-
-        e = 0                # Current error 
-
-        for i in range(dx + dy):
-            line.append((x0, y0))
-            e1 = e + dy
-            e2 = e - dx
-            if abs(e1) < abs(e2):
-                # Error will be smaller moving on X
-                x0 += ix
-                e = e1
-            else:
-                # Error will be smaller moving on Y
-                y0 += iy
-                e = e2
-
-        return line
-
-    def is_rect_collided(self, rect):
-        collided = False
-        for point in self.line_list:
-            if rect.collidepoint(point):
-                collided = True
-                break
-            
-        return collided
-        
-
 class MonsterPath:
     def __init__(self):
         self.start_waypoint = [0, 0]
@@ -98,6 +48,7 @@ class BaseMonster(pygame.sprite.Sprite):
         self.rect.center = self.start_pos
 
         self.position = [float(self.rect.center[0]), float(self.rect.center[1])]
+        self.previous_position = [self.position[0], self.position[1]]
 
         self.screen_position = [0, 0]
         self.screen_position[0] = self.position[0]
@@ -157,12 +108,23 @@ class BaseMonster(pygame.sprite.Sprite):
         self.should_flash_sprite = False
         self.active_flash_sprite = False
 
-        self.line_of_sight = None
         self.los_check_timer = 0.6
         self.los_check_acc = 0.4
 
         self.has_line_of_sight_to_player = False
 
+        # set when the AI worker process is making this monster's decisions
+        self.ai_slot = None
+        self.uses_remote_ai = False
+        self.remote_ai_is_engaged = False
+        self.remote_ai_aim_vector = [0.0, 0.0]
+
+    def apply_ai_intent(self, is_engaged, aim_vector, has_line_of_sight):
+        self.uses_remote_ai = True
+        self.remote_ai_is_engaged = is_engaged
+        self.remote_ai_aim_vector = aim_vector
+        self.has_line_of_sight_to_player = has_line_of_sight
+
     def update_sprite(self, time_delta, time_multiplier):
         if self.sprite_needs_update:
             self.sprite_needs_update = False
@@ -172,14 +134,12 @@ class BaseMonster(pygame.sprite.Sprite):
             if self.sprite_flash_acc > self.sprite_flash_time:
                 self.sprite_flash_acc = 0.0
                 self.should_flash_sprite = False
-                
+                if self.active_flash_sprite:
+                    self.all_monster_sprites.remove(self.flash_sprite)
+                    self.active_flash_sprite = False
             else:
                 lerp_value = self.sprite_flash_acc / self.sprite_flash_time
-                flash_alpha = self.lerp(255, 0, lerp_value)
-                flash_image = self.image.copy()
-                flash_image.fill((0, 0, 0, flash_alpha), None, pygame.BLEND_RGBA_MULT)
-                flash_image.fill((255, 255, 255, 0), None, pygame.BLEND_RGBA_ADD)
-                self.flash_sprite.image = flash_image
+                self.flash_sprite.image = flash_cache.get_flash_image(self.image, lerp_value)
                 self.flash_sprite.rect = self.flash_sprite.image.get_rect()
                 flash_sprite_x_pos = self.screen_position[0]
                 flash_sprite_y_pos = self.screen_position[1] + self.sprite_rot_centre_offset[1]
@@ -189,6 +149,14 @@ class BaseMonster(pygame.sprite.Sprite):
                     self.all_monster_sprites.add(self.flash_sprite)
                     self.active_flash_sprite = True
 
+    def despawn(self):
+        # takes the monster out of the world without it dying, for when its region of the level is dropped
+        self.should_die = True
+        self.all_monster_sprites.remove(self)
+        if self.active_flash_sprite:
+            self.all_monster_sprites.remove(self.flash_sprite)
+            self.active_flash_sprite = False
+
     def take_damage(self, damage):
         self.health -= damage
         if self.health < 0:
@@ -197,6 +165,8 @@ class BaseMonster(pygame.sprite.Sprite):
 
     def update_movement_and_collision(self, time_delta, time_multiplier, player,
                                       new_explosions, tiled_level, projectiles, pick_up_spawner):
+        self.previous_position[0] = self.position[0]
+        self.previous_position[1] = self.position[1]
 
         for explosion in new_explosions:
             if self.test_explosion_collision(explosion):
@@ -208,12 +178,13 @@ class BaseMonster(pygame.sprite.Sprite):
         if not player.should_die:
             x_dist = float(player.position[0]) - float(self.position[0])
             y_dist = float(player.position[1]) - float(self.position[1])
-            distance_to_player = math.sqrt((x_dist * x_dist) + (y_dist * y_dist))
+            if not self.uses_remote_ai:
+                distance_to_player = math.sqrt((x_dist * x_dist) + (y_dist * y_dist))
 
         # idle AI state
             if self.is_wandering_aimlessly:
                 # self.moveSpeed = self.idleMoveSpeed
-                if distance_to_player < 512.0:
+                if self.should_engage_player(distance_to_player):
                     self.is_wandering_aimlessly = False
                 elif self.random_target_change_acc < self.random_target_change_time:
                     self.random_target_change_acc += time_delta
@@ -233,10 +204,13 @@ class BaseMonster(pygame.sprite.Sprite):
 
         # preparing to shoot AI state
             if not self.is_wandering_aimlessly:
-                if distance_to_player > 700.0:
+                if self.should_disengage_player(distance_to_player):
                     self.is_wandering_aimlessly = True
 
-                if distance_to_player > 0.0:
+                if self.uses_remote_ai:
+                    if self.remote_ai_aim_vector[0] != 0.0 or self.remote_ai_aim_vector[1] != 0.0:
+                        self.current_vector = [self.remote_ai_aim_vector[0], self.remote_ai_aim_vector[1]]
+                elif distance_to_player > 0.0:
                     self.current_vector = [x_dist / distance_to_player,
                                            y_dist / distance_to_player]
 
@@ -306,31 +280,18 @@ class BaseMonster(pygame.sprite.Sprite):
                 self.attack_anim_acc = 0.0
                 self.is_attacking = False
             
-        # time to check LOS to player?
-        if self.los_check_acc >= self.los_check_timer:
+        # time to check LOS to player? The AI worker checks it for us when it is running.
+        if self.uses_remote_ai:
+            pass
+        elif self.los_check_acc >= self.los_check_timer:
             self.los_check_acc = 0.0
             self.has_line_of_sight_to_player = True
             if not player.should_die:
                 if distance_to_player < 550.0:
-                    self.line_of_sight = LOSLine(self.screen_position, player.screen_position)
-                    for tile_x in range(tiled_level.zero_tile_x, tiled_level.end_tile_x):
-                        if self.has_line_of_sight_to_player:
-                            for tile_y in range(tiled_level.zero_tile_y, tiled_level.end_tile_y):
-                                tile = tiled_level.tile_grid[tile_x][tile_y]
-                                if self.has_line_of_sight_to_player:
-                                    for collision_shape in tile.tile_data.collision_shapes:
-                                        if collision_shape[0] == "circle":
-                                            pass
-                                        elif collision_shape[0] == "rect":
-                                            rect = collision_shape[2]
-                                            if self.line_of_sight.is_rect_collided(rect):
-                                                self.has_line_of_sight_to_player = False
-                                else:
-                                    break
-                        else:
-                            break
+                    # only the walls block line of sight, not the round rocks
+                    blocking_shape = tiled_level.collision_index.query_segment(self.position, player.position, "rect")
+                    self.has_line_of_sight_to_player = blocking_shape is None
                 else:
-                    self.line_of_sight = None
                     self.has_line_of_sight_to_player = False
         else:
             self.los_check_acc += time_delta * time_multiplier
@@ -345,6 +306,16 @@ class BaseMonster(pygame.sprite.Sprite):
                 self.active_flash_sprite = False
             self.try_pick_up_spawn(pick_up_spawner)
 
+    def should_engage_player(self, distance_to_player):
+        if self.uses_remote_ai:
+            return self.remote_ai_is_engaged
+        return distance_to_player < 512.0
+
+    def should_disengage_player(self, distance_to_player):
+        if self.uses_remote_ai:
+            return not self.remote_ai_is_engaged
+        return distance_to_player > 700.0
+
     def update_screen_position(self, world_offset):
         self.screen_position[0] = self.position[0] - world_offset[0]
         self.screen_position[1] = self.position[1] - world_offset[1]
@@ -455,7 +426,7 @@ class BaseMonster(pygame.sprite.Sprite):
                                self.current_vector[1] / direction_magnitude]
             self.old_facing_angle = math.atan2(-unit_dir_vector[0], -unit_dir_vector[1]) * 180 / math.pi
             monster_centre_position = self.rect.center
-            self.image = pygame.transform.rotate(self.original_image, self.old_facing_angle)
+            self.image = rotation_cache.get_rotated(self.original_image, self.old_facing_angle)
             self.rect = self.image.get_rect()
             self.rect.center = monster_centre_position
 
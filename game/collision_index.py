@@ -0,0 +1,237 @@
+import math
+import pygame
+
+CELL_SIZE = 64
+
+
+class CollisionIndex:
+    """
+    The collision shapes of the level's ground tiles in world space, bucketed by the grid cells they overlap, so a
+    collision test only looks at the shapes in the cells it touches. Shapes are ["rect", pygame.Rect] or
+    ["circle", [centre x, centre y], radius]. The index is filled as the level loads and updated when a tile changes.
+    """
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.tile_shapes = {}
+
+    def clear(self):
+        self.cells.clear()
+        self.tile_shapes.clear()
+
+    def set_tile(self, tile_x, tile_y, tile):
+        # replaces the shapes of the tile at this grid position, 'tile' can be None to just take them out
+        self.remove_tile(tile_x, tile_y)
+        if tile is None or len(tile.variant.collision_shapes) == 0:
+            return
+
+        shapes = []
+        for shape in tile.variant.collision_shapes:
+            if shape[0] == "rect":
+                world_shape = ["rect", shape[2].move(tile.rect.left, tile.rect.top)]
+            else:
+                world_shape = ["circle", [tile.rect.left + shape[1][0], tile.rect.top + shape[1][1]], shape[3]]
+            shapes.append(world_shape)
+            for cell in self.get_cells(get_shape_bounds(world_shape)):
+                self.cells.setdefault(cell, []).append(world_shape)
+        self.tile_shapes[(tile_x, tile_y)] = shapes
+
+    def remove_tile(self, tile_x, tile_y):
+        for shape in self.tile_shapes.pop((tile_x, tile_y), []):
+            for cell in self.get_cells(get_shape_bounds(shape)):
+                cell_shapes = self.cells[cell]
+                cell_shapes.remove(shape)
+                if len(cell_shapes) == 0:
+                    del self.cells[cell]
+
+    def get_cells(self, bounds):
+        # the cells overlapped by a (left, top, right, bottom) box, where right and bottom are just outside the box
+        first_cell_x = int(math.floor(bounds[0] / self.cell_size))
+        first_cell_y = int(math.floor(bounds[1] / self.cell_size))
+        last_cell_x = int(math.ceil(bounds[2] / self.cell_size)) - 1
+        last_cell_y = int(math.ceil(bounds[3] / self.cell_size)) - 1
+        cells = []
+        for cell_x in range(first_cell_x, max(first_cell_x, last_cell_x) + 1):
+            for cell_y in range(first_cell_y, max(first_cell_y, last_cell_y) + 1):
+                cells.append((cell_x, cell_y))
+        return cells
+
+    def get_shapes_in_bounds(self, bounds):
+        shapes = []
+        for cell in self.get_cells(bounds):
+            for shape in self.cells.get(cell, ()):
+                if shape not in shapes:
+                    shapes.append(shape)
+        return shapes
+
+    def query_point(self, point):
+        # the shapes that contain a world position
+        hits = []
+        for shape in self.cells.get((int(math.floor(point[0] / self.cell_size)),
+                                     int(math.floor(point[1] / self.cell_size))), ()):
+            if shape[0] == "rect":
+                rect = shape[1]
+                if rect.left <= point[0] < rect.right and rect.top <= point[1] < rect.bottom:
+                    hits.append(shape)
+            elif is_point_in_circle(point, shape[1], shape[2]):
+                hits.append(shape)
+        return hits
+
+    def query_rect(self, rect):
+        # the shapes that overlap a world space pygame.Rect
+        hits = []
+        for shape in self.get_shapes_in_bounds((rect.left, rect.top, rect.right, rect.bottom)):
+            if shape[0] == "rect":
+                if shape[1].colliderect(rect):
+                    hits.append(shape)
+            elif is_rect_in_circle(rect, shape[1], shape[2]):
+                hits.append(shape)
+        return hits
+
+    def is_rect_blocked(self, rect):
+        # whether any shape overlaps a world space pygame.Rect, stopping at the first one. Called for every
+        # projectile every step, so it works the cells out from the rect's whole number edges itself.
+        first_cell_x = rect.left // self.cell_size
+        first_cell_y = rect.top // self.cell_size
+        for cell_x in range(first_cell_x, max(first_cell_x, (rect.right - 1) // self.cell_size) + 1):
+            for cell_y in range(first_cell_y, max(first_cell_y, (rect.bottom - 1) // self.cell_size) + 1):
+                for shape in self.cells.get((cell_x, cell_y), ()):
+                    if shape[0] == "rect":
+                        if shape[1].colliderect(rect):
+                            return True
+                    elif is_rect_in_circle(rect, shape[1], shape[2]):
+                        return True
+        return False
+
+    def query_circle(self, centre, radius):
+        # the shapes that overlap a circle in world space
+        hits = []
+        for shape in self.get_shapes_in_bounds((centre[0] - radius, centre[1] - radius,
+                                                centre[0] + radius, centre[1] + radius)):
+            if shape[0] == "rect":
+                if is_rect_in_circle(shape[1], centre, radius):
+                    hits.append(shape)
+            else:
+                x_dist = centre[0] - shape[1][0]
+                y_dist = centre[1] - shape[1][1]
+                if (x_dist * x_dist) + (y_dist * y_dist) < (radius + shape[2]) ** 2:
+                    hits.append(shape)
+        return hits
+
+    def query_segment(self, start_pos, end_pos, shape_type=None):
+        # walks the cells along a line between two world positions, from the start, and returns the first shape the
+        # line passes through or None if it is clear. 'shape_type' limits the test to just "rect" or "circle" shapes.
+        cell_x = int(math.floor(start_pos[0] / self.cell_size))
+        cell_y = int(math.floor(start_pos[1] / self.cell_size))
+        end_cell_x = int(math.floor(end_pos[0] / self.cell_size))
+        end_cell_y = int(math.floor(end_pos[1] / self.cell_size))
+        x_dist = end_pos[0] - start_pos[0]
+        y_dist = end_pos[1] - start_pos[1]
+
+        # how far along the line, as a fraction of its length, the next cell boundary in x and in y is
+        step_x = 1 if x_dist > 0 else -1
+        step_y = 1 if y_dist > 0 else -1
+        if x_dist != 0:
+            next_boundary_x = (cell_x + (1 if step_x > 0 else 0)) * self.cell_size
+            fraction_to_x = (next_boundary_x - start_pos[0]) / x_dist
+            fraction_per_cell_x = self.cell_size / abs(x_dist)
+        else:
+            fraction_to_x = fraction_per_cell_x = math.inf
+        if y_dist != 0:
+            next_boundary_y = (cell_y + (1 if step_y > 0 else 0)) * self.cell_size
+            fraction_to_y = (next_boundary_y - start_pos[1]) / y_dist
+            fraction_per_cell_y = self.cell_size / abs(y_dist)
+        else:
+            fraction_to_y = fraction_per_cell_y = math.inf
+
+        cells_left = abs(end_cell_x - cell_x) + abs(end_cell_y - cell_y) + 1
+        while cells_left > 0:
+            for shape in self.cells.get((cell_x, cell_y), ()):
+                if shape_type is not None and shape[0] != shape_type:
+                    continue
+                if shape[0] == "rect":
+                    if is_segment_in_rect(start_pos, end_pos, shape[1]):
+                        return shape
+                elif is_segment_in_circle(start_pos, end_pos, shape[1], shape[2]):
+                    return shape
+            if fraction_to_x < fraction_to_y:
+                cell_x += step_x
+                fraction_to_x += fraction_per_cell_x
+            else:
+                cell_y += step_y
+                fraction_to_y += fraction_per_cell_y
+            cells_left -= 1
+        return None
+
+    def draw_shapes(self, screen, position_offset):
+        # debug drawing of the shapes in the cells on screen
+        screen_width, screen_height = screen.get_size()
+        for shape in self.get_shapes_in_bounds((position_offset[0], position_offset[1],
+                                                position_offset[0] + screen_width,
+                                                position_offset[1] + screen_height)):
+            if shape[0] == "rect":
+                overlay = pygame.Surface((shape[1].width, shape[1].height))
+                overlay.fill((180, 100, 100))
+                overlay.set_alpha(75)
+                screen.blit(overlay, shape[1].move(-position_offset[0], -position_offset[1]))
+            else:
+                radius = shape[2]
+                overlay = pygame.Surface((radius * 2, radius * 2))
+                overlay.fill((127, 33, 33))
+                overlay.set_colorkey((127, 33, 33))
+                pygame.draw.circle(overlay, pygame.Color("#BB7777"), (radius, radius), radius)
+                overlay.set_alpha(75)
+                screen.blit(overlay, (int(shape[1][0] - radius - position_offset[0]),
+                                      int(shape[1][1] - radius - position_offset[1])))
+
+
+def get_shape_bounds(shape):
+    if shape[0] == "rect":
+        return shape[1].left, shape[1].top, shape[1].right, shape[1].bottom
+    return shape[1][0] - shape[2], shape[1][1] - shape[2], shape[1][0] + shape[2], shape[1][1] + shape[2]
+
+
+def is_point_in_circle(point, circle_centre, circle_radius):
+    return (point[0] - circle_centre[0]) ** 2 + (point[1] - circle_centre[1]) ** 2 < circle_radius ** 2
+
+
+def is_rect_in_circle(rect, circle_centre, circle_radius):
+    # tests the point of the rectangle closest to the centre of the circle
+    closest_x = min(max(circle_centre[0], rect.left), rect.right)
+    closest_y = min(max(circle_centre[1], rect.top), rect.bottom)
+    return is_point_in_circle([closest_x, closest_y], circle_centre, circle_radius)
+
+
+def is_segment_in_rect(start_pos, end_pos, rect):
+    # clips the line to the rectangle one pair of sides at a time, if anything is left the line passes through it
+    x_dist = end_pos[0] - start_pos[0]
+    y_dist = end_pos[1] - start_pos[1]
+    clip_start = 0.0
+    clip_end = 1.0
+    for direction, distance_inside in [(-x_dist, start_pos[0] - rect.left), (x_dist, rect.right - start_pos[0]),
+                                       (-y_dist, start_pos[1] - rect.top), (y_dist, rect.bottom - start_pos[1])]:
+        if direction == 0:
+            if distance_inside < 0:
+                return False
+        else:
+            fraction = distance_inside / direction
+            if direction < 0:
+                clip_start = max(clip_start, fraction)
+            else:
+                clip_end = min(clip_end, fraction)
+            if clip_start > clip_end:
+                return False
+    return True
+
+
+def is_segment_in_circle(start_pos, end_pos, circle_centre, circle_radius):
+    x_dist = end_pos[0] - start_pos[0]
+    y_dist = end_pos[1] - start_pos[1]
+    length_squared = (x_dist * x_dist) + (y_dist * y_dist)
+    fraction = 0.0
+    if length_squared > 0.0:
+        fraction = (((circle_centre[0] - start_pos[0]) * x_dist) +
+                    ((circle_centre[1] - start_pos[1]) * y_dist)) / length_squared
+        fraction = min(max(fraction, 0.0), 1.0)
+    return is_point_in_circle([start_pos[0] + (x_dist * fraction), start_pos[1] + (y_dist * fraction)],
+                              circle_centre, circle_radius)
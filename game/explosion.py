@@ -3,6 +3,41 @@ import pygame
 
 from game.damage import Damage
 
+EXPLOSION_FRAMES = 16
+EXPLOSION_SHEET_ROWS = 8
+
+
+class ExplosionFrameCache:
+    """
+    Keeps the scaled animation frames for each row of an explosion sheet at each radius, so every explosion of the
+    same kind shares one set of frames instead of scaling its own.
+    """
+    def __init__(self):
+        self.frame_sets = {}
+
+    def get_frames(self, explosion_sheet, sheet_row, radius):
+        key = (explosion_sheet, sheet_row, radius)
+        if key not in self.frame_sets:
+            frames = []
+            for i in range(0, EXPLOSION_FRAMES):
+                x_start_index = (i * 64)
+                explosion_frame = explosion_sheet.subsurface(pygame.Rect(x_start_index + 1,
+                                                                         (sheet_row * 64) + 1, 62, 62))
+                frames.append(pygame.transform.scale(explosion_frame, (radius * 2, radius * 2)))
+            self.frame_sets[key] = frames
+        return self.frame_sets[key]
+
+    def prewarm(self, explosion_sheet, radius):
+        # builds every row at this radius up front so the first explosions don't cause a hitch
+        for sheet_row in range(0, EXPLOSION_SHEET_ROWS):
+            self.get_frames(explosion_sheet, sheet_row, radius)
+
+    def clear(self):
+        self.frame_sets.clear()
+
+
+explosion_frame_cache = ExplosionFrameCache()
+
 
 class Explosion(pygame.sprite.Sprite):
     def __init__(self, start_pos, explosion_sheet, size, damage_amount, damage_type, *groups):
@@ -11,15 +46,10 @@ class Explosion(pygame.sprite.Sprite):
         self.radius = size
         self.collide_radius = self.radius
         self.explosion_sheet = explosion_sheet
-        self.explosion_frames = 16
-        self.explosion_images = []
+        self.explosion_frames = EXPLOSION_FRAMES
         random_explosion_int = random.randrange(0, 512, 64)
-        for i in range(0, self.explosion_frames):
-            x_start_index = (i * 64)
-            explosion_frame = self.explosion_sheet.subsurface(pygame.Rect(x_start_index + 1,
-                                                                          random_explosion_int + 1, 62, 62))
-            explosion_frame = pygame.transform.scale(explosion_frame, (self.radius*2, self.radius*2))
-            self.explosion_images.append(explosion_frame)
+        self.explosion_images = explosion_frame_cache.get_frames(self.explosion_sheet, int(random_explosion_int / 64),
+                                                                 self.radius)
 
         self.image = self.explosion_images[0]
                 
@@ -0,0 +1,37 @@
+from collections import OrderedDict
+import pygame
+
+
+class FlashRampCache:
+    """
+    The white hit flash drawn over a sprite fades out over a few frames. Rather than tinting a fresh copy of the
+    sprite every frame, the fade is split into 'levels' steps and each step of each (already rotated) sprite image is
+    tinted once and kept. The least recently used tints are dropped once there are more than 'max_entries' of them.
+    """
+    def __init__(self, levels=16, max_entries=2048):
+        self.levels = levels
+        self.max_entries = max_entries
+        self.flash_images = OrderedDict()
+
+    def get_flash_image(self, image, lerp_value):
+        # 'lerp_value' runs from 0.0 at the start of the flash, when it is brightest, to 1.0 when it has faded out
+        level = int(round(min(max(lerp_value, 0.0), 1.0) * (self.levels - 1)))
+        key = (image, level)
+        flash_image = self.flash_images.get(key)
+        if flash_image is None:
+            flash_alpha = int(255 * (1.0 - (level / (self.levels - 1))))
+            flash_image = image.copy()
+            flash_image.fill((0, 0, 0, flash_alpha), None, pygame.BLEND_RGBA_MULT)
+            flash_image.fill((255, 255, 255, 0), None, pygame.BLEND_RGBA_ADD)
+            self.flash_images[key] = flash_image
+            if len(self.flash_images) > self.max_entries:
+                self.flash_images.popitem(last=False)
+        else:
+            self.flash_images.move_to_end(key)
+        return flash_image
+
+    def clear(self):
+        self.flash_images.clear()
+
+
+flash_cache = FlashRampCache()
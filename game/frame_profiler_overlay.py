@@ -0,0 +1,79 @@
+import pygame
+
+from game.text_cache import text_cache
+
+
+class FrameProfilerOverlay:
+    def __init__(self, screen_size):
+        self.screen_size = screen_size
+        self.is_visible = False
+
+        self.row_height = 14
+        self.name_column_width = 110
+        self.number_column_width = 56
+        self.histogram_width = 120
+        self.histogram_max_ms = 8.0  # times at or above this fill the whole height of a histogram row
+        self.panel_width = self.name_column_width + (2 * self.number_column_width) + self.histogram_width + 16
+        self.panel_position = [self.screen_size[0] - self.panel_width - 8, 56]
+
+        self.background_colour = pygame.Color(0, 0, 0, 170)
+        self.text_colour = pygame.Color("#FFFFFF")
+        self.bar_colour = pygame.Color("#77CC77")
+        self.slow_bar_colour = pygame.Color("#EE5555")
+
+    def toggle(self):
+        self.is_visible = not self.is_visible
+
+    def draw(self, screen, frame_timer, time_delta, font, small_font):
+        if time_delta > 0.0:
+            fps_string = "FPS: " + "{:.2f}".format(1.0/time_delta)
+            fps_text_render = text_cache.render(font, fps_string, self.text_colour)
+            fps_text_x_pos = self.screen_size[0] * 0.9
+            fps_text_y_pos = self.screen_size[1] - (self.screen_size[1] * 0.95)
+            screen.blit(fps_text_render,
+                        fps_text_render.get_rect(centerx=fps_text_x_pos,
+                                                 centery=fps_text_y_pos))
+
+        if self.is_visible:
+            phase_names = frame_timer.phase_names + ["total"]
+            panel_height = (len(phase_names) + 1) * self.row_height + 8
+            panel = pygame.Surface((self.panel_width, panel_height), pygame.SRCALPHA)
+            panel.fill(self.background_colour)
+
+            x_pos = 4
+            y_pos = 4
+            self.draw_text(panel, small_font, "phase", x_pos, y_pos)
+            self.draw_text(panel, small_font, "avg ms", x_pos + self.name_column_width, y_pos)
+            self.draw_text(panel, small_font, "max ms", x_pos + self.name_column_width + self.number_column_width,
+                           y_pos)
+            y_pos += self.row_height
+
+            histogram_x_pos = x_pos + self.name_column_width + (2 * self.number_column_width)
+            for phase_name in phase_names:
+                self.draw_text(panel, small_font, phase_name, x_pos, y_pos)
+                self.draw_text(panel, small_font, "{:.3f}".format(frame_timer.get_recent_average_ms(phase_name)),
+                               x_pos + self.name_column_width, y_pos)
+                self.draw_text(panel, small_font, "{:.3f}".format(frame_timer.get_recent_max_ms(phase_name)),
+                               x_pos + self.name_column_width + self.number_column_width, y_pos)
+                self.draw_histogram(panel, frame_timer.get_recent_ms(phase_name), histogram_x_pos, y_pos)
+                y_pos += self.row_height
+
+            screen.blit(panel, self.panel_position)
+
+    def draw_text(self, surface, small_font, text, x_pos, y_pos):
+        text_render = text_cache.render(small_font, text, self.text_colour)
+        surface.blit(text_render, text_render.get_rect(x=x_pos, centery=y_pos + (self.row_height / 2)))
+
+    def draw_histogram(self, surface, recent_ms, x_pos, y_pos):
+        # one pixel wide bar per recent frame, newest on the right
+        bar_x_pos = x_pos + self.histogram_width - len(recent_ms)
+        bar_bottom = y_pos + self.row_height - 1
+        for sample_ms in recent_ms:
+            bar_fraction = min(1.0, sample_ms / self.histogram_max_ms)
+            bar_height = max(1, int(bar_fraction * (self.row_height - 2)))
+            bar_colour = self.bar_colour
+            if bar_fraction >= 1.0:
+                bar_colour = self.slow_bar_colour
+            # noinspection PyArgumentList
+            pygame.draw.line(surface, bar_colour, (bar_x_pos, bar_bottom), (bar_x_pos, bar_bottom - bar_height))
+            bar_x_pos += 1
@@ -0,0 +1,95 @@
+import csv
+import time
+from collections import deque
+
+
+class FrameTimer:
+    def __init__(self, history_length=120, keep_frame_records=False):
+        self.history_length = history_length
+        self.keep_frame_records = keep_frame_records
+        self.frame_records = []
+        self.phase_names = []
+        self.phase_totals = {}
+        self.phase_histories = {}
+        self.frame_history = deque(maxlen=self.history_length)
+        self.frame_phase_times = {}
+        self.frame_count = 0
+        self.total_frame_time = 0.0
+        self.frame_start_time = 0.0
+        self.lap_start_time = 0.0
+
+    def begin_frame(self):
+        self.frame_phase_times = {}
+        self.frame_start_time = time.perf_counter()
+        self.lap_start_time = self.frame_start_time
+
+    def lap(self, phase_name):
+        # records the time since the last lap (or the start of the frame) against the named phase. Laps with the
+        # same name in one frame are added together.
+        lap_end_time = time.perf_counter()
+        if phase_name not in self.phase_totals:
+            self.phase_names.append(phase_name)
+            self.phase_totals[phase_name] = 0.0
+            self.phase_histories[phase_name] = deque(maxlen=self.history_length)
+        self.frame_phase_times[phase_name] = (self.frame_phase_times.get(phase_name, 0.0) +
+                                              lap_end_time - self.lap_start_time)
+        self.lap_start_time = lap_end_time
+
+    def end_frame(self):
+        for phase_name in self.phase_names:
+            phase_time = self.frame_phase_times.get(phase_name, 0.0)
+            self.phase_totals[phase_name] += phase_time
+            self.phase_histories[phase_name].append(phase_time * 1000.0)
+        frame_time = time.perf_counter() - self.frame_start_time
+        self.total_frame_time += frame_time
+        self.frame_history.append(frame_time * 1000.0)
+        self.frame_count += 1
+        if self.keep_frame_records:
+            self.frame_records.append((self.frame_phase_times, frame_time))
+
+    def get_average_ms(self, phase_name):
+        if self.frame_count == 0:
+            return 0.0
+        return (self.phase_totals.get(phase_name, 0.0) / self.frame_count) * 1000.0
+
+    def get_average_frame_ms(self):
+        if self.frame_count == 0:
+            return 0.0
+        return (self.total_frame_time / self.frame_count) * 1000.0
+
+    def get_recent_ms(self, phase_name):
+        # the per-frame times of the phase over the last 'history_length' frames, oldest first. The phase name
+        # 'total' gives the times of the whole frames.
+        if phase_name == "total":
+            return self.frame_history
+        return self.phase_histories.get(phase_name, [])
+
+    def get_recent_average_ms(self, phase_name):
+        recent_ms = self.get_recent_ms(phase_name)
+        if len(recent_ms) == 0:
+            return 0.0
+        return sum(recent_ms) / len(recent_ms)
+
+    def get_recent_max_ms(self, phase_name):
+        recent_ms = self.get_recent_ms(phase_name)
+        if len(recent_ms) == 0:
+            return 0.0
+        return max(recent_ms)
+
+    def save_frame_records(self, file_name):
+        # writes the time of every phase of every recorded frame, in ms, so runs can be compared frame by frame
+        with open(file_name, "w", newline='') as records_file:
+            writer = csv.writer(records_file)
+            writer.writerow(["frame"] + self.phase_names + ["total"])
+            for frame, (frame_phase_times, frame_time) in enumerate(self.frame_records):
+                row = [str(frame)]
+                for phase_name in self.phase_names:
+                    row.append("{:.4f}".format(frame_phase_times.get(phase_name, 0.0) * 1000.0))
+                row.append("{:.4f}".format(frame_time * 1000.0))
+                writer.writerow(row)
+
+    def print_report(self):
+        print("Frames: " + str(self.frame_count))
+        for phase_name in self.phase_names:
+            print("{:<16}{:>10.3f} ms/frame".format(phase_name, self.get_average_ms(phase_name)))
+        print("{:<16}{:>10.3f} ms/frame".format("total", self.get_average_frame_ms()))
@@ -1,12 +1,17 @@
 import pygame
 
+from game.asset_cache import asset_cache
+from game.text_cache import text_cache
+
 
 class HUDButton:
     def __init__(self, start_pos, button_image_name, hud_sprites):
         self.clicked = False
         self.button_image_name = button_image_name
-        self.image = pygame.image.load("images/hud_icons/" + self.button_image_name + "_unselected.png").convert()
-        self.img_selected = pygame.image.load("images/hud_icons/" + self.button_image_name + "_selected.png").convert()
+        self.image = asset_cache.get_image("images/hud_icons/" + self.button_image_name + "_unselected.png",
+                                           use_alpha=False)
+        self.img_selected = asset_cache.get_image("images/hud_icons/" + self.button_image_name + "_selected.png",
+                                                  use_alpha=False)
         self.sprite = pygame.sprite.Sprite()      
         self.sprite.image = self.image
         self.sprite.rect = self.image.get_rect()  
@@ -15,9 +20,9 @@ class HUDButton:
 
         # value text
         self.text_value = 0
-        self.font = pygame.font.Font(None, 16)
+        self.font = text_cache.get_font(None, 16)
         cost_string = "{:,}".format(self.text_value)
-        self.cost_text_render = self.font.render(cost_string, True, pygame.Color("#FFFFFF"))
+        self.cost_text_render = text_cache.render(self.font, cost_string, pygame.Color("#FFFFFF"))
         self.text_pos = [start_pos[0], start_pos[1] + 42]
 
         self.selected = False
@@ -33,7 +38,7 @@ class HUDButton:
             text_colour = pygame.Color("#EE3333")
         elif self.text_value == -1:
             cost_string = "infinite"
-        self.cost_text_render = self.font.render(cost_string, True, text_colour)
+        self.cost_text_render = text_cache.render(self.font, cost_string, text_colour)
         
     def set_selected(self):
         self.selected = True
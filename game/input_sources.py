@@ -0,0 +1,224 @@
+import csv
+import struct
+import zlib
+import pygame
+from pygame.locals import *
+
+
+class InputSource:
+    def __init__(self):
+        pass
+
+    def get_time_delta(self, measured_time_delta):
+        return measured_time_delta
+
+    def get_events(self):
+        return []
+
+    def get_mouse_rel(self):
+        return 0, 0
+
+    def end_frame(self):
+        pass
+
+    def is_finished(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class LiveInput(InputSource):
+    def __init__(self):
+        super().__init__()
+
+    def get_events(self):
+        return pygame.event.get()
+
+    def get_mouse_rel(self):
+        return pygame.mouse.get_rel()
+
+
+class ScriptedInput(InputSource):
+    """
+    Feeds the game loop input read from a csv script instead of the real keyboard and mouse. Each line starts with
+    the gameplay frame it happens on (or an inclusive range like '10-40') followed by the input, e.g.
+
+        0,keydown,w
+        30,mousebuttondown,1
+        10-40,mouse_rel,4,0
+    """
+    def __init__(self, file_name):
+        super().__init__()
+        self.file_name = file_name
+        self.frame = 0
+        self.frame_events = {}
+        self.frame_mouse_rels = {}
+        self.load_script()
+
+    def load_script(self):
+        with open(self.file_name, "r") as script_file:
+            reader = csv.reader(script_file)
+            for line in reader:
+                if len(line) < 2 or line[0].startswith("#"):
+                    continue
+                frame_range = line[0].split("-")
+                first_frame = int(frame_range[0])
+                last_frame = int(frame_range[-1])
+                input_type = line[1]
+                for frame in range(first_frame, last_frame + 1):
+                    if input_type == "mouse_rel":
+                        self.frame_mouse_rels[frame] = (int(line[2]), int(line[3]))
+                    else:
+                        self.frame_events.setdefault(frame, []).append(self.create_event(input_type, line[2:]))
+
+    @staticmethod
+    def create_event(input_type, values):
+        if input_type == "keydown":
+            return pygame.event.Event(KEYDOWN, key=getattr(pygame, "K_" + values[0]))
+        elif input_type == "keyup":
+            return pygame.event.Event(KEYUP, key=getattr(pygame, "K_" + values[0]))
+        elif input_type == "mousebuttondown":
+            return pygame.event.Event(MOUSEBUTTONDOWN, button=int(values[0]), pos=(0, 0))
+        elif input_type == "mousebuttonup":
+            return pygame.event.Event(MOUSEBUTTONUP, button=int(values[0]), pos=(0, 0))
+        elif input_type == "quit":
+            return pygame.event.Event(QUIT)
+        raise ValueError("Unknown input type in script: " + input_type)
+
+    def get_events(self):
+        pygame.event.get()  # keep the real event queue drained
+        return self.frame_events.get(self.frame, [])
+
+    def get_mouse_rel(self):
+        return self.frame_mouse_rels.get(self.frame, (0, 0))
+
+    def end_frame(self):
+        self.frame += 1
+
+
+# Recordings are a zlib compressed stream of little-endian records: a header holding the RNG seed and the number of
+# frames, then for each frame its time delta, the mouse movement and the events handed to the game. Version 1
+# recordings, with 16 bit mouse movements and at most 255 events a frame, can still be replayed.
+RECORDING_MAGIC = b"TRIR"
+RECORDING_VERSION = 2
+RECORDING_HEADER = struct.Struct("<4sHqI")
+RECORDING_FRAME = struct.Struct("<diiI")
+RECORDING_FRAMES = {1: struct.Struct("<dhhB"), RECORDING_VERSION: RECORDING_FRAME}
+RECORDING_EVENT = struct.Struct("<Bi")
+
+RECORDED_EVENT_TYPES = [KEYDOWN, KEYUP, MOUSEBUTTONDOWN, MOUSEBUTTONUP, QUIT]
+
+
+class InputRecorder(InputSource):
+    def __init__(self, input_source, file_name, seed):
+        super().__init__()
+        self.input_source = input_source
+        self.file_name = file_name
+        self.seed = seed
+        self.frame_records = []
+
+        self.frame_time_delta = 0.0
+        self.frame_mouse_rel = (0, 0)
+        self.frame_events = []
+
+    def get_time_delta(self, measured_time_delta):
+        self.frame_time_delta = self.input_source.get_time_delta(measured_time_delta)
+        return self.frame_time_delta
+
+    def get_events(self):
+        events = self.input_source.get_events()
+        for event in events:
+            if event.type in (KEYDOWN, KEYUP):
+                self.frame_events.append((RECORDED_EVENT_TYPES.index(event.type), event.key))
+            elif event.type in (MOUSEBUTTONDOWN, MOUSEBUTTONUP):
+                self.frame_events.append((RECORDED_EVENT_TYPES.index(event.type), event.button))
+            elif event.type == QUIT:
+                self.frame_events.append((RECORDED_EVENT_TYPES.index(event.type), 0))
+        return events
+
+    def get_mouse_rel(self):
+        self.frame_mouse_rel = self.input_source.get_mouse_rel()
+        return self.frame_mouse_rel
+
+    def end_frame(self):
+        self.input_source.end_frame()
+        self.frame_records.append((self.frame_time_delta, self.frame_mouse_rel, self.frame_events))
+        self.frame_time_delta = 0.0
+        self.frame_mouse_rel = (0, 0)
+        self.frame_events = []
+
+    def is_finished(self):
+        return self.input_source.is_finished()
+
+    def close(self):
+        self.input_source.close()
+        recording = bytearray(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION,
+                                                     self.seed, len(self.frame_records)))
+        for time_delta, mouse_rel, events in self.frame_records:
+            recording += RECORDING_FRAME.pack(time_delta, mouse_rel[0], mouse_rel[1], len(events))
+            for event_type_index, event_value in events:
+                recording += RECORDING_EVENT.pack(event_type_index, event_value)
+        with open(self.file_name, "wb") as recording_file:
+            recording_file.write(zlib.compress(bytes(recording)))
+
+
+class ReplayInput(InputSource):
+    def __init__(self, file_name):
+        super().__init__()
+        self.file_name = file_name
+        self.frame = 0
+        self.frame_records = []
+        self.seed = 0
+        self.load_recording()
+
+    def load_recording(self):
+        with open(self.file_name, "rb") as recording_file:
+            recording = zlib.decompress(recording_file.read())
+
+        magic, version, self.seed, frame_count = RECORDING_HEADER.unpack_from(recording, 0)
+        if magic != RECORDING_MAGIC or version not in RECORDING_FRAMES:
+            raise ValueError("Not a recording this version of the game can replay: " + self.file_name)
+        recording_frame = RECORDING_FRAMES[version]
+        read_pos = RECORDING_HEADER.size
+        for frame in range(0, frame_count):
+            time_delta, mouse_rel_x, mouse_rel_y, event_count = recording_frame.unpack_from(recording, read_pos)
+            read_pos += recording_frame.size
+            events = []
+            for event_index in range(0, event_count):
+                event_type_index, event_value = RECORDING_EVENT.unpack_from(recording, read_pos)
+                read_pos += RECORDING_EVENT.size
+                events.append(self.create_event(RECORDED_EVENT_TYPES[event_type_index], event_value))
+            self.frame_records.append((time_delta, (mouse_rel_x, mouse_rel_y), events))
+
+    @staticmethod
+    def create_event(event_type, event_value):
+        if event_type in (KEYDOWN, KEYUP):
+            return pygame.event.Event(event_type, key=event_value)
+        elif event_type in (MOUSEBUTTONDOWN, MOUSEBUTTONUP):
+            return pygame.event.Event(event_type, button=event_value, pos=(0, 0))
+        return pygame.event.Event(event_type)
+
+    # once the recording has run out, which is straight away for an empty one, each frame is replayed as nothing
+    # happening and taking no time until the game sees the replay is finished
+    def get_time_delta(self, measured_time_delta):
+        if self.is_finished():
+            return 0.0
+        return self.frame_records[self.frame][0]
+
+    def get_events(self):
+        pygame.event.get()  # keep the real event queue drained
+        if self.is_finished():
+            return []
+        return self.frame_records[self.frame][2]
+
+    def get_mouse_rel(self):
+        if self.is_finished():
+            return 0, 0
+        return self.frame_records[self.frame][1]
+
+    def end_frame(self):
+        self.frame += 1
+
+    def is_finished(self):
+        return self.frame >= len(self.frame_records)
@@ -0,0 +1,96 @@
+import os
+import pickle
+import hashlib
+
+from game.tile import Tile
+from game.level_file import read_level_file
+from game.tile_variants import TileVariantRegistry
+from game.collision_index import CollisionIndex
+from game.monster_ai_worker import mark_los_shape, LOS_CELL_SIZE
+
+BAKE_DIRECTORY = "data/baked"
+BAKE_VERSION = 1
+BAKE_EXTENSION = ".bake"
+
+# the tile files decide the collision shapes, so a change to any of them changes what is baked from a level
+BAKE_TILE_DIRECTORY = "data/tiles"
+
+
+class BakedLevel:
+    """
+    Data worked out from a level file ahead of time by bake_level.py, so the game doesn't have to at startup. A bake
+    is filed under a hash of everything it was made from - the level file, the tile files and the bake settings - so
+    the game only ever finds the bake of the level it is loading and makes the data itself when there isn't one.
+    """
+    def __init__(self, level_hash, los_mask_size, los_mask):
+        self.level_hash = level_hash
+        self.los_mask_size = los_mask_size
+        self.los_mask = los_mask  # the monster AI worker's line of sight mask, one byte per LOS_CELL_SIZE square
+
+
+def get_level_hash(level_file_name):
+    level_hash = hashlib.sha256()
+    level_hash.update(str(BAKE_VERSION).encode("utf-8"))
+    level_hash.update(str(LOS_CELL_SIZE).encode("utf-8"))
+    with open(level_file_name, "rb") as level_file:
+        level_hash.update(level_file.read())
+    for file_name in sorted(os.listdir(BAKE_TILE_DIRECTORY)):
+        file_path = os.path.join(BAKE_TILE_DIRECTORY, file_name)
+        if os.path.isfile(file_path):
+            level_hash.update(file_name.encode("utf-8"))
+            with open(file_path, "rb") as tile_file:
+                level_hash.update(tile_file.read())
+    return level_hash.hexdigest()
+
+
+def get_baked_file_name(level_hash, directory=BAKE_DIRECTORY):
+    return os.path.join(directory, level_hash + BAKE_EXTENSION)
+
+
+def load_baked_level(level_file_name, directory=BAKE_DIRECTORY):
+    # the bake of a level file as it is now, or None if it hasn't been baked since it last changed
+    level_hash = get_level_hash(level_file_name)
+    baked_file_name = get_baked_file_name(level_hash, directory)
+    if not os.path.isfile(baked_file_name):
+        return None
+    with open(baked_file_name, "rb") as baked_file:
+        try:
+            bake = pickle.load(baked_file)
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            return None
+    if bake.get("version") != BAKE_VERSION or bake.get("level_hash") != level_hash:
+        return None
+    return BakedLevel(level_hash, bake["los_mask_size"], bake["los_mask"])
+
+
+def write_baked_level(baked_level, directory=BAKE_DIRECTORY):
+    os.makedirs(directory, exist_ok=True)
+    baked_file_name = get_baked_file_name(baked_level.level_hash, directory)
+    with open(baked_file_name + ".tmp", "wb") as baked_file:
+        pickle.dump({"version": BAKE_VERSION,
+                     "level_hash": baked_level.level_hash,
+                     "los_mask_size": baked_level.los_mask_size,
+                     "los_mask": baked_level.los_mask}, baked_file, pickle.HIGHEST_PROTOCOL)
+    os.replace(baked_file_name + ".tmp", baked_file_name)
+    return baked_file_name
+
+
+def bake_level(level_file_name, all_tile_data):
+    # puts the level's ground tiles in a collision index the same way the game does, then works out the data the game
+    # would from their shapes
+    level_hash = get_level_hash(level_file_name)
+    level_data = read_level_file(level_file_name)
+    tile_variants = TileVariantRegistry(all_tile_data)
+    collision_index = CollisionIndex()
+    for tile_x, tile_y, tile_id, tile_angle in level_data.get_tiles(0):
+        if tile_id in all_tile_data:
+            tile = Tile([(tile_x * 64) + 32, (tile_y * 64) + 32], tile_variants.get_variant(tile_id, tile_angle), 0)
+            collision_index.set_tile(tile_x, tile_y, tile)
+
+    los_mask_size = [int((level_data.level_tile_size[0] * 64) / LOS_CELL_SIZE),
+                     int((level_data.level_tile_size[1] * 64) / LOS_CELL_SIZE)]
+    los_mask = bytearray(los_mask_size[0] * los_mask_size[1])
+    for shapes in collision_index.tile_shapes.values():
+        for shape in shapes:
+            mark_los_shape(los_mask, los_mask_size, [0, 0], shape)
+    return BakedLevel(level_hash, los_mask_size, bytes(los_mask))
@@ -0,0 +1,282 @@
+import os
+import csv
+import sys
+import mmap
+import struct
+from array import array
+
+# Binary level files (.trl) are little-endian and laid out as:
+#  - a header: magic, version, level width and height in tiles, layer count, spawn count and string count
+#  - for each layer, one unsigned 16 bit tile id index per tile followed by one unsigned 16 bit angle per tile.
+#    Tiles are stored column by column, so the tile at grid x, y is at index (x * height) + y. EMPTY_TILE marks a
+#    grid square with no tile.
+#  - a spawn table holding the type id index and world position of each AI spawn
+#  - a string table holding the tile and spawn type ids the indices above refer to
+LEVEL_MAGIC = b"TRLV"
+LEVEL_VERSION = 1
+LEVEL_HEADER = struct.Struct("<4sHHHHII")
+LEVEL_SPAWN = struct.Struct("<Hii")
+LEVEL_STRING_LENGTH = struct.Struct("<H")
+
+LEVEL_LAYERS = 2
+EMPTY_TILE = 0xFFFF
+
+# Levels too big to keep in memory are stored as a directory of region files instead. The directory holds a manifest
+# with the size of the level and of its regions, then one level file in the format above for each REGION_TILES square
+# region with anything in it. Tile positions in a region file are relative to the region's top left tile; spawn
+# positions are in the world. Regions without a file are empty.
+REGION_MAGIC = b"TRRG"
+REGION_VERSION = 1
+REGION_MANIFEST = struct.Struct("<4sHIIH")
+REGION_MANIFEST_FILE = "regions.bin"
+REGION_TILES = 32
+
+
+class LevelData:
+    def __init__(self, level_tile_size, layer_count=LEVEL_LAYERS):
+        self.level_tile_size = [level_tile_size[0], level_tile_size[1]]
+        tile_count = self.level_tile_size[0] * self.level_tile_size[1]
+        self.strings = []
+        self.string_indices = {}
+        self.layer_tile_indices = []
+        self.layer_angles = []
+        for layer in range(0, layer_count):
+            self.layer_tile_indices.append(array('H', [EMPTY_TILE]) * tile_count)
+            self.layer_angles.append(array('H', [0]) * tile_count)
+        self.spawns = []
+
+    def get_string_index(self, string):
+        if string not in self.string_indices:
+            self.string_indices[string] = len(self.strings)
+            self.strings.append(string)
+        return self.string_indices[string]
+
+    def set_tile(self, layer, tile_x, tile_y, tile_id, tile_angle):
+        index = (tile_x * self.level_tile_size[1]) + tile_y
+        self.layer_tile_indices[layer][index] = self.get_string_index(tile_id)
+        self.layer_angles[layer][index] = tile_angle % 360
+
+    def add_spawn(self, type_id, world_position):
+        self.spawns.append([type_id, int(world_position[0]), int(world_position[1])])
+
+    def get_tiles(self, layer):
+        # yields (tile_x, tile_y, tile_id, tile_angle) for each tile in the layer
+        tile_indices = self.layer_tile_indices[layer]
+        angles = self.layer_angles[layer]
+        height = self.level_tile_size[1]
+        for index in range(0, len(tile_indices)):
+            if tile_indices[index] != EMPTY_TILE:
+                yield int(index / height), index % height, self.strings[tile_indices[index]], angles[index]
+
+
+def read_level_file(file_name):
+    with open(file_name, "rb") as level_file:
+        with mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_READ) as level_map:
+            magic, version, width, height, layer_count, spawn_count, string_count = LEVEL_HEADER.unpack_from(
+                level_map, 0)
+            if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+                raise ValueError("Not a level file this version of the game can load: " + file_name)
+
+            level_data = LevelData([width, height], layer_count)
+            tile_count = width * height
+            read_pos = LEVEL_HEADER.size
+            for layer in range(0, layer_count):
+                level_data.layer_tile_indices[layer] = read_array(level_map, read_pos, tile_count)
+                read_pos += tile_count * 2
+                level_data.layer_angles[layer] = read_array(level_map, read_pos, tile_count)
+                read_pos += tile_count * 2
+
+            spawn_rows = []
+            for spawn_index in range(0, spawn_count):
+                spawn_rows.append(LEVEL_SPAWN.unpack_from(level_map, read_pos))
+                read_pos += LEVEL_SPAWN.size
+
+            for string_index in range(0, string_count):
+                string_length = LEVEL_STRING_LENGTH.unpack_from(level_map, read_pos)[0]
+                read_pos += LEVEL_STRING_LENGTH.size
+                level_data.get_string_index(level_map[read_pos:read_pos + string_length].decode("utf-8"))
+                read_pos += string_length
+
+    for type_index, x_pos, y_pos in spawn_rows:
+        level_data.spawns.append([level_data.strings[type_index], x_pos, y_pos])
+    return level_data
+
+
+def read_array(level_map, start, count):
+    values = array('H')
+    values.frombytes(level_map[start:start + (count * 2)])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def write_level_file(file_name, level_data):
+    # the type ids of spawns go in the string table too, so add them before the table is written
+    spawn_type_indices = [level_data.get_string_index(spawn[0]) for spawn in level_data.spawns]
+
+    # the file is written next to the old one and renamed over it once it is all on disk, so a crash part way through
+    # leaves the old file as it was
+    temp_file_name = file_name + ".tmp"
+    with open(temp_file_name, "wb") as level_file:
+        level_file.write(LEVEL_HEADER.pack(LEVEL_MAGIC, LEVEL_VERSION,
+                                           level_data.level_tile_size[0], level_data.level_tile_size[1],
+                                           len(level_data.layer_tile_indices), len(level_data.spawns),
+                                           len(level_data.strings)))
+        for layer in range(0, len(level_data.layer_tile_indices)):
+            for values in [level_data.layer_tile_indices[layer], level_data.layer_angles[layer]]:
+                if sys.byteorder == "big":
+                    values = array('H', values)
+                    values.byteswap()
+                level_file.write(values.tobytes())
+
+        for spawn, type_index in zip(level_data.spawns, spawn_type_indices):
+            level_file.write(LEVEL_SPAWN.pack(type_index, spawn[1], spawn[2]))
+
+        for string in level_data.strings:
+            encoded_string = string.encode("utf-8")
+            level_file.write(LEVEL_STRING_LENGTH.pack(len(encoded_string)))
+            level_file.write(encoded_string)
+
+        level_file.flush()
+        os.fsync(level_file.fileno())
+    os.replace(temp_file_name, file_name)
+
+
+def read_level_csv(file_name, level_tile_size=None):
+    # reads the old csv level format. Those files don't store the size of the level, so unless it is given it is
+    # made just big enough to hold every tile.
+    tile_rows = []
+    spawn_rows = []
+    with open(file_name, "r") as csv_file:
+        for line in csv.reader(csv_file):
+            if len(line) == 0:
+                continue
+            if line[0] == "tile":
+                tile_layer = 0
+                if len(line) == 6:
+                    tile_layer = int(line[5])
+                tile_rows.append([int((int(line[2]) - 32) / 64), int((int(line[3]) - 32) / 64),
+                                  line[1], int(line[4]), tile_layer])
+            elif line[0] == "aiSpawn":
+                spawn_rows.append([line[1], int(line[2]), int(line[3])])
+
+    if level_tile_size is None:
+        level_tile_size = [1, 1]
+        for tile_x, tile_y, tile_id, tile_angle, tile_layer in tile_rows:
+            level_tile_size = [max(level_tile_size[0], tile_x + 1), max(level_tile_size[1], tile_y + 1)]
+
+    level_data = LevelData(level_tile_size)
+    for tile_x, tile_y, tile_id, tile_angle, tile_layer in tile_rows:
+        level_data.set_tile(tile_layer, tile_x, tile_y, tile_id, tile_angle)
+    for type_id, x_pos, y_pos in spawn_rows:
+        level_data.add_spawn(type_id, [x_pos, y_pos])
+    return level_data
+
+
+def write_level_csv(file_name, level_data):
+    with open(file_name, "w", newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        for layer in range(0, len(level_data.layer_tile_indices)):
+            for tile_x, tile_y, tile_id, tile_angle in level_data.get_tiles(layer):
+                row = ["tile", tile_id, str((tile_x * 64) + 32), str((tile_y * 64) + 32), str(tile_angle)]
+                if layer != 0:
+                    row.append(str(layer))
+                writer.writerow(row)
+        for type_id, x_pos, y_pos in level_data.spawns:
+            writer.writerow(["aiSpawn", type_id, str(x_pos), str(y_pos)])
+
+
+def get_region_file_name(directory, region_x, region_y):
+    return os.path.join(directory, "region_" + str(region_x) + "_" + str(region_y) + ".trl")
+
+
+def get_region_tile_size(level_tile_size, region_tiles, region_x, region_y):
+    # regions along the right and bottom edges of a level are cut short by the edge
+    return [min(region_tiles, level_tile_size[0] - (region_x * region_tiles)),
+            min(region_tiles, level_tile_size[1] - (region_y * region_tiles))]
+
+
+def read_region_manifest(directory):
+    with open(os.path.join(directory, REGION_MANIFEST_FILE), "rb") as manifest_file:
+        magic, version, width, height, region_tiles = REGION_MANIFEST.unpack(manifest_file.read(REGION_MANIFEST.size))
+    if magic != REGION_MAGIC or version != REGION_VERSION:
+        raise ValueError("Not a region manifest this version of the game can load: " + directory)
+    return [width, height], region_tiles
+
+
+def write_region_manifest(directory, level_tile_size, region_tiles):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, REGION_MANIFEST_FILE), "wb") as manifest_file:
+        manifest_file.write(REGION_MANIFEST.pack(REGION_MAGIC, REGION_VERSION,
+                                                 level_tile_size[0], level_tile_size[1], region_tiles))
+
+
+def read_level_region(directory, region_x, region_y):
+    # returns None for a region with no file, which is empty
+    file_name = get_region_file_name(directory, region_x, region_y)
+    if not os.path.isfile(file_name):
+        return None
+    return read_level_file(file_name)
+
+
+def split_level_into_regions(level_data, region_tiles=REGION_TILES):
+    # returns a dictionary of the level's regions with anything in them, keyed by region x and y
+    regions = {}
+
+    def get_region(tile_x, tile_y):
+        region_key = (int(tile_x / region_tiles), int(tile_y / region_tiles))
+        if region_key not in regions:
+            regions[region_key] = LevelData(get_region_tile_size(level_data.level_tile_size, region_tiles,
+                                                                 region_key[0], region_key[1]),
+                                            len(level_data.layer_tile_indices))
+        return regions[region_key]
+
+    for layer in range(0, len(level_data.layer_tile_indices)):
+        for tile_x, tile_y, tile_id, tile_angle in level_data.get_tiles(layer):
+            get_region(tile_x, tile_y).set_tile(layer, tile_x % region_tiles, tile_y % region_tiles,
+                                                tile_id, tile_angle)
+    for type_id, x_pos, y_pos in level_data.spawns:
+        get_region(int(x_pos / 64), int(y_pos / 64)).add_spawn(type_id, [x_pos, y_pos])
+    return regions
+
+
+def write_level_regions(directory, level_data, region_tiles=REGION_TILES):
+    write_region_manifest(directory, level_data.level_tile_size, region_tiles)
+    region_file_names = set()
+    for (region_x, region_y), region_data in split_level_into_regions(level_data, region_tiles).items():
+        region_file_name = get_region_file_name(directory, region_x, region_y)
+        write_level_file(region_file_name, region_data)
+        region_file_names.add(region_file_name)
+
+    # regions that are empty now would otherwise keep their old files
+    for file_name in os.listdir(directory):
+        file_path = os.path.join(directory, file_name)
+        if file_name.startswith("region_") and file_name.endswith(".trl") and file_path not in region_file_names:
+            os.remove(file_path)
+
+
+def read_level_regions(directory):
+    # reads every region of a level back into one LevelData
+    level_tile_size, region_tiles = read_region_manifest(directory)
+    regions = []
+    for region_x in range(0, int((level_tile_size[0] + region_tiles - 1) / region_tiles)):
+        for region_y in range(0, int((level_tile_size[1] + region_tiles - 1) / region_tiles)):
+            region_data = read_level_region(directory, region_x, region_y)
+            if region_data is not None:
+                regions.append(([region_x * region_tiles, region_y * region_tiles], region_data))
+    level_data = join_level_regions(level_tile_size, regions)
+    for first_tile, region_data in regions:
+        for type_id, x_pos, y_pos in region_data.spawns:
+            level_data.add_spawn(type_id, [x_pos, y_pos])
+    return level_data
+
+
+def join_level_regions(level_tile_size, regions):
+    # copies the tiles of a list of (first tile, region LevelData) into one LevelData for the whole level. The
+    # regions' spawns are left for the caller, so it can keep them in whatever order it likes.
+    level_data = LevelData(level_tile_size)
+    for first_tile, region_data in regions:
+        for layer in range(0, len(region_data.layer_tile_indices)):
+            for tile_x, tile_y, tile_id, tile_angle in region_data.get_tiles(layer):
+                level_data.set_tile(layer, first_tile[0] + tile_x, first_tile[1] + tile_y, tile_id, tile_angle)
+    return level_data
@@ -0,0 +1,177 @@
+import os
+import struct
+import threading
+
+from game.level_file import write_level_file, join_level_regions
+
+# Level journals are little-endian and are a run of records, each one a record type byte followed by:
+#  - JOURNAL_TILE: layer, tile x, tile y and angle, then the tile id as a length and utf-8 bytes
+#  - JOURNAL_SPAWN: world x and world y, then the type id as a length and utf-8 bytes
+#  - JOURNAL_SPAWN_REMOVED: world x and world y
+# Every record says what a grid square holds now rather than how it changed, so replaying a journal over a level file
+# that already has its edits in leaves the level the same.
+JOURNAL_EXTENSION = ".journal"
+COMPACTING_JOURNAL_EXTENSION = ".journal.compacting"
+JOURNAL_RECORD_TYPE = struct.Struct("<B")
+JOURNAL_TILE = struct.Struct("<BIIH")
+JOURNAL_POSITION = struct.Struct("<ii")
+JOURNAL_STRING_LENGTH = struct.Struct("<H")
+
+JOURNAL_TILE_RECORD = 1
+JOURNAL_SPAWN_RECORD = 2
+JOURNAL_SPAWN_REMOVED_RECORD = 3
+
+
+class LevelJournal:
+    """
+    An append-only record of the edits made to a level since it was last saved, kept next to the level file. Edits are
+    written as they are made, so saving only has to fold them into a new level file, which is written on a background
+    thread and renamed over the old one. Until that is done the journal is moved aside rather than removed, so the
+    level is always its level file with any journals left beside it replayed on top.
+    """
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.journal_file_name = file_name + JOURNAL_EXTENSION
+        self.compacting_file_name = file_name + COMPACTING_JOURNAL_EXTENSION
+        self.journal_file = None
+        self.compaction_thread = None
+        self.compaction_error = None
+
+    def read_records(self):
+        # returns the records of any journals left by earlier runs, oldest first, as (record type, fields...). A
+        # record cut short by a crash is cut off the journal too, so new records don't end up behind it.
+        records = []
+        for journal_file_name in [self.compacting_file_name, self.journal_file_name]:
+            if os.path.isfile(journal_file_name):
+                with open(journal_file_name, "rb") as journal_file:
+                    journal = journal_file.read()
+                journal_records, journal_length = read_journal_records(journal)
+                records.extend(journal_records)
+                if journal_length < len(journal):
+                    with open(journal_file_name, "r+b") as journal_file:
+                        journal_file.truncate(journal_length)
+        return records
+
+    def record_tile(self, layer, tile_x, tile_y, tile_id, tile_angle):
+        self.write_record(JOURNAL_RECORD_TYPE.pack(JOURNAL_TILE_RECORD) +
+                          JOURNAL_TILE.pack(layer, tile_x, tile_y, tile_angle % 360) + pack_string(tile_id))
+
+    def record_spawn(self, type_id, world_position):
+        self.write_record(JOURNAL_RECORD_TYPE.pack(JOURNAL_SPAWN_RECORD) +
+                          JOURNAL_POSITION.pack(int(world_position[0]), int(world_position[1])) + pack_string(type_id))
+
+    def record_spawn_removed(self, world_position):
+        self.write_record(JOURNAL_RECORD_TYPE.pack(JOURNAL_SPAWN_REMOVED_RECORD) +
+                          JOURNAL_POSITION.pack(int(world_position[0]), int(world_position[1])))
+
+    def write_record(self, record):
+        if self.journal_file is None:
+            self.journal_file = open(self.journal_file_name, "ab")
+        self.journal_file.write(record)
+        self.journal_file.flush()
+
+    def is_compacting(self):
+        return self.compaction_thread is not None and self.compaction_thread.is_alive()
+
+    def compact(self, level_tile_size, regions, spawns):
+        # starts writing a new level file from copies of the level's regions, as (first tile, LevelData), and its
+        # spawns, as (type id, world position). Returns False if the last one is still being written; the edits are
+        # safe in the journal until the next save.
+        if self.is_compacting():
+            return False
+        self.finish_compaction()
+
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        if os.path.isfile(self.journal_file_name):
+            if os.path.isfile(self.compacting_file_name):
+                # left by a save that didn't finish, so keep its edits along with the new ones
+                with open(self.journal_file_name, "rb") as journal_file:
+                    journal = journal_file.read()
+                with open(self.compacting_file_name, "ab") as compacting_file:
+                    compacting_file.write(journal)
+                os.remove(self.journal_file_name)
+            else:
+                os.replace(self.journal_file_name, self.compacting_file_name)
+
+        self.compaction_thread = threading.Thread(target=self.write_level, args=(level_tile_size, regions, spawns),
+                                                  daemon=True)
+        self.compaction_thread.start()
+        return True
+
+    def write_level(self, level_tile_size, regions, spawns):
+        try:
+            level_data = join_level_regions(level_tile_size, regions)
+            for type_id, world_position in spawns:
+                level_data.add_spawn(type_id, world_position)
+            write_level_file(self.file_name, level_data)
+            if os.path.isfile(self.compacting_file_name):
+                os.remove(self.compacting_file_name)
+        except OSError as error:
+            self.compaction_error = error
+
+    def finish_compaction(self):
+        # waits for the level file being written. If it couldn't be written, the edits are still in the journal moved
+        # aside for it and the old level file is untouched, so the failure is reported and the next save tries again.
+        # Returns False if it failed.
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+            self.compaction_thread = None
+        if self.compaction_error is not None:
+            print("Couldn't save the level to " + self.file_name + " (" + str(self.compaction_error) +
+                  "), its edits are kept in " + self.compacting_file_name)
+            self.compaction_error = None
+            return False
+        return True
+
+    def close(self):
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        self.finish_compaction()
+
+
+def pack_string(string):
+    encoded_string = string.encode("utf-8")
+    return JOURNAL_STRING_LENGTH.pack(len(encoded_string)) + encoded_string
+
+
+def read_journal_records(journal):
+    # returns the records and how many bytes of the journal they take up, which is less than its length when the last
+    # record was cut short by a crash while it was being written. Nothing after a record that can't be read is used.
+    records = []
+    read_pos = 0
+    try:
+        while read_pos < len(journal):
+            record_start = read_pos
+            record_type = JOURNAL_RECORD_TYPE.unpack_from(journal, read_pos)[0]
+            read_pos += JOURNAL_RECORD_TYPE.size
+            if record_type == JOURNAL_TILE_RECORD:
+                layer, tile_x, tile_y, tile_angle = JOURNAL_TILE.unpack_from(journal, read_pos)
+                read_pos += JOURNAL_TILE.size
+                tile_id, read_pos = unpack_string(journal, read_pos)
+                records.append((record_type, layer, tile_x, tile_y, tile_id, tile_angle))
+            elif record_type == JOURNAL_SPAWN_RECORD:
+                x_pos, y_pos = JOURNAL_POSITION.unpack_from(journal, read_pos)
+                read_pos += JOURNAL_POSITION.size
+                type_id, read_pos = unpack_string(journal, read_pos)
+                records.append((record_type, type_id, x_pos, y_pos))
+            elif record_type == JOURNAL_SPAWN_REMOVED_RECORD:
+                x_pos, y_pos = JOURNAL_POSITION.unpack_from(journal, read_pos)
+                read_pos += JOURNAL_POSITION.size
+                records.append((record_type, x_pos, y_pos))
+            else:
+                # garbage, such as the zeroes a crash can leave at the end of a file, is treated as a torn record
+                return records, record_start
+    except (struct.error, UnicodeDecodeError):
+        return records, record_start
+    return records, read_pos
+
+
+def unpack_string(journal, read_pos):
+    string_length = JOURNAL_STRING_LENGTH.unpack_from(journal, read_pos)[0]
+    read_pos += JOURNAL_STRING_LENGTH.size
+    if read_pos + string_length > len(journal):
+        raise struct.error("string runs past the end of the journal")
+    return journal[read_pos:read_pos + string_length].decode("utf-8"), read_pos + string_length
@@ -0,0 +1,93 @@
+from array import array
+from itertools import compress
+
+from game.level_file import LevelData, EMPTY_TILE
+
+
+class LevelRegion:
+    """
+    One square region of a level - its tiles, top tiles and AI spawns. The level only keeps the regions near the
+    camera in memory when it is streamed from region files, so everything a region owns is dropped with it.
+
+    The region's tile ids and angles are held in a LevelData, in the same column by column arrays as a level file,
+    along with a collidable and a walkable mask of the ground layer. These arrays are the region's tiles; the Tile
+    sprites in 'layer_tiles' are made from them and kept in step as tiles are set.
+    """
+    def __init__(self, region_x, region_y, first_tile, region_tile_size):
+        self.region_x = region_x
+        self.region_y = region_y
+        self.first_tile = first_tile
+        self.region_tile_size = region_tile_size
+        tile_count = self.region_tile_size[0] * self.region_tile_size[1]
+        self.tile_data = LevelData(self.region_tile_size)
+        self.collidable_mask = bytearray(tile_count)
+        self.walkable_mask = bytearray(tile_count)
+        self.layer_tiles = [[None] * tile_count for layer in range(0, len(self.tile_data.layer_tile_indices))]
+        self.ai_spawns = {}  # keyed by the grid square each spawn is in
+        self.is_modified = False
+
+    def get_index(self, tile_x, tile_y):
+        # 'tile_x' and 'tile_y' are level tile positions
+        return ((tile_x - self.first_tile[0]) * self.region_tile_size[1]) + tile_y - self.first_tile[1]
+
+    def get_tile(self, tile_x, tile_y, layer):
+        return self.layer_tiles[layer][self.get_index(tile_x, tile_y)]
+
+    def get_tiles(self):
+        for layer_tiles in self.layer_tiles:
+            for tile in layer_tiles:
+                if tile is not None:
+                    yield tile
+
+    def set_tile(self, tile_x, tile_y, layer, tile):
+        # returns the tile that was there before, if any. Setting a tile that is already in place, after turning it,
+        # updates its angle.
+        index = self.get_index(tile_x, tile_y)
+        old_tile = self.layer_tiles[layer][index]
+        self.layer_tiles[layer][index] = tile
+        if tile is not None:
+            self.tile_data.layer_tile_indices[layer][index] = self.tile_data.get_string_index(tile.tile_id)
+            self.tile_data.layer_angles[layer][index] = tile.angle
+        else:
+            self.tile_data.layer_tile_indices[layer][index] = EMPTY_TILE
+            self.tile_data.layer_angles[layer][index] = 0
+        if layer == 0:
+            self.collidable_mask[index] = tile is not None and tile.collidable
+            self.walkable_mask[index] = tile is not None and not tile.collidable
+        return old_tile
+
+    def attach_tile(self, tile_x, tile_y, layer, tile):
+        # gives a tile already in the arrays its sprite
+        self.layer_tiles[layer][self.get_index(tile_x, tile_y)] = tile
+
+    def set_tile_data(self, tile_data, collidable_tile_ids):
+        # takes on the tile arrays of a region read from a file. The Tile sprites still have to be made from them.
+        self.tile_data = tile_data
+        ground_indices = self.tile_data.layer_tile_indices[0]
+        collidable_indices = set(self.tile_data.get_string_index(tile_id) for tile_id in collidable_tile_ids
+                                 if tile_id in self.tile_data.string_indices)
+        for index in range(0, len(ground_indices)):
+            if ground_indices[index] != EMPTY_TILE:
+                is_collidable = ground_indices[index] in collidable_indices
+                self.collidable_mask[index] = is_collidable
+                self.walkable_mask[index] = not is_collidable
+
+    def get_walkable_tile_positions(self):
+        # the level tile positions of the walkable ground tiles, column by column
+        for index in compress(range(0, len(self.walkable_mask)), self.walkable_mask):
+            yield (self.first_tile[0] + int(index / self.region_tile_size[1]),
+                   self.first_tile[1] + (index % self.region_tile_size[1]))
+
+    def is_walkable(self, tile_x, tile_y):
+        return self.walkable_mask[self.get_index(tile_x, tile_y)] == 1
+
+    def to_level_data(self):
+        level_data = LevelData(self.region_tile_size, len(self.tile_data.layer_tile_indices))
+        for string in self.tile_data.strings:
+            level_data.get_string_index(string)
+        for layer in range(0, len(self.tile_data.layer_tile_indices)):
+            level_data.layer_tile_indices[layer] = array('H', self.tile_data.layer_tile_indices[layer])
+            level_data.layer_angles[layer] = array('H', self.tile_data.layer_angles[layer])
+        for ai_spawn in self.ai_spawns.values():
+            level_data.add_spawn(ai_spawn.type_id, ai_spawn.world_position)
+        return level_data
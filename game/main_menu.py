@@ -1,5 +1,7 @@
 import pygame
 from game.ui_text_button import UTTextButton
+from game.asset_cache import asset_cache
+from game.text_cache import text_cache
 
 
 class MainMenu:
@@ -12,7 +14,8 @@ class MainMenu:
         self.is_run_editor_selected = False
         self.start_game = False
 
-        self.background_image = pygame.image.load("images/menu_background.png").convert()
+        self.title_colour = pygame.Color("#FFFFFF")
+        self.background_image = asset_cache.get_image("images/menu_background.png", use_alpha=False)
 
         self.play_game_button = UTTextButton([437, 465, 150, 35], "Play Game", fonts, 1)
         self.edit_map_button = UTTextButton([437, 515, 150, 35], "Edit Map", fonts, 1)
@@ -37,7 +40,7 @@ class MainMenu:
         screen.blit(self.background_image, (0, 0))  # draw the background
         
         main_menu_title_string = "Time Runs"
-        main_menu_title_text_render = fonts[2].render(main_menu_title_string, True, pygame.Color("#FFFFFF"))
+        main_menu_title_text_render = text_cache.render(fonts[2], main_menu_title_string, self.title_colour)
         screen.blit(main_menu_title_text_render,
                     main_menu_title_text_render.get_rect(centerx=screen_data.screen_size[0] * 0.5,
                                                          centery=128))
@@ -3,6 +3,7 @@ import pygame
 from pygame.locals import *
 
 from game.tile import Tile, AISpawn
+from game.asset_cache import asset_cache
 from game.map_editor_instructions_window import MapEditorInstructionsWindow
 
 
@@ -10,7 +11,7 @@ class RemoveGuardIcon(pygame.sprite.Sprite):
     def __init__(self, position, *groups):
         super().__init__(*groups)
         self.position = position
-        self.image = pygame.image.load("images/remove_guard_icon.png").convert_alpha()
+        self.image = asset_cache.get_image("images/remove_guard_icon.png")
         self.rect = self.image.get_rect()
         self.rect.center = self.position
 
@@ -45,7 +46,6 @@ class MapEditor:
         self.rotate_selected_tile_right = False
 
         self.all_palette_tile_sprites = pygame.sprite.Group()
-        self.all_ai_spawn_sprites = pygame.sprite.Group()
 
         self.palette_page = 0
         self.should_increase_palette_page = False
@@ -98,8 +98,8 @@ class MapEditor:
                 display_tile < (self.palette_page * self.tiles_per_page) + self.tiles_per_page:
             if display_tile < len(sorted_tile_keys):
                 tile_data = sorted_tile_keys[display_tile]
-                self.palette_tiles.append(Tile([self.hud_rect[0] + x_pos,
-                                                self.hud_rect[1] + y_pos], 0, self.tiled_level.all_tile_data[tile_data],
+                self.palette_tiles.append(Tile([self.hud_rect[0] + x_pos, self.hud_rect[1] + y_pos],
+                                               self.tiled_level.tile_variants.get_variant(tile_data, 0),
                                                self.editing_layer))  # add editing layer here
                 display_tile += 1
             else:
@@ -128,7 +128,7 @@ class MapEditor:
         for ai_spawn in self.palette_ai_spawns:
             self.all_palette_tile_sprites.add(ai_spawn)
 
-    def run(self, screen, background, all_tile_sprites, hud_rect, time_delta):
+    def run(self, screen, background, hud_rect, time_delta):
         running = True
         for event in pygame.event.get():
             if self.map_editor_instructions is not None:
@@ -227,12 +227,12 @@ class MapEditor:
                 
         if self.rotate_selected_tile_right and self.held_tile_data[4] is not None:
             self.rotate_selected_tile_right = False
-            self.held_tile_data[4].rotate_tile_right()
+            self.tiled_level.rotate_tile(self.held_tile_data[4], -90)
             self.need_to_refresh_tiles = True
 
         if self.rotate_selected_tile_left and self.held_tile_data[4] is not None:
             self.rotate_selected_tile_left = False
-            self.held_tile_data[4].rotate_tile_left()
+            self.tiled_level.rotate_tile(self.held_tile_data[4], 90)
             self.need_to_refresh_tiles = True
         
         if self.left_mouse_held:
@@ -271,18 +271,14 @@ class MapEditor:
                 elif self.right_click_mode == "remove_ai":
                     self.tiled_level.remove_ai_spawn_at_pos(click_pos)
 
-        if self.tiled_level.update_offset_position(self.map_position, all_tile_sprites):
+        if self.tiled_level.update_offset_position(self.map_position):
             self.need_to_refresh_tiles = True
-                
-        self.all_ai_spawn_sprites.empty()
-        for ai_spawn in self.tiled_level.ai_spawns:
-            self.all_ai_spawn_sprites.add(ai_spawn)
 
         self.hovered_rec = self.tiled_level.get_tile_data_at_pos(pygame.mouse.get_pos(), self.editing_layer)[0]
 
         screen.blit(background, (0, 0))  # draw the background
-        all_tile_sprites.draw(screen)
-        self.all_ai_spawn_sprites.draw(screen)
+        self.tiled_level.tile_chunks.draw(screen, self.tiled_level.position_offset, [0, 0])
+        self.tiled_level.draw_ai_spawns(screen)
 
         if self.held_tile_data is not None:
             if not self.held_tile_data[3]:
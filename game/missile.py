@@ -4,6 +4,8 @@ import pygame
 from game.projectile import Projectile
 from game.explosion import Explosion
 from game.damage import DamageType
+from game.asset_cache import asset_cache
+from game.rotation_cache import rotation_cache
 
 
 class Missile(Projectile):
@@ -12,18 +14,19 @@ class Missile(Projectile):
         self.is_ai_bullet = is_ai_bullet
         self.explosions_sprite_sheet = explosions_sprite_sheet
         self.image_name = "images/missile.png"
-        self.original_image = pygame.image.load(self.image_name).convert_alpha()
-        self.image = self.original_image.copy()
+        self.original_image = asset_cache.get_image(self.image_name)
+        self.image = self.original_image
         self.sprite = pygame.sprite.Sprite()
        
         self.sprite.rect = self.image.get_rect()
-        self.world_rect = self.sprite.rect.copy()
         self.sprite.rect.center = start_pos
+        self.world_rect = self.sprite.rect.copy()  # where the projectile is in the level, for tile collisions
 
         self.current_vector = [initial_heading_vector[0], initial_heading_vector[1]]
 
         self.position = [float(self.sprite.rect.center[0]), float(self.sprite.rect.center[1])]
         self.world_position = [float(self.sprite.rect.center[0]), float(self.sprite.rect.center[1])]
+        self.previous_position = [self.world_position[0], self.world_position[1]]
         self.sprite.image = self.image
 
         self.should_die = False
@@ -43,22 +46,22 @@ class Missile(Projectile):
         all_bullet_sprites.add(self.sprite)
         return all_bullet_sprites
 
-    def update_movement_and_collision(self, tiled_level, collideable_tiles, players, monsters,
+    def update_movement_and_collision(self, tiled_level, player_hash, monster_hash,
                                       time_delta, time_multiplier, new_explosions, explosions):
+        self.previous_position[0] = self.world_position[0]
+        self.previous_position[1] = self.world_position[1]
+
         if self.is_ai_bullet:
-            for player in players:
+            for player in player_hash.query_rect(self.sprite.rect):
                 if player.test_projectile_collision(self.sprite.rect):
                     self.should_die = True
         else:
-            for monster in monsters:
+            for monster in monster_hash.query_rect(self.sprite.rect):
                 if monster.test_projectile_collision(self.sprite.rect):
                     self.should_die = True
 
-        for tile_x in range(tiled_level.zero_tile_x, tiled_level.end_tile_x):
-            for tile_y in range(tiled_level.zero_tile_y, tiled_level.end_tile_y):
-                tile = tiled_level.tile_grid[tile_x][tile_y]
-                if tile.test_projectile_collision(self.sprite.rect):
-                    self.should_die = True
+        if tiled_level.collision_index.is_rect_blocked(self.world_rect):
+            self.should_die = True
 
         self.shot_range -= time_delta * time_multiplier * self.bullet_speed
         self.world_position[0] += (self.current_vector[0] * time_delta * time_multiplier * self.bullet_speed)
@@ -81,7 +84,7 @@ class Missile(Projectile):
         facing_angle = math.atan2(-unit_dir_vector[0], -unit_dir_vector[1])*180/math.pi
 
         bullet_centre_position = self.sprite.rect.center
-        self.image = pygame.transform.rotate(self.original_image, facing_angle)
+        self.image = rotation_cache.get_rotated(self.original_image, facing_angle)
         self.sprite.rect = self.image.get_rect()
         self.sprite.rect.center = bullet_centre_position
 
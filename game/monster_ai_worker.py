@@ -0,0 +1,333 @@
+import math
+from multiprocessing import Process, Pipe, shared_memory
+
+# Layout of the shared memory blocks, all of them arrays of doubles apart from the line of sight mask:
+#  - world:    player x, player y, player alive (1.0 or 0.0), los mask origin x, los mask origin y, los mask version
+#  - monsters: x, y, active (1.0 or 0.0) for each monster slot
+#  - intents:  aim x, aim y, engaged (1.0 or 0.0), has line of sight (1.0 or 0.0) for each monster slot
+#  - los mask: one byte per LOS_CELL_SIZE square of a window of the level's regions around the player, row by row,
+#              1 where a collision rectangle blocks line of sight. The window's world position is its origin, and
+#              the version goes up each time the mask is redrawn or moved.
+WORLD_FIELDS = 6
+MONSTER_FIELDS = 3
+INTENT_FIELDS = 4
+DOUBLE_SIZE = 8
+
+LOS_CELL_SIZE = 8
+# a monster's line of sight is only checked again once it or the player has moved into another square this size,
+# or the mask has changed
+LOS_REUSE_CELL_SIZE = 16
+LOS_SAMPLE_STEP = 4.0
+LOS_RANGE = 550.0
+ENGAGE_RANGE = 512.0
+DISENGAGE_RANGE = 700.0
+
+
+class MonsterAIWorker:
+    """
+    Runs the guards' decisions - how far away the player is, whether to engage them, where to aim and line of sight
+    checks - in another process. Each step the worker is handed the monster and player positions through shared
+    memory and writes back an intent for each monster, which the monsters act on one step later.
+    """
+    def __init__(self, tiled_level, max_monsters=256):
+        self.max_monsters = max_monsters
+
+        # line of sight is only checked within LOS_RANGE of the player, so the mask only has to cover the regions
+        # that far around the player's region, however big the level is. The window moves a region at a time.
+        self.region_tiles = tiled_level.region_tiles
+        self.region_pixel_size = self.region_tiles * 64
+        self.level_tile_size = tiled_level.level_tile_size
+        self.level_region_count = [int(math.ceil(self.level_tile_size[0] / self.region_tiles)),
+                                   int(math.ceil(self.level_tile_size[1] / self.region_tiles))]
+        self.los_window_radius = int(math.ceil(LOS_RANGE / self.region_pixel_size))
+        self.los_window_regions = [min((self.los_window_radius * 2) + 1, self.level_region_count[0]),
+                                   min((self.los_window_radius * 2) + 1, self.level_region_count[1])]
+        self.los_mask_size = [int(min(self.los_window_regions[0] * self.region_pixel_size,
+                                      tiled_level.level_pixel_size[0]) / LOS_CELL_SIZE),
+                              int(min(self.los_window_regions[1] * self.region_pixel_size,
+                                      tiled_level.level_pixel_size[1]) / LOS_CELL_SIZE)]
+        self.los_window_origin = self.get_los_window_origin(
+            [tiled_level.position_offset[0] + (tiled_level.screen_data.play_area[0] / 2),
+             tiled_level.position_offset[1] + (tiled_level.screen_data.play_area[1] / 2)])
+
+        self.world_memory = shared_memory.SharedMemory(create=True, size=WORLD_FIELDS * DOUBLE_SIZE)
+        self.monster_memory = shared_memory.SharedMemory(create=True,
+                                                         size=self.max_monsters * MONSTER_FIELDS * DOUBLE_SIZE)
+        self.intent_memory = shared_memory.SharedMemory(create=True,
+                                                        size=self.max_monsters * INTENT_FIELDS * DOUBLE_SIZE)
+        self.los_mask_memory = shared_memory.SharedMemory(create=True,
+                                                          size=self.los_mask_size[0] * self.los_mask_size[1])
+        self.world_data = self.world_memory.buf.cast('d')
+        self.monster_data = self.monster_memory.buf.cast('d')
+        self.intent_data = self.intent_memory.buf.cast('d')
+        for index in range(0, len(self.monster_data)):
+            self.monster_data[index] = 0.0
+        for index in range(0, len(self.intent_data)):
+            self.intent_data[index] = 0.0
+
+        self.world_data[5] = 0.0
+        self.build_los_mask(tiled_level)
+        self.world_data[3] = self.los_window_origin[0] * self.region_pixel_size
+        self.world_data[4] = self.los_window_origin[1] * self.region_pixel_size
+
+        self.slot_monsters = [None] * self.max_monsters
+        self.free_slots = list(range(self.max_monsters - 1, -1, -1))
+        self.slot_has_intent = [False] * self.max_monsters
+        self.request_pending = False
+
+        self.connection, worker_connection = Pipe()
+        self.process = Process(target=run_monster_ai_worker,
+                               args=(worker_connection, self.world_memory, self.monster_memory,
+                                     self.intent_memory, self.los_mask_memory, self.max_monsters,
+                                     self.los_mask_size),
+                               daemon=True)
+        self.process.start()
+
+    def get_los_window_origin(self, world_position):
+        # the first region of the window of the mask around a world position, kept inside the level
+        origin = []
+        for axis in range(0, 2):
+            region = int(world_position[axis] / self.region_pixel_size) - self.los_window_radius
+            origin.append(max(0, min(self.level_region_count[axis] - self.los_window_regions[axis], region)))
+        return origin
+
+    def get_los_mask_origin(self):
+        # the window's first cell, in the cells of the whole level
+        cells_per_region = int(self.region_pixel_size / LOS_CELL_SIZE)
+        return [self.los_window_origin[0] * cells_per_region, self.los_window_origin[1] * cells_per_region]
+
+    def is_region_in_los_window(self, region_x, region_y):
+        return (self.los_window_origin[0] <= region_x < self.los_window_origin[0] + self.los_window_regions[0] and
+                self.los_window_origin[1] <= region_y < self.los_window_origin[1] + self.los_window_regions[1])
+
+    def build_los_mask(self, tiled_level):
+        # a level baked by bake_level.py comes with the mask of the whole level worked out, which is this mask when
+        # the window takes in the whole level
+        los_mask = self.los_mask_memory.buf
+        self.world_data[5] += 1.0
+        baked_level = tiled_level.get_baked_level()
+        if baked_level is not None and baked_level.los_mask_size == self.los_mask_size:
+            los_mask[:] = baked_level.los_mask
+            return
+        los_mask[:] = bytes(len(los_mask))
+        los_mask_origin = self.get_los_mask_origin()
+        for shapes in tiled_level.collision_index.tile_shapes.values():
+            for shape in shapes:
+                mark_los_shape(los_mask, self.los_mask_size, los_mask_origin, shape)
+
+    def move_los_window(self, tiled_level, window_origin):
+        # regions in both the old and the new window keep their part of the mask, the rest are drawn from the
+        # collision shapes of the regions in memory
+        old_los_mask = bytes(self.los_mask_memory.buf)
+        old_window_origin = self.los_window_origin
+        old_los_mask_origin = self.get_los_mask_origin()
+        self.los_window_origin = window_origin
+        cells_per_region = int(self.region_pixel_size / LOS_CELL_SIZE)
+        for region_x in range(window_origin[0], window_origin[0] + self.los_window_regions[0]):
+            for region_y in range(window_origin[1], window_origin[1] + self.los_window_regions[1]):
+                if (old_window_origin[0] <= region_x < old_window_origin[0] + self.los_window_regions[0] and
+                        old_window_origin[1] <= region_y < old_window_origin[1] + self.los_window_regions[1]):
+                    self.copy_los_region(old_los_mask, old_los_mask_origin, region_x * cells_per_region,
+                                         region_y * cells_per_region, cells_per_region)
+                else:
+                    self.draw_los_region(tiled_level, region_x, region_y)
+        self.world_data[3] = self.los_window_origin[0] * self.region_pixel_size
+        self.world_data[4] = self.los_window_origin[1] * self.region_pixel_size
+        self.world_data[5] += 1.0
+
+    def copy_los_region(self, old_los_mask, old_los_mask_origin, first_cell_x, first_cell_y, cells_per_region):
+        # 'first_cell_x' and 'first_cell_y' are in the cells of the whole level
+        los_mask = self.los_mask_memory.buf
+        los_mask_origin = self.get_los_mask_origin()
+        cells_wide = min(cells_per_region, los_mask_origin[0] + self.los_mask_size[0] - first_cell_x)
+        for cell_y in range(first_cell_y, min(first_cell_y + cells_per_region,
+                                              los_mask_origin[1] + self.los_mask_size[1])):
+            row_start = ((cell_y - los_mask_origin[1]) * self.los_mask_size[0]) + first_cell_x - los_mask_origin[0]
+            old_row_start = (((cell_y - old_los_mask_origin[1]) * self.los_mask_size[0]) +
+                             first_cell_x - old_los_mask_origin[0])
+            los_mask[row_start:row_start + cells_wide] = old_los_mask[old_row_start:old_row_start + cells_wide]
+
+    def draw_los_region(self, tiled_level, region_x, region_y):
+        # clears a region's part of the mask, then marks the shapes of its tiles. A region that isn't in memory yet
+        # is drawn when it comes in.
+        los_mask = self.los_mask_memory.buf
+        los_mask_origin = self.get_los_mask_origin()
+        first_tile = [region_x * self.region_tiles, region_y * self.region_tiles]
+        last_tile = [min(self.level_tile_size[0], first_tile[0] + self.region_tiles),
+                     min(self.level_tile_size[1], first_tile[1] + self.region_tiles)]
+        first_cell_x = int((first_tile[0] * 64) / LOS_CELL_SIZE) - los_mask_origin[0]
+        last_cell_x = min(self.los_mask_size[0], int((last_tile[0] * 64) / LOS_CELL_SIZE) - los_mask_origin[0])
+        for cell_y in range(int((first_tile[1] * 64) / LOS_CELL_SIZE) - los_mask_origin[1],
+                            min(self.los_mask_size[1], int((last_tile[1] * 64) / LOS_CELL_SIZE) - los_mask_origin[1])):
+            row_start = cell_y * self.los_mask_size[0]
+            los_mask[row_start + first_cell_x:row_start + last_cell_x] = bytes(last_cell_x - first_cell_x)
+        tile_shapes = tiled_level.collision_index.tile_shapes
+        for tile_x in range(first_tile[0], last_tile[0]):
+            for tile_y in range(first_tile[1], last_tile[1]):
+                for shape in tile_shapes.get((tile_x, tile_y), ()):
+                    mark_los_shape(los_mask, self.los_mask_size, los_mask_origin, shape)
+
+    def on_region_added(self, tiled_level, region):
+        # a region of a streamed level has come in, so its part of the mask is redrawn if it is in the window
+        if not self.is_region_in_los_window(region.region_x, region.region_y):
+            return
+        if self.request_pending:
+            self.connection.recv()
+            self.request_pending = False
+        self.draw_los_region(tiled_level, region.region_x, region.region_y)
+        self.world_data[5] += 1.0
+
+    def update(self, tiled_level, monsters, player):
+        # wait for the worker to finish with the last step's positions before touching the shared memory
+        if self.request_pending:
+            self.connection.recv()
+            self.request_pending = False
+
+        window_origin = self.get_los_window_origin(player.position)
+        if window_origin != self.los_window_origin:
+            self.move_los_window(tiled_level, window_origin)
+
+        for slot, monster in enumerate(self.slot_monsters):
+            if monster is not None and monster.should_die:
+                self.release_slot(slot)
+
+        for monster in monsters:
+            if monster.ai_slot is None:
+                if len(self.free_slots) == 0:
+                    continue  # the worker is full, so this monster keeps thinking for itself
+                monster.ai_slot = self.free_slots.pop()
+                self.slot_monsters[monster.ai_slot] = monster
+                self.slot_has_intent[monster.ai_slot] = False
+                intent_start = monster.ai_slot * INTENT_FIELDS
+                for field in range(0, INTENT_FIELDS):
+                    self.intent_data[intent_start + field] = 0.0
+            elif self.slot_has_intent[monster.ai_slot]:
+                intent_start = monster.ai_slot * INTENT_FIELDS
+                monster.apply_ai_intent(self.intent_data[intent_start + 2] > 0.5,
+                                        [self.intent_data[intent_start], self.intent_data[intent_start + 1]],
+                                        self.intent_data[intent_start + 3] > 0.5)
+
+            monster_start = monster.ai_slot * MONSTER_FIELDS
+            self.monster_data[monster_start] = monster.position[0]
+            self.monster_data[monster_start + 1] = monster.position[1]
+            self.monster_data[monster_start + 2] = 1.0
+            self.slot_has_intent[monster.ai_slot] = True
+
+        self.world_data[0] = player.position[0]
+        self.world_data[1] = player.position[1]
+        self.world_data[2] = 0.0 if player.should_die else 1.0
+
+        self.connection.send(True)
+        self.request_pending = True
+
+    def release_slot(self, slot):
+        self.slot_monsters[slot].ai_slot = None
+        self.slot_monsters[slot] = None
+        self.monster_data[slot * MONSTER_FIELDS + 2] = 0.0
+        self.free_slots.append(slot)
+
+    def release_all_slots(self):
+        if self.request_pending:
+            self.connection.recv()
+            self.request_pending = False
+        for slot, monster in enumerate(self.slot_monsters):
+            if monster is not None:
+                self.release_slot(slot)
+
+    def close(self):
+        self.release_all_slots()
+        self.connection.send(None)
+        self.process.join()
+
+        self.world_data.release()
+        self.monster_data.release()
+        self.intent_data.release()
+        for memory in [self.world_memory, self.monster_memory, self.intent_memory, self.los_mask_memory]:
+            memory.close()
+            memory.unlink()
+
+
+def run_monster_ai_worker(connection, world_memory, monster_memory, intent_memory, los_mask_memory,
+                          max_monsters, los_mask_size):
+    world_data = world_memory.buf.cast('d')
+    monster_data = monster_memory.buf.cast('d')
+    intent_data = intent_memory.buf.cast('d')
+    los_mask = los_mask_memory.buf
+    # what each slot's line of sight was last worked out from, and what it was
+    los_keys = [None] * max_monsters
+    los_results = [False] * max_monsters
+
+    while connection.recv() is not None:
+        player_position = [world_data[0], world_data[1]]
+        player_alive = world_data[2] > 0.5
+        los_mask_origin = [world_data[3], world_data[4]]
+        player_los_key = (int(player_position[0] // LOS_REUSE_CELL_SIZE),
+                          int(player_position[1] // LOS_REUSE_CELL_SIZE), world_data[5])
+        for slot in range(0, max_monsters):
+            monster_start = slot * MONSTER_FIELDS
+            if monster_data[monster_start + 2] < 0.5:
+                los_keys[slot] = None
+                continue
+            intent_start = slot * INTENT_FIELDS
+            is_engaged = intent_data[intent_start + 2] > 0.5
+            has_line_of_sight = False
+            if player_alive:
+                x_dist = player_position[0] - monster_data[monster_start]
+                y_dist = player_position[1] - monster_data[monster_start + 1]
+                distance_to_player = math.sqrt((x_dist * x_dist) + (y_dist * y_dist))
+
+                if not is_engaged and distance_to_player < ENGAGE_RANGE:
+                    is_engaged = True
+                elif is_engaged and distance_to_player > DISENGAGE_RANGE:
+                    is_engaged = False
+
+                if is_engaged and distance_to_player > 0.0:
+                    intent_data[intent_start] = x_dist / distance_to_player
+                    intent_data[intent_start + 1] = y_dist / distance_to_player
+
+                if distance_to_player < LOS_RANGE:
+                    los_key = (int(monster_data[monster_start] // LOS_REUSE_CELL_SIZE),
+                               int(monster_data[monster_start + 1] // LOS_REUSE_CELL_SIZE), player_los_key)
+                    if los_keys[slot] != los_key:
+                        los_keys[slot] = los_key
+                        los_results[slot] = is_line_clear(los_mask, los_mask_size, los_mask_origin,
+                                                          [monster_data[monster_start],
+                                                           monster_data[monster_start + 1]],
+                                                          player_position)
+                    has_line_of_sight = los_results[slot]
+            intent_data[intent_start + 2] = 1.0 if is_engaged else 0.0
+            intent_data[intent_start + 3] = 1.0 if has_line_of_sight else 0.0
+        connection.send(True)
+
+    world_data.release()
+    monster_data.release()
+    intent_data.release()
+
+
+def mark_los_shape(los_mask, los_mask_size, los_mask_origin, shape):
+    # only rectangles block line of sight. 'los_mask_origin' is the mask's first cell in the cells of the whole level.
+    if shape[0] == "rect":
+        min_x = int(shape[1].left / LOS_CELL_SIZE) - los_mask_origin[0]
+        min_y = int(shape[1].top / LOS_CELL_SIZE) - los_mask_origin[1]
+        max_x = int(math.ceil(shape[1].right / LOS_CELL_SIZE)) - los_mask_origin[0]
+        max_y = int(math.ceil(shape[1].bottom / LOS_CELL_SIZE)) - los_mask_origin[1]
+        for cell_y in range(max(0, min_y), min(los_mask_size[1], max_y)):
+            row_start = cell_y * los_mask_size[0]
+            for cell_x in range(max(0, min_x), min(los_mask_size[0], max_x)):
+                los_mask[row_start + cell_x] = 1
+
+
+def is_line_clear(los_mask, los_mask_size, los_mask_origin, start_pos, end_pos):
+    # 'los_mask_origin' is the world position of the mask's first cell. Anywhere off the mask counts as clear.
+    x_dist = end_pos[0] - start_pos[0]
+    y_dist = end_pos[1] - start_pos[1]
+    distance = math.sqrt((x_dist * x_dist) + (y_dist * y_dist))
+    samples = int(distance / LOS_SAMPLE_STEP) + 1
+    for sample in range(0, samples + 1):
+        fraction = sample / samples
+        cell_x = int((start_pos[0] + (x_dist * fraction) - los_mask_origin[0]) / LOS_CELL_SIZE)
+        cell_y = int((start_pos[1] + (y_dist * fraction) - los_mask_origin[1]) / LOS_CELL_SIZE)
+        if 0 <= cell_x < los_mask_size[0] and 0 <= cell_y < los_mask_size[1]:
+            if los_mask[(cell_y * los_mask_size[0]) + cell_x] != 0:
+                return False
+    return True
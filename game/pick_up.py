@@ -1,15 +1,17 @@
 import pygame
 import random
 
+from game.asset_cache import asset_cache
+
 
 class PickUpSpawner:
     def __init__(self, pick_ups, all_pick_up_sprites):
         self.pick_ups = pick_ups
         self.allPickUpSprites = all_pick_up_sprites
-        self.shotgun_ammo_image = pygame.image.load("images/pick_ups/shotgun_ammo.png")
-        self.launcher_ammo_image = pygame.image.load("images/pick_ups/launcher_ammo.png")
-        self.health_image = pygame.image.load("images/pick_ups/health.png")
-        self.time_crystal = pygame.image.load("images/pick_ups/time_crystal.png")
+        self.shotgun_ammo_image = asset_cache.get_image("images/pick_ups/shotgun_ammo.png")
+        self.launcher_ammo_image = asset_cache.get_image("images/pick_ups/launcher_ammo.png")
+        self.health_image = asset_cache.get_image("images/pick_ups/health.png")
+        self.time_crystal = asset_cache.get_image("images/pick_ups/time_crystal.png")
 
     def try_spawn(self, spawn_position):
         random_roll = random.randint(0, 100)
@@ -5,6 +5,9 @@ from pygame.locals import *
 from game.rifle_weapon import RifleWeapon
 from game.shotgun_weapon import ShotgunWeapon
 from game.launcher_weapon import LauncherWeapon
+from game.asset_cache import asset_cache
+from game.rotation_cache import rotation_cache
+from game.flash_cache import flash_cache
 
 
 class Scheme:
@@ -26,8 +29,8 @@ class Player(pygame.sprite.Sprite):
         self.scheme = control_scheme
         self.image_name = "images/player.png"
         self.explosions_sprite_sheet = explosions_sprite_sheet
-        self.original_image = pygame.image.load(self.image_name).convert_alpha()
-        self.sprite_sheet = self.original_image.copy()
+        self.original_image = asset_cache.get_image(self.image_name)
+        self.sprite_sheet = self.original_image
 
         self.hud_buttons = hud_buttons
 
@@ -68,6 +71,7 @@ class Player(pygame.sprite.Sprite):
         self.move_accumulator = 0.0
        
         self.position = [float(self.rect.center[0]), float(self.rect.center[1])]
+        self.previous_position = [self.position[0], self.position[1]]
         self.player_move_target = self.position
         self.distance_to_move_target = 0.0
         self.current_vector = [0.0, -1.0]
@@ -111,6 +115,7 @@ class Player(pygame.sprite.Sprite):
         self.sprite_flash_acc = 0.0
         self.sprite_flash_time = 0.15
         self.should_flash_sprite = False
+        self.active_flash_sprite = False
 
         self.is_collided = False
 
@@ -210,23 +215,27 @@ class Player(pygame.sprite.Sprite):
             if self.sprite_flash_acc > self.sprite_flash_time:
                 self.sprite_flash_acc = 0.0
                 self.should_flash_sprite = False
+                all_sprites.remove(self.flash_sprite)
+                self.active_flash_sprite = False
             else:
                 lerp_value = self.sprite_flash_acc / self.sprite_flash_time
-                flash_alpha = self.lerp(255, 0, lerp_value)
-                flash_image = self.image.copy()
-                flash_image.fill((0, 0, 0, flash_alpha), None, pygame.BLEND_RGBA_MULT)
-                flash_image.fill((255, 255, 255, 0), None, pygame.BLEND_RGBA_ADD)
-                self.flash_sprite.image = flash_image
+                self.flash_sprite.image = flash_cache.get_flash_image(self.image, lerp_value)
                 self.flash_sprite.rect = self.flash_sprite.image.get_rect()
                 sprite_x_pos = self.screen_position[0]
                 sprite_y_pos = self.screen_position[1] + self.sprite_rot_centre_offset[1]
                 self.flash_sprite.rect.center = self.rot_point([sprite_x_pos,
                                                                 sprite_y_pos],
                                                                self.screen_position, -self.new_facing_angle)
-                all_sprites.add(self.flash_sprite)
+                if not self.active_flash_sprite:
+                    all_sprites.add(self.flash_sprite)
+                    self.active_flash_sprite = True
         return all_sprites
 
-    def update_movement_and_collision(self, time_delta, projectiles, tiled_level, monsters, new_explosions):
+    def update_movement_and_collision(self, time_delta, projectiles, tiled_level, monsters, new_explosions,
+                                      mouse_rel_move):
+        self.previous_position[0] = self.position[0]
+        self.previous_position[1] = self.position[1]
+
         if self.time_crystal_active:
             self.time_crystal_acc += time_delta
             if self.time_crystal_acc >= self.time_crystal_time:
@@ -250,7 +259,7 @@ class Player(pygame.sprite.Sprite):
                 else:
                     button.clear_selected()
 
-            self.image = pygame.transform.rotate(self.active_weapon.anim_set.stand, self.new_facing_angle)
+            self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.stand, self.new_facing_angle)
             self.rect = self.image.get_rect()
             self.rect.center = self.rot_point([self.screen_position[0],
                                                self.screen_position[1] + self.sprite_rot_centre_offset[1]],
@@ -266,7 +275,7 @@ class Player(pygame.sprite.Sprite):
                 else:
                     button.clear_selected()
 
-            self.image = pygame.transform.rotate(self.active_weapon.anim_set.stand, self.new_facing_angle)
+            self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.stand, self.new_facing_angle)
             self.rect = self.image.get_rect()
             self.rect.center = self.rot_point([self.screen_position[0],
                                                self.screen_position[1] + self.sprite_rot_centre_offset[1]],
@@ -282,7 +291,7 @@ class Player(pygame.sprite.Sprite):
                 else:
                     button.clear_selected()
 
-            self.image = pygame.transform.rotate(self.active_weapon.anim_set.stand, self.new_facing_angle)
+            self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.stand, self.new_facing_angle)
             self.rect = self.image.get_rect()
             self.rect.center = self.rot_point([self.screen_position[0],
                                                self.screen_position[1] + self.sprite_rot_centre_offset[1]],
@@ -300,7 +309,6 @@ class Player(pygame.sprite.Sprite):
         if fire_this_update:
             self.active_weapon.fire(projectiles)
 
-        mouse_rel_move = pygame.mouse.get_rel()
         self.new_facing_angle = self.new_facing_angle - (mouse_rel_move[0] * self.rotate_speed)
         if self.new_facing_angle > 360:
             self.new_facing_angle = -360
@@ -347,7 +355,6 @@ class Player(pygame.sprite.Sprite):
             test_screen_position[0] = test_move_position[0] - tiled_level.position_offset[0]
             test_screen_position[1] = test_move_position[1] - tiled_level.position_offset[1]
 
-            self.test_collision_sprite.image = pygame.transform.rotate(self.original_image, self.new_facing_angle)
             self.test_collision_sprite.rect = self.image.get_rect()
             test_coll_sprite_x_pos = test_screen_position[0]
             test_coll_sprite_y_pos = test_screen_position[1] + self.sprite_rot_centre_offset[1]
@@ -355,23 +362,15 @@ class Player(pygame.sprite.Sprite):
                                                                      test_coll_sprite_y_pos],
                                                                     test_screen_position, -self.new_facing_angle)
             collided = False
-            collided_obj_pos = [0, 0]
-
-            for tile_x in range(tiled_level.zero_tile_x, tiled_level.end_tile_x):
-                for tile_y in range(tiled_level.zero_tile_y, tiled_level.end_tile_y):
-                    tile = tiled_level.tile_grid[tile_x][tile_y]
-                    collision_data = self.test_tile_collision(self.test_collision_sprite.rect,
-                                                              test_screen_position, tile)
-                    if collision_data[0]:
-                        collided = True
-                        if len(collision_data[1]) > 0:
-                            collided_obj_pos[0] = collision_data[1][0][0] + tiled_level.position_offset[0]
-                            collided_obj_pos[1] = collision_data[1][0][1] + tiled_level.position_offset[1]
-
-                        for col_point in collision_data[1]:
-                            collision_obj_rect = pygame.Rect(0.0, 0.0, 2.0, 2.0)
-                            collision_obj_rect.center = col_point
-                            self.collision_obj_rects.append(collision_obj_rect)
+
+            for shape in tiled_level.collision_index.query_circle(test_move_position, self.collide_radius):
+                collision_data = self.is_intersecting_shape(shape, test_move_position)
+                if collision_data[0]:
+                    collided = True
+                    for col_point in collision_data[1]:
+                        collision_obj_rect = pygame.Rect(0.0, 0.0, 2.0, 2.0)
+                        collision_obj_rect.center = col_point
+                        self.collision_obj_rects.append(collision_obj_rect)
                             
             for monster in monsters:
                 if self.test_monster_collision(self.test_collision_sprite.rect, monster):
@@ -401,34 +400,34 @@ class Player(pygame.sprite.Sprite):
             self.update_screen_position(tiled_level.position_offset)
                 
             if abs(self.move_accumulator) > 64.0:
-                self.image = pygame.transform.rotate(self.active_weapon.anim_set.stand, self.new_facing_angle)
+                self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.stand, self.new_facing_angle)
                 self.rect = self.image.get_rect()
                 self.rect.center = self.rot_point([self.screen_position[0],
                                                    self.screen_position[1] + self.sprite_rot_centre_offset[1]],
                                                   self.screen_position, -self.new_facing_angle)
                 self.move_accumulator = 0.0
             elif abs(self.move_accumulator) > 48.0:
-                self.image = pygame.transform.rotate(self.active_weapon.anim_set.step_left,
-                                                     self.new_facing_angle)
+                self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.step_left,
+                                                        self.new_facing_angle)
                 self.rect = self.image.get_rect()
                 self.rect.center = self.rot_point([self.screen_position[0],
                                                    self.screen_position[1] + self.sprite_rot_centre_offset[1]],
                                                   self.screen_position, -self.new_facing_angle)
             elif abs(self.move_accumulator) > 32.0:
-                self.image = pygame.transform.rotate(self.active_weapon.anim_set.stand, self.new_facing_angle)
+                self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.stand, self.new_facing_angle)
                 self.rect = self.image.get_rect()
                 self.rect.center = self.rot_point([self.screen_position[0],
                                                    self.screen_position[1] + self.sprite_rot_centre_offset[1]],
                                                   self.screen_position, -self.new_facing_angle)
             elif abs(self.move_accumulator) > 16.0:
-                self.image = pygame.transform.rotate(self.active_weapon.anim_set.step_right,
-                                                     self.new_facing_angle)
+                self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.step_right,
+                                                        self.new_facing_angle)
                 self.rect = self.image.get_rect()
                 self.rect.center = self.rot_point([self.screen_position[0],
                                                    self.screen_position[1] + self.sprite_rot_centre_offset[1]],
                                                   self.screen_position, -self.new_facing_angle)
             else:
-                self.image = pygame.transform.rotate(self.active_weapon.anim_set.stand, self.new_facing_angle)
+                self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.stand, self.new_facing_angle)
                 self.rect = self.image.get_rect()
                 self.rect.center = self.rot_point([self.screen_position[0],
                                                    self.screen_position[1] + self.sprite_rot_centre_offset[1]],
@@ -439,7 +438,7 @@ class Player(pygame.sprite.Sprite):
             self.speed = 0.0
             self.strafe_speed = 0.0
             self.total_speed = 0.0
-            self.image = pygame.transform.rotate(self.active_weapon.anim_set.stand, self.new_facing_angle)
+            self.image = rotation_cache.get_rotated(self.active_weapon.anim_set.stand, self.new_facing_angle)
             self.rect = self.image.get_rect()
             self.rect.center = self.rot_point([self.screen_position[0],
                                                self.screen_position[1] + self.sprite_rot_centre_offset[1]],
@@ -448,8 +447,8 @@ class Player(pygame.sprite.Sprite):
     def handle_collision(self, collision_obj_rects, test_move_position, tiled_level, monsters):
         test_move_position = test_move_position
         if len(collision_obj_rects) > 0:
-            collision_vec = [self.screen_position[0] - collision_obj_rects[0][0],
-                             self.screen_position[1] - collision_obj_rects[0][1]]
+            collision_vec = [self.position[0] - collision_obj_rects[0][0],
+                             self.position[1] - collision_obj_rects[0][1]]
             collision_vec_len = math.sqrt((collision_vec[0] * collision_vec[0]) + (collision_vec[1] * collision_vec[1]))
             normal_collision_vec = [collision_vec[0]/collision_vec_len, collision_vec[1]/collision_vec_len]
 
@@ -465,7 +464,6 @@ class Player(pygame.sprite.Sprite):
             test_screen_position[0] = test_move_position[0] - tiled_level.position_offset[0]
             test_screen_position[1] = test_move_position[1] - tiled_level.position_offset[1]
 
-            self.test_collision_sprite.image = pygame.transform.rotate(self.original_image, self.new_facing_angle)
             self.test_collision_sprite.rect = self.image.get_rect()
             test_sprite_x_pos = test_screen_position[0]
             test_sprite_y_pos = test_screen_position[1] + self.sprite_rot_centre_offset[1]
@@ -473,23 +471,15 @@ class Player(pygame.sprite.Sprite):
                                                                      test_sprite_y_pos],
                                                                     test_screen_position, -self.new_facing_angle)
 
-            collided_obj_pos = [0, 0]
             collision_obj_rects[:] = []
 
-            for tileX in range(tiled_level.zero_tile_x, tiled_level.end_tile_x):
-                for tileY in range(tiled_level.zero_tile_y, tiled_level.end_tile_y):
-                    tile = tiled_level.tile_grid[tileX][tileY]
-                    collision_data = self.test_tile_collision(self.test_collision_sprite.rect,
-                                                              test_screen_position, tile)
-                    if collision_data[0]:
-                        if len(collision_data[1]) > 0:
-                            collided_obj_pos[0] = collision_data[1][0][0] + tiled_level.position_offset[0]
-                            collided_obj_pos[1] = collision_data[1][0][1] + tiled_level.position_offset[1]
-
-                        for colPoint in collision_data[1]:
-                            collision_obj_rect = pygame.Rect(0.0, 0.0, 2.0, 2.0)
-                            collision_obj_rect.center = colPoint
-                            collision_obj_rects.append(collision_obj_rect)
+            for shape in tiled_level.collision_index.query_circle(test_move_position, self.collide_radius):
+                collision_data = self.is_intersecting_shape(shape, test_move_position)
+                if collision_data[0]:
+                    for colPoint in collision_data[1]:
+                        collision_obj_rect = pygame.Rect(0.0, 0.0, 2.0, 2.0)
+                        collision_obj_rect.center = colPoint
+                        collision_obj_rects.append(collision_obj_rect)
             for monster in monsters:
                 self.test_monster_collision(self.test_collision_sprite.rect, monster)
 
@@ -514,12 +504,6 @@ class Player(pygame.sprite.Sprite):
             collided = self.is_intersecting(monster)
         return collided
     
-    def test_tile_collision(self, temp_player_rect, test_screen_position, tile):
-        collided = (False, [])
-        if temp_player_rect.colliderect(tile.rect):
-            collided = self.is_intersecting_tile(tile, test_screen_position)
-        return collided
-
     def test_projectile_collision(self, projectile_rect):
         collided = False
         if self.rect.colliderect(projectile_rect):
@@ -585,36 +569,35 @@ class Player(pygame.sprite.Sprite):
     def test_point_in_circle(point, circle_pos, circle_radius):
         return (point[0] - circle_pos[0]) ** 2 + (point[1] - circle_pos[1]) ** 2 < circle_radius ** 2
     
-    # tiles positions are in screen space currently
-    def is_intersecting_tile(self, tile, test_screen_position):
+    # shapes from the level's collision index, in world space
+    def is_intersecting_shape(self, collision_shape, test_position):
         collided = False
         collision_positions = []
-        for collisionShape in tile.tile_data.collision_shapes:
-            if collisionShape[0] == "circle":
-                x_dist = (test_screen_position[0] - collisionShape[2][0]) ** 2
-                y_dist = (test_screen_position[1] - collisionShape[2][1]) ** 2
-                distance = math.sqrt(x_dist + y_dist)
-                low_collide_bound = abs((self.collide_radius - collisionShape[3]))
-                upper_collide_bound = (self.collide_radius + collisionShape[3])
-                if low_collide_bound <= distance <= upper_collide_bound:
-                    collided = True
+        if collision_shape[0] == "circle":
+            x_dist = (test_position[0] - collision_shape[1][0]) ** 2
+            y_dist = (test_position[1] - collision_shape[1][1]) ** 2
+            distance = math.sqrt(x_dist + y_dist)
+            low_collide_bound = abs((self.collide_radius - collision_shape[2]))
+            upper_collide_bound = (self.collide_radius + collision_shape[2])
+            if low_collide_bound <= distance <= upper_collide_bound:
+                collided = True
+                shape_centre = [0.0, 0.0]
+                shape_centre[0] = collision_shape[1][0]
+                shape_centre[1] = collision_shape[1][1]
+                collision_positions.append(shape_centre)
+        elif collision_shape[0] == "rect":
+            result = self.test_rect_in_circle(collision_shape[1], test_position, self.collide_radius)
+            if result[0]:
+                collided = True
+
+                if len(result[1]) > 0:
+                    for point in result[1]:
+                        collision_positions.append(point)
+                else:
                     shape_centre = [0.0, 0.0]
-                    shape_centre[0] = collisionShape[2][0]
-                    shape_centre[1] = collisionShape[2][1]
+                    shape_centre[0] = collision_shape[1].centerx
+                    shape_centre[1] = collision_shape[1].centery
                     collision_positions.append(shape_centre)
-            elif collisionShape[0] == "rect":             
-                result = self.test_rect_in_circle(collisionShape[2], test_screen_position, self.collide_radius)
-                if result[0]:
-                    collided = True
-                    
-                    if len(result[1]) > 0:
-                        for point in result[1]:
-                            collision_positions.append(point)
-                    else:
-                        shape_centre = [0.0, 0.0]
-                        shape_centre[0] = collisionShape[2].centerx
-                        shape_centre[1] = collisionShape[2].centery
-                        collision_positions.append(shape_centre)
 
         return collided, collision_positions
 
@@ -698,9 +681,11 @@ class Player(pygame.sprite.Sprite):
         screen.blit(s, int_position)
 
         if self.should_draw_collision_obj:
+            # the collision points are in world space
             for col_obj_rect in self.collision_obj_rects:
-                # print("Collide pos: " + str(col_obj_rect[0]) + ", " + str(col_obj_rect[1]))
-                pygame.draw.rect(screen, pygame.Color("#FF0000"), col_obj_rect)
+                pygame.draw.rect(screen, pygame.Color("#FF0000"),
+                                 col_obj_rect.move(self.screen_position[0] - self.position[0],
+                                                   self.screen_position[1] - self.position[1]))
     
     @staticmethod
     def distance_from_line(point, line):
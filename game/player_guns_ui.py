@@ -1,5 +1,7 @@
 import pygame
 
+from game.text_cache import text_cache
+
 
 class GunsUI:
     def __init__(self, start_pos, width, height):
@@ -15,6 +17,7 @@ class GunsUI:
         self.reload_percentage = 1.0
 
         self.ammo_count = -1
+        self.text_colour = pygame.Color("#FFFFFF")
 
     def update(self, reload_counter, reload_time, ammo_count):
         self.ammo_count = ammo_count
@@ -28,7 +31,7 @@ class GunsUI:
         self.reload_rect = pygame.Rect(self.position[0] + 1, self.position[1] + 1, int(reload_width), self.height - 2)
 
     def draw(self, screen, small_font):
-        cannon_label_text_render = small_font.render("Guns:", True, pygame.Color("#FFFFFF"))
+        cannon_label_text_render = text_cache.render(small_font, "Guns:", self.text_colour)
         text_rect = cannon_label_text_render.get_rect()
         screen.blit(cannon_label_text_render,
                     cannon_label_text_render.get_rect(centerx=self.position[0]-text_rect.width+12,
@@ -44,7 +47,7 @@ class GunsUI:
         if self.ammo_count == 0:
             reloading_string = "Out of Ammo"
             
-        reloading_text_render = small_font.render(reloading_string, True, pygame.Color("#FFFFFF"))
+        reloading_text_render = text_cache.render(small_font, reloading_string, self.text_colour)
         screen.blit(reloading_text_render,
                     reloading_text_render.get_rect(x=self.position[0]+12,
                                                    centery=self.position[1]+text_rect.height-3))
@@ -1,5 +1,7 @@
 import pygame
 
+from game.text_cache import text_cache
+
 
 class HealthBar:
     def __init__(self, start_pos, width, height):
@@ -12,6 +14,7 @@ class HealthBar:
         self.baseRect = pygame.Rect(self.position[0], self.position[1], self.width, self.height)
         self.powerRect = pygame.Rect(self.position[0]+1, self.position[1]+1, 1, self.height-2)
         self.health_rect = None
+        self.text_colour = pygame.Color("#FFFFFF")
 
     def update(self, health, max_health):
         health_percentage = health / max_health
@@ -21,7 +24,7 @@ class HealthBar:
         self.health_rect = pygame.Rect(self.position[0] + 1, self.position[1] + 1, int(health_width), self.height - 2)
 
     def draw(self, screen, small_font):
-        health_label_text_render = small_font.render("Health:", True, pygame.Color("#FFFFFF"))
+        health_label_text_render = text_cache.render(small_font, "Health:", self.text_colour)
         text_rect = health_label_text_render.get_rect()
         screen.blit(health_label_text_render,
                     health_label_text_render.get_rect(centerx=self.position[0]-text_rect.width+12,
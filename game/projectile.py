@@ -7,6 +7,6 @@ class Projectile:
     def update_sprite(self, all_bullet_sprites):
         return all_bullet_sprites
 
-    def update_movement_and_collision(self, tiled_level, collideable_tiles, players, monsters,
+    def update_movement_and_collision(self, tiled_level, player_hash, monster_hash,
                                       time_delta, time_multiplier, new_explosions, explosions):
         pass
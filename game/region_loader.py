@@ -0,0 +1,61 @@
+import queue
+import threading
+
+from game.level_file import read_level_region
+
+
+class RegionLoader:
+    """
+    Reads a streamed level's region files on a background thread, so the game carries on while the regions around
+    the camera come in. The thread only reads and parses the files; the level makes the tiles on the main thread
+    when it collects a loaded region.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.pending_regions = set()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def request_region(self, region_x, region_y):
+        if (region_x, region_y) not in self.pending_regions:
+            self.pending_regions.add((region_x, region_y))
+            self.requests.put((region_x, region_y))
+
+    def is_pending(self, region_x, region_y):
+        return (region_x, region_y) in self.pending_regions
+
+    def load_region_now(self, region_x, region_y):
+        # for when the game can't carry on without the region, like when placing the player at the start
+        return read_level_region(self.directory, region_x, region_y)
+
+    def get_loaded_regions(self):
+        # returns (region x, region y, level data) for each region read since the last call. The level data is None
+        # for an empty region.
+        loaded_regions = []
+        while True:
+            try:
+                region_x, region_y, level_data, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending_regions.discard((region_x, region_y))
+            if error is not None:
+                raise error
+            loaded_regions.append((region_x, region_y, level_data))
+        return loaded_regions
+
+    def close(self):
+        self.requests.put(None)
+        self.thread.join()
+
+    def run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            try:
+                self.results.put((request[0], request[1], read_level_region(self.directory, request[0], request[1]),
+                                  None))
+            except (OSError, ValueError) as error:
+                self.results.put((request[0], request[1], None, error))
@@ -0,0 +1,15 @@
+def get_interpolation_shift(previous_position, position, alpha):
+    # the simulation runs in fixed steps, so when we draw we are usually part way between the last two steps. This is
+    # how far to move something drawn at 'position' so that it appears 'alpha' of the way from 'previous_position'.
+    return [(previous_position[0] - position[0]) * (1.0 - alpha),
+            (previous_position[1] - position[1]) * (1.0 - alpha)]
+
+
+def draw_sprites_interpolated(screen, sprite_group, camera_shift, sprite_shifts):
+    for sprite in sprite_group.sprites():
+        x_shift = camera_shift[0]
+        y_shift = camera_shift[1]
+        if sprite in sprite_shifts:
+            x_shift += sprite_shifts[sprite][0]
+            y_shift += sprite_shifts[sprite][1]
+        screen.blit(sprite.image, sprite.rect.move(int(round(x_shift)), int(round(y_shift))))
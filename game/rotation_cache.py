@@ -0,0 +1,34 @@
+from collections import OrderedDict
+import pygame
+
+
+class RotationCache:
+    """
+    Hands out rotated copies of sprite images with the angle rounded to the nearest 'angle_step' degrees, so each
+    image is only rotated once per step and rotating a sprite is normally a dictionary lookup. The least recently
+    used rotations are dropped once there are more than 'max_entries' of them.
+    """
+    def __init__(self, angle_step=2.0, max_entries=4096):
+        self.angle_step = angle_step
+        self.steps_per_turn = int(round(360.0 / self.angle_step))
+        self.max_entries = max_entries
+        self.rotated_images = OrderedDict()
+
+    def get_rotated(self, image, angle):
+        angle_index = int(round(angle / self.angle_step)) % self.steps_per_turn
+        key = (image, angle_index)
+        rotated_image = self.rotated_images.get(key)
+        if rotated_image is None:
+            rotated_image = pygame.transform.rotate(image, angle_index * self.angle_step)
+            self.rotated_images[key] = rotated_image
+            if len(self.rotated_images) > self.max_entries:
+                self.rotated_images.popitem(last=False)
+        else:
+            self.rotated_images.move_to_end(key)
+        return rotated_image
+
+    def clear(self):
+        self.rotated_images.clear()
+
+
+rotation_cache = RotationCache()
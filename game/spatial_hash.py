@@ -0,0 +1,51 @@
+# a little over twice the size of a guard or the player, so most of them are in one to four cells
+SPATIAL_HASH_CELL_SIZE = 128
+
+
+class SpatialHash:
+    """
+    A uniform grid over a list of entities, bucketed by the cells their rects overlap, so a test against a rect only
+    looks at the entities in the cells it touches rather than the whole list. Entities move every step, so the grid
+    is refilled from the list once a step, before anything queries it. A query gives back each entity it finds once,
+    in the order they are in the list, the same as going through the list would.
+    """
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entity_indices = {}
+
+    def rebuild(self, entities):
+        # the entities' rects must stay where they are, and the list the same, until the grid is next rebuilt
+        self.cells.clear()
+        self.entity_indices.clear()
+        cell_size = self.cell_size
+        for index in range(0, len(entities)):
+            entity = entities[index]
+            self.entity_indices[entity] = index
+            rect = entity.rect
+            first_cell_x = rect.left // cell_size
+            first_cell_y = rect.top // cell_size
+            for cell_x in range(first_cell_x, max(first_cell_x, (rect.right - 1) // cell_size) + 1):
+                for cell_y in range(first_cell_y, max(first_cell_y, (rect.bottom - 1) // cell_size) + 1):
+                    cell_entities = self.cells.get((cell_x, cell_y))
+                    if cell_entities is None:
+                        self.cells[(cell_x, cell_y)] = [entity]
+                    else:
+                        cell_entities.append(entity)
+
+    def query_rect(self, rect):
+        # the entities in the cells a rect overlaps, which still have to be tested against it. The list given back
+        # can belong to the grid, so it mustn't be changed.
+        cell_size = self.cell_size
+        first_cell_x = rect.left // cell_size
+        first_cell_y = rect.top // cell_size
+        last_cell_x = max(first_cell_x, (rect.right - 1) // cell_size)
+        last_cell_y = max(first_cell_y, (rect.bottom - 1) // cell_size)
+        if first_cell_x == last_cell_x and first_cell_y == last_cell_y:
+            # entities are added to a cell in list order and only once, so one cell needs no sorting
+            return self.cells.get((first_cell_x, first_cell_y), ())
+        found_entities = set()
+        for cell_x in range(first_cell_x, last_cell_x + 1):
+            for cell_y in range(first_cell_y, last_cell_y + 1):
+                found_entities.update(self.cells.get((cell_x, cell_y), ()))
+        return sorted(found_entities, key=self.entity_indices.__getitem__)
@@ -0,0 +1,39 @@
+from collections import OrderedDict
+import pygame
+
+
+class TextCache:
+    """
+    One shared copy of each font, and the text rendered with them kept by (font, text, colour) so text that
+    hasn't changed since the last frame is blitted rather than rendered again. The least recently used renders are
+    dropped once there are more than 'max_entries' of them. Renders are shared, so don't draw onto them.
+    """
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.fonts = {}
+        self.text_renders = OrderedDict()
+
+    def get_font(self, file_name, size):
+        key = (file_name, size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.Font(file_name, size)
+        return self.fonts[key]
+
+    def render(self, font, text, colour):
+        key = (font, text, tuple(colour))
+        text_render = self.text_renders.get(key)
+        if text_render is None:
+            text_render = font.render(text, True, colour)
+            self.text_renders[key] = text_render
+            if len(self.text_renders) > self.max_entries:
+                self.text_renders.popitem(last=False)
+        else:
+            self.text_renders.move_to_end(key)
+        return text_render
+
+    def clear(self):
+        self.fonts.clear()
+        self.text_renders.clear()
+
+
+text_cache = TextCache()
@@ -0,0 +1,95 @@
+import pygame
+
+CHUNK_TILES = 8
+TILE_SIZE = 64
+CHUNK_SIZE = CHUNK_TILES * TILE_SIZE
+
+
+class TileChunks:
+    """
+    The ground layer of the level baked into surfaces CHUNK_TILES tiles square, so drawing the level is a few large
+    blits rather than one per tile. Chunks are baked the first time they are drawn and baked again after a tile in
+    them changes.
+    """
+    def __init__(self, tiled_level):
+        self.tiled_level = tiled_level
+        self.chunks = {}
+
+    def clear(self):
+        self.chunks.clear()
+
+    def update_tile(self, tile_x, tile_y):
+        # draws a changed tile straight into its chunk, if the chunk has been baked, rather than baking it again
+        chunk = self.chunks.get((int(tile_x / CHUNK_TILES), int(tile_y / CHUNK_TILES)))
+        if chunk is None:
+            return
+        tile = self.tiled_level.get_tile(tile_x, tile_y)
+        tile_area = pygame.Rect((tile_x % CHUNK_TILES) * TILE_SIZE, (tile_y % CHUNK_TILES) * TILE_SIZE,
+                                TILE_SIZE, TILE_SIZE)
+        if tile is None or chunk.get_flags() & pygame.SRCALPHA:
+            chunk.fill((0, 0, 0, 0), tile_area)
+        if tile is not None:
+            tile_rect = tile.tile_image.get_rect()
+            tile_rect.center = tile_area.center
+            chunk.blit(tile.tile_image, tile_rect)
+
+    def invalidate_area(self, first_tile, tile_size):
+        # drops the chunks overlapping a block of tiles, like a region of the level coming in or going out
+        for chunk_x in range(int(first_tile[0] / CHUNK_TILES),
+                             int((first_tile[0] + tile_size[0] - 1) / CHUNK_TILES) + 1):
+            for chunk_y in range(int(first_tile[1] / CHUNK_TILES),
+                                 int((first_tile[1] + tile_size[1] - 1) / CHUNK_TILES) + 1):
+                self.chunks.pop((chunk_x, chunk_y), None)
+
+    def get_chunk(self, chunk_x, chunk_y):
+        chunk = self.chunks.get((chunk_x, chunk_y))
+        if chunk is None:
+            chunk = self.bake_chunk(chunk_x, chunk_y)
+            self.chunks[(chunk_x, chunk_y)] = chunk
+        return chunk
+
+    def bake_chunk(self, chunk_x, chunk_y):
+        tiled_level = self.tiled_level
+        first_tile_x = chunk_x * CHUNK_TILES
+        first_tile_y = chunk_y * CHUNK_TILES
+        last_tile_x = min(first_tile_x + CHUNK_TILES, tiled_level.level_tile_size[0])
+        last_tile_y = min(first_tile_y + CHUNK_TILES, tiled_level.level_tile_size[1])
+
+        # the tiles are opaque, so only chunks with gaps in them need per-pixel alpha
+        has_gaps = last_tile_x - first_tile_x < CHUNK_TILES or last_tile_y - first_tile_y < CHUNK_TILES
+        for tile_x in range(first_tile_x, last_tile_x):
+            for tile_y in range(first_tile_y, last_tile_y):
+                if tiled_level.get_tile(tile_x, tile_y) is None:
+                    has_gaps = True
+        if has_gaps:
+            chunk = pygame.Surface((CHUNK_SIZE, CHUNK_SIZE), pygame.SRCALPHA).convert_alpha()
+            chunk.fill((0, 0, 0, 0))
+        else:
+            chunk = pygame.Surface((CHUNK_SIZE, CHUNK_SIZE)).convert()
+
+        for tile_x in range(first_tile_x, last_tile_x):
+            for tile_y in range(first_tile_y, last_tile_y):
+                tile = tiled_level.get_tile(tile_x, tile_y)
+                if tile is not None:
+                    tile_rect = tile.tile_image.get_rect()
+                    tile_rect.center = (((tile_x - first_tile_x) * TILE_SIZE) + int(TILE_SIZE / 2),
+                                        ((tile_y - first_tile_y) * TILE_SIZE) + int(TILE_SIZE / 2))
+                    chunk.blit(tile.tile_image, tile_rect)
+        return chunk
+
+    def draw(self, screen, position_offset, camera_shift):
+        # 'camera_shift' moves everything by the same amount as the other sprites when drawing part way between steps
+        x_shift = int(round(camera_shift[0]))
+        y_shift = int(round(camera_shift[1]))
+        screen_width, screen_height = screen.get_size()
+        first_chunk_x = max(0, int((position_offset[0] - x_shift) / CHUNK_SIZE))
+        first_chunk_y = max(0, int((position_offset[1] - y_shift) / CHUNK_SIZE))
+        last_chunk_x = min(int((position_offset[0] - x_shift + screen_width) / CHUNK_SIZE),
+                           int((self.tiled_level.level_tile_size[0] - 1) / CHUNK_TILES))
+        last_chunk_y = min(int((position_offset[1] - y_shift + screen_height) / CHUNK_SIZE),
+                           int((self.tiled_level.level_tile_size[1] - 1) / CHUNK_TILES))
+        for chunk_x in range(first_chunk_x, last_chunk_x + 1):
+            for chunk_y in range(first_chunk_y, last_chunk_y + 1):
+                screen.blit(self.get_chunk(chunk_x, chunk_y),
+                            ((chunk_x * CHUNK_SIZE) - position_offset[0] + x_shift,
+                             (chunk_y * CHUNK_SIZE) - position_offset[1] + y_shift))
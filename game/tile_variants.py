@@ -0,0 +1,65 @@
+import pygame
+
+
+class TileVariant:
+    """
+    The parts of a tile that every tile with the same id and angle share - the rotated image and the collision shapes
+    rotated to match it. Shape positions are relative to the top left corner of the tile, in the same format as
+    TileData's shapes.
+    """
+    def __init__(self, tile_data, angle):
+        self.tile_id = tile_data.tile_id
+        self.angle = angle
+        self.collidable = tile_data.collidable
+        self.collide_radius = tile_data.collide_radius
+        self.image = pygame.transform.rotate(tile_data.tile_image, angle)
+
+        tile_size = tile_data.tile_image.get_width()
+        self.collision_shapes = [rotate_shape(shape, angle, tile_size) for shape in tile_data.collision_shapes]
+
+
+class TileVariantRegistry:
+    """
+    Hands out one TileVariant for each tile id and angle, so the tiles of a level only keep a reference to a variant
+    rather than their own rotated image and copy of the collision shapes.
+    """
+    def __init__(self, all_tile_data):
+        self.all_tile_data = all_tile_data
+        self.variants = {}
+
+    def get_variant(self, tile_id, angle):
+        angle = angle % 360
+        variant = self.variants.get((tile_id, angle))
+        if variant is None:
+            variant = TileVariant(self.all_tile_data[tile_id], angle)
+            self.variants[(tile_id, angle)] = variant
+        return variant
+
+    def clear(self):
+        self.variants.clear()
+
+
+def rotate_point(point, angle, tile_size):
+    # rotates a point in a tile anticlockwise, the same way pygame.transform.rotate() turns the tile's image
+    if angle == 90:
+        return [point[1], tile_size - point[0]]
+    elif angle == 180:
+        return [tile_size - point[0], tile_size - point[1]]
+    elif angle == 270:
+        return [tile_size - point[1], point[0]]
+    return [point[0], point[1]]
+
+
+def rotate_shape(shape, angle, tile_size):
+    if angle not in (90, 180, 270):
+        angle = 0  # tiles only turn in quarter turns, anything else keeps its shapes as they are
+    if shape[0] == "rect":
+        first_corner = rotate_point(shape[2].topleft, angle, tile_size)
+        second_corner = rotate_point(shape[2].bottomright, angle, tile_size)
+        top_left = [min(first_corner[0], second_corner[0]), min(first_corner[1], second_corner[1])]
+        return ["rect", top_left, pygame.Rect(top_left[0], top_left[1],
+                                              abs(second_corner[0] - first_corner[0]),
+                                              abs(second_corner[1] - first_corner[1]))]
+    else:
+        centre = rotate_point(shape[1], angle, tile_size)
+        return ["circle", centre, [centre[0], centre[1]], shape[3]]
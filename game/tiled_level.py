@@ -1,30 +1,46 @@
 import math
 import pygame
-import csv
 import os
 
 from game.tile import Tile, TileData, AISpawn
 from game.standard_monster import StandardMonster
-from typing import List, Union
+from game.asset_cache import asset_cache
+from game.asset_bundle import asset_bundle
+from game.level_file import read_level_file, write_level_file, read_region_manifest
+from game.level_file import get_region_file_name, get_region_tile_size, REGION_TILES, REGION_MANIFEST_FILE
+from game.level_region import LevelRegion
+from game.level_journal import LevelJournal, JOURNAL_TILE_RECORD, JOURNAL_SPAWN_RECORD
+from game.region_loader import RegionLoader
+from game.level_bake import load_baked_level, BAKE_DIRECTORY
+from game.tile_chunks import TileChunks
+from game.tile_variants import TileVariantRegistry
+from game.collision_index import CollisionIndex
+from typing import Dict, Tuple
+
+# how far past the edges of the screen, in pixels, the regions of a streamed level are loaded and then dropped again
+REGION_LOAD_MARGIN = 512
+REGION_UNLOAD_MARGIN = 1024
 
 
 class TiledLevel:
-    tile_grid: List[List[Union[Tile, None]]]
+    regions: Dict[Tuple[int, int], LevelRegion]
 
-    def __init__(self, level_tile_size, all_tile_sprites, all_top_tile_sprites, all_monster_sprites,
+    def __init__(self, level_tile_size, all_top_tile_sprites, all_monster_sprites,
                  monsters, screen_data, explosions_sprite_sheet):
 
         self.initial_screen_offset = [0, 0]
         self.position_offset = [0, 0]
+        self.previous_position_offset = self.position_offset
         self.current_centre_position = [100000000, 111111111111]
         self.explosions_sprite_sheet = explosions_sprite_sheet
 
         self.player_start = [0.0, 0.0]
 
-        self.file_name = "data/level.csv"
+        self.regions_directory = "data/level_regions"  # a streamed level, loaded in preference to a level file
+        self.file_name = "data/level.trl"
+        self.csv_file_name = "data/level.csv"  # the old level format, loaded when there is no binary level file
         self.screen_data = screen_data
 
-        self.all_tile_sprites = all_tile_sprites
         self.all_top_tile_sprites = all_top_tile_sprites
 
         self.tile_map = self.load_tile_table("images/tiles/tile_map.png", 64, 64, False)
@@ -38,59 +54,202 @@ class TiledLevel:
         self.end_tile_x = 0
         self.end_tile_y = 0
 
-        self.tile_grid = []
-        self.top_tile_grid = []
-        self.tiles = []
-        self.collidable_tiles = []
-        self.walkable_tiles = []
-
-        self.ai_spawns = []
+        # the level is kept in square regions of tiles. When it is streamed from region files only the regions around
+        # the camera are in memory, otherwise every region with something in it is.
+        self.regions = {}
+        self.region_tiles = REGION_TILES
+        self.region_loader = None
+        self.region_listeners = []  # told with on_region_added(tiled_level, region) when a region comes in
+        self.level_journal = None  # the editor's changes to a level that isn't streamed, between saves
+        self.bake_directory = BAKE_DIRECTORY
+        # the level file to look for baked data for, while the level is just that file. The bake is only looked up,
+        # which means hashing the level and tile files, when something asks for it.
+        self.bake_level_file_name = None
+        self.baked_level = None
+
+        self.ai_spawns = {}  # the spawns in the regions in memory, keyed by the grid square they are in
+        self.guards_active = False
+        self.defeated_spawn_cells = set()
 
         self.level_tile_size = level_tile_size
         self.level_pixel_size = [self.level_tile_size[0] * 64, self.level_tile_size[1] * 64]
+        self.tile_chunks = TileChunks(self)
+        self.collision_index = CollisionIndex()
+        self.reset_level(level_tile_size)
 
-        for tile_x in range(0, self.level_tile_size[0]):
-            column: List[Union[Tile, None]] = []
-            top_column: List[Union[Tile, None]] = []
-            for tile_y in range(0, self.level_tile_size[1]):
-                column.append(None)
-                top_column.append(None)
-            self.tile_grid.append(column)
-            self.top_tile_grid.append(top_column)
-            
         self.initial_offset = True
 
-        self.all_tile_data = {}
-        tile_data_files = [file for file in os.listdir("data/tiles/")
-                           if os.path.isfile(os.path.join("data/tiles/", file))]
+        self.all_tile_data, self.default_tile = load_all_tile_data(self.tile_map)
+        self.tile_variants = TileVariantRegistry(self.all_tile_data)
+        self.collidable_tile_ids = set(tile_id for tile_id, tile_data in self.all_tile_data.items()
+                                       if tile_data.collidable)
 
-        self.default_tile = None
-        for file_name in tile_data_files:
-            new_tile_data = TileData(os.path.join("data/tiles/", file_name), self.tile_map)
-            new_tile_data.load_tile_data()
-            self.all_tile_data[new_tile_data.tile_id] = new_tile_data
-            if self.default_tile is None:
-                self.default_tile = new_tile_data
+    def reset_level(self, level_tile_size):
+        self.level_tile_size = level_tile_size
+        self.level_pixel_size = [self.level_tile_size[0] * 64, self.level_tile_size[1] * 64]
+        self.regions = {}
+        self.ai_spawns.clear()
+        self.all_top_tile_sprites.empty()
+        self.tile_chunks.clear()
+        self.collision_index.clear()
+
+    def close(self):
+        if self.region_loader is not None:
+            self.region_loader.close()
+            self.region_loader = None
+        if self.level_journal is not None:
+            self.level_journal.close()
+            self.level_journal = None
 
     def clear_level_to_default_tile(self):
         for x in range(0, self.level_tile_size[0]):
             for y in range(0, self.level_tile_size[1]):
                 x_centre = 32 + (x * 64)
                 y_centre = 32 + (y * 64)
-                default_tile = Tile([x_centre, y_centre], 0, self.default_tile, 0)
-                self.tiles.append(default_tile)
-                self.walkable_tiles.append(default_tile)
-                self.tile_grid[x][y] = default_tile
-        
-    def reset_guards(self):
-        for spawn in self.ai_spawns:
-            new_monster = StandardMonster(spawn.type_id, spawn.world_position, self.guards_sprite_map,
-                                          self.all_monster_sprites, self.screen_data.play_area,
-                                          self, self.explosions_sprite_sheet)
-            self.monsters.append(new_monster)
+                self.place_tile(self.default_tile.tile_id, [x_centre, y_centre], 0, 0)
+
+    def get_tile(self, tile_x, tile_y, layer=0):
+        # None outside the level, for an empty grid square or when the square's region isn't in memory
+        if 0 <= tile_x < self.level_tile_size[0] and 0 <= tile_y < self.level_tile_size[1]:
+            region = self.regions.get((int(tile_x / self.region_tiles), int(tile_y / self.region_tiles)))
+            if region is not None:
+                return region.get_tile(tile_x, tile_y, layer)
+        return None
+
+    def is_walkable(self, tile_x, tile_y):
+        # whether there is a ground tile at a grid square that can be walked on, from the regions' walkable masks
+        if 0 <= tile_x < self.level_tile_size[0] and 0 <= tile_y < self.level_tile_size[1]:
+            region = self.regions.get((int(tile_x / self.region_tiles), int(tile_y / self.region_tiles)))
+            if region is not None:
+                return region.is_walkable(tile_x, tile_y)
+        return False
+
+    def get_resident_tiles(self):
+        for region in self.regions.values():
+            for tile in region.get_tiles():
+                yield tile
+
+    def get_region_at_tile(self, tile_x, tile_y):
+        # a level that isn't streamed gets a new region the first time something is put in it
+        region_x = int(tile_x / self.region_tiles)
+        region_y = int(tile_y / self.region_tiles)
+        region = self.regions.get((region_x, region_y))
+        if region is None and self.region_loader is None:
+            region = self.add_region(region_x, region_y, None)
+        return region
+
+    def add_region(self, region_x, region_y, level_data):
+        first_tile = [region_x * self.region_tiles, region_y * self.region_tiles]
+        region = LevelRegion(region_x, region_y, first_tile,
+                             get_region_tile_size(self.level_tile_size, self.region_tiles, region_x, region_y))
+        self.regions[(region_x, region_y)] = region
+        self.tile_chunks.invalidate_area(region.first_tile, region.region_tile_size)
+        if level_data is not None:
+            # the region's file becomes its tile arrays, then the sprites are made from them
+            region.set_tile_data(level_data, self.collidable_tile_ids)
+            for layer in range(0, len(level_data.layer_tile_indices)):
+                for tile_x, tile_y, tile_id, tile_angle in level_data.get_tiles(layer):
+                    tile = Tile([((first_tile[0] + tile_x) * 64) + 32, ((first_tile[1] + tile_y) * 64) + 32],
+                                self.tile_variants.get_variant(tile_id, tile_angle), layer)
+                    region.attach_tile(first_tile[0] + tile_x, first_tile[1] + tile_y, layer, tile)
+                    self.show_tile(first_tile[0] + tile_x, first_tile[1] + tile_y, tile)
+            for type_id, x_pos, y_pos in level_data.spawns:
+                self.add_ai_spawn(AISpawn(self.guards_sprite_map[0][1], [x_pos, y_pos], type_id), True)
+        for listener in self.region_listeners:
+            listener.on_region_added(self, region)
+        return region
+
+    def remove_region(self, region):
+        for tile in region.get_tiles():
+            if tile.layer == 0:
+                self.collision_index.remove_tile(int((tile.world_position[0] - 32) / 64),
+                                                 int((tile.world_position[1] - 32) / 64))
+            else:
+                tile.kill()
+        for spawn_cell, spawn in region.ai_spawns.items():
+            del self.ai_spawns[spawn_cell]
+            self.despawn_guard(spawn)
+        self.tile_chunks.invalidate_area(region.first_tile, region.region_tile_size)
+        del self.regions[(region.region_x, region.region_y)]
+
+    def get_region_range(self, margin):
+        # the first and last regions overlapping the screen once it is grown by 'margin' pixels on every side
+        region_pixel_size = self.region_tiles * 64
+        last_region_x = int((self.level_tile_size[0] - 1) / self.region_tiles)
+        last_region_y = int((self.level_tile_size[1] - 1) / self.region_tiles)
+        first_region = [max(0, int((self.position_offset[0] - margin) / region_pixel_size)),
+                        max(0, int((self.position_offset[1] - margin) / region_pixel_size))]
+        last_region = [min(last_region_x, int((self.position_offset[0] + self.screen_data.play_area[0] + margin) /
+                                              region_pixel_size)),
+                       min(last_region_y, int((self.position_offset[1] + self.screen_data.play_area[1] + margin) /
+                                              region_pixel_size))]
+        return first_region, last_region
 
-    def update_offset_position(self, centre_position, all_tile_sprites):
+    @staticmethod
+    def is_region_in_range(region_x, region_y, region_range):
+        first_region, last_region = region_range
+        return first_region[0] <= region_x <= last_region[0] and first_region[1] <= region_y <= last_region[1]
+
+    def update_resident_regions(self):
+        # collects the regions the loader has read, asks it for the regions coming into view and drops the ones well
+        # out of view. Regions changed in the editor are kept until they are saved.
+        if self.region_loader is None:
+            return
+        keep_range = self.get_region_range(REGION_UNLOAD_MARGIN)
+        for region_x, region_y, level_data in self.region_loader.get_loaded_regions():
+            if (region_x, region_y) not in self.regions and self.is_region_in_range(region_x, region_y, keep_range):
+                self.add_region(region_x, region_y, level_data)
+
+        first_region, last_region = self.get_region_range(REGION_LOAD_MARGIN)
+        for region_x in range(first_region[0], last_region[0] + 1):
+            for region_y in range(first_region[1], last_region[1] + 1):
+                if (region_x, region_y) not in self.regions:
+                    self.region_loader.request_region(region_x, region_y)
+
+        for region in list(self.regions.values()):
+            if not region.is_modified and not self.is_region_in_range(region.region_x, region.region_y, keep_range):
+                self.remove_region(region)
+
+    def load_regions_around(self, world_position):
+        # reads the regions a screen's width and height around a point straight away, rather than on the loader
+        region_pixel_size = self.region_tiles * 64
+        first_region = [max(0, int((world_position[0] - self.screen_data.play_area[0]) / region_pixel_size)),
+                        max(0, int((world_position[1] - self.screen_data.play_area[1]) / region_pixel_size))]
+        last_region = [min(int((self.level_tile_size[0] - 1) / self.region_tiles),
+                           int((world_position[0] + self.screen_data.play_area[0]) / region_pixel_size)),
+                       min(int((self.level_tile_size[1] - 1) / self.region_tiles),
+                           int((world_position[1] + self.screen_data.play_area[1]) / region_pixel_size))]
+        for region_x in range(first_region[0], last_region[0] + 1):
+            for region_y in range(first_region[1], last_region[1] + 1):
+                if (region_x, region_y) not in self.regions:
+                    self.add_region(region_x, region_y, self.region_loader.load_region_now(region_x, region_y))
+
+    def reset_guards(self):
+        # only the guards in the regions in memory are spawned, the rest are spawned as their regions come in
+        self.guards_active = True
+        self.defeated_spawn_cells.clear()
+        for spawn in self.ai_spawns.values():
+            self.spawn_guard(spawn)
+
+    def spawn_guard(self, spawn):
+        spawn.monster = StandardMonster(spawn.type_id, spawn.world_position, self.guards_sprite_map,
+                                        self.all_monster_sprites, self.screen_data.play_area,
+                                        self, self.explosions_sprite_sheet)
+        self.monsters.append(spawn.monster)
+
+    def despawn_guard(self, spawn):
+        # a guard that has been killed stays dead when its region comes back in
+        if spawn.monster is not None:
+            if spawn.monster.should_die:
+                self.defeated_spawn_cells.add(get_spawn_cell(spawn))
+            elif spawn.monster in self.monsters:
+                spawn.monster.despawn()
+                self.monsters.remove(spawn.monster)
+            spawn.monster = None
+
+    def update_offset_position(self, centre_position):
         should_update = False
+        self.previous_position_offset = self.position_offset
         self.current_centre_position = centre_position
         x_offset = int(self.current_centre_position[0] - self.initial_screen_offset[0])
         y_offset = int(self.current_centre_position[1] - self.initial_screen_offset[1])
@@ -104,7 +263,7 @@ class TiledLevel:
             y_offset = 0
         if y_offset >= int(self.level_pixel_size[1] - self.screen_data.play_area[1]):
             y_offset = int(self.level_pixel_size[1] - self.screen_data.play_area[1])
-            
+
         if self.initial_offset or not (x_offset == self.position_offset[0] and y_offset == self.position_offset[1]):
             if self.initial_offset:
                 self.initial_offset = False
@@ -120,41 +279,20 @@ class TiledLevel:
             self.zero_tile_y = int(y_offset / 64)
 
             if self.zero_tile_x != old_zero_tile_x or self.zero_tile_y != old_zero_tile_y:
-                all_tile_sprites.empty()
                 self.end_tile_x = self.zero_tile_x + screen_tile_width
                 self.end_tile_y = self.zero_tile_y + screen_tile_height
 
-                if self.end_tile_x >= len(self.tile_grid):
-                    self.end_tile_x = len(self.tile_grid)
-                if self.end_tile_y >= len(self.tile_grid[0]):
-                    self.end_tile_y = len(self.tile_grid[0])
-                
-                for tile_x in range(self.zero_tile_x, self.end_tile_x):
-                    for tile_y in range(self.zero_tile_y, self.end_tile_y):
-                        tile = self.tile_grid[tile_x][tile_y]
-                        if tile is None:
-                            print("No tile at grid: " + str(tile_x) + ", " + str(tile_y))
-                        else:
-                            tile.update_offset_position(self.position_offset, self.screen_data)
-                            all_tile_sprites.add(tile)
-            else:
-                for tile_x in range(self.zero_tile_x, self.end_tile_x):
-                    for tile_y in range(self.zero_tile_y, self.end_tile_y):
-                        tile = self.tile_grid[tile_x][tile_y]
-                        tile.update_offset_position(self.position_offset, self.screen_data)
-
-            for spawn in self.ai_spawns:
-                spawn.update_offset_position(self.position_offset)
+                if self.end_tile_x >= self.level_tile_size[0]:
+                    self.end_tile_x = self.level_tile_size[0]
+                if self.end_tile_y >= self.level_tile_size[1]:
+                    self.end_tile_y = self.level_tile_size[1]
 
+        self.update_resident_regions()
         return should_update
-    
+
     def draw_tile_collision_shapes(self, screen):
-        for tile_x in range(self.zero_tile_x, self.end_tile_x):
-            for tile_y in range(self.zero_tile_y, self.end_tile_y):
-                tile = self.tile_grid[tile_x][tile_y]
-                if tile is not None:
-                    tile.draw_collision_shapes(screen)
-    
+        self.collision_index.draw_shapes(screen, self.position_offset)
+
     def find_player_start(self):
         player_start = [0, 0]
         shortest_distance = 100000
@@ -162,21 +300,26 @@ class TiledLevel:
         start_position = [world_centre[0], self.level_pixel_size[1]]  # worldCentre
         screen_centre = [self.screen_data.play_area[0] / 2, self.screen_data.play_area[1] / 2]
 
-        for tile in self.walkable_tiles:
-            x_dist = float(start_position[0]) - float(tile.world_position[0])
-            y_dist = float(start_position[1]) - float(tile.world_position[1])
-            distance = math.sqrt((x_dist * x_dist) + (y_dist * y_dist))
-            if distance < shortest_distance:
-                shortest_distance = distance
-                
-                player_start[0] = tile.world_position[0]
-                player_start[1] = tile.world_position[1]
+        if self.region_loader is not None:
+            self.load_regions_around(start_position)
+
+        # walks the walkable tiles column by column, so of two tiles the same distance away the same one always wins
+        for region_x, region_y in sorted(self.regions.keys()):
+            for tile_x, tile_y in self.regions[(region_x, region_y)].get_walkable_tile_positions():
+                x_dist = float(start_position[0]) - float((tile_x * 64) + 32)
+                y_dist = float(start_position[1]) - float((tile_y * 64) + 32)
+                distance = math.sqrt((x_dist * x_dist) + (y_dist * y_dist))
+                if distance < shortest_distance:
+                    shortest_distance = distance
+
+                    player_start[0] = (tile_x * 64) + 32
+                    player_start[1] = (tile_y * 64) + 32
 
         self.player_start = player_start
-        
+
         self.initial_screen_offset[0] = screen_centre[0]
         self.initial_screen_offset[1] = screen_centre[1]
-        
+
         self.current_centre_position = player_start
         x_offset = int(self.current_centre_position[0] - self.initial_screen_offset[0])
         y_offset = int(self.current_centre_position[1] - self.initial_screen_offset[1])
@@ -190,18 +333,16 @@ class TiledLevel:
             y_offset = 0
         if y_offset >= int(self.level_pixel_size[1] - self.screen_data.play_area[1]):
             y_offset = int(self.level_pixel_size[1] - self.screen_data.play_area[1])
-            
+
         self.position_offset = [x_offset, y_offset]
+        self.previous_position_offset = self.position_offset
 
         self.initial_offset = True
         return player_start
 
     @staticmethod
     def load_tile_table(filename, width, height, use_transparency):
-        if use_transparency:
-            image = pygame.image.load(filename).convert_alpha()
-        else:
-            image = pygame.image.load(filename).convert()
+        image = asset_cache.get_image(filename, use_transparency)
         image_width, image_height = image.get_size()
         tile_table = []
         for tile_x in range(0, int(image_width/width)):
@@ -212,205 +353,247 @@ class TiledLevel:
                 line.append(image.subsurface(rect))
         return tile_table
 
+    def get_tile_pos_at_screen_pos(self, screen_pos):
+        # the grid position of the tile on screen under a point, or None if there isn't one
+        tile_x = int(math.floor((screen_pos[0] + self.position_offset[0]) / 64))
+        tile_y = int(math.floor((screen_pos[1] + self.position_offset[1]) / 64))
+        if self.zero_tile_x <= tile_x < self.end_tile_x and self.zero_tile_y <= tile_y < self.end_tile_y:
+            return tile_x, tile_y
+        return None
+
     def get_tile_data_at_pos(self, click_pos, layer):
-        for tileX in range(self.zero_tile_x, self.end_tile_x):
-            for tileY in range(self.zero_tile_y, self.end_tile_y):
-                if layer == 0:
-                    tile = self.tile_grid[tileX][tileY]
-                    tile_screen_min = [(tileX*64) - self.position_offset[0],
-                                       (tileY * 64) - self.position_offset[1]]
-                    tile_screen_max = [(tileX*64) + 64 - self.position_offset[0],
-                                       (tileY * 64) + 64 - self.position_offset[1]]
-                    if tile_screen_min[0] <= click_pos[0] and tile_screen_min[1] <= click_pos[1]:
-                        if tile_screen_max[0] > click_pos[0] and tile_screen_max[1] > click_pos[1]:
-                            if tile is not None:
-                                return [tile.rect, tile.tile_image, tile.tile_id, False, tile]
-                            else:
-                                return [pygame.Rect(tile_screen_min[0], tile_screen_min[1], 64, 64),
-                                        None, "", False, None]
-                if layer == 1:
-                    tile = self.top_tile_grid[tileX][tileY]
-                    tile_screen_min = [(tileX*64) - self.position_offset[0], (tileY * 64) - self.position_offset[1]]
-                    tile_screen_max = [(tileX*64) + 64 - self.position_offset[0],
-                                       (tileY * 64) + 64 - self.position_offset[1]]
-                    if tile_screen_min[0] <= click_pos[0] and tile_screen_min[1] <= click_pos[1]:
-                        if tile_screen_max[0] > click_pos[0] and tile_screen_max[1] > click_pos[1]:
-                            if tile is not None:
-                                return [tile.rect, tile.tile_image, tile.tile_id, False, tile]
-                            else:
-                                return [pygame.Rect(tile_screen_min[0], tile_screen_min[1], 64, 64),
-                                        None, "", False, None]
-                    
-        return [pygame.Rect(0, 0, 0, 0), None, "", False, None]
+        tile_pos = self.get_tile_pos_at_screen_pos(click_pos)
+        if tile_pos is None:
+            return [pygame.Rect(0, 0, 0, 0), None, "", False, None]
+
+        tile = self.get_tile(tile_pos[0], tile_pos[1], layer)
+        tile_screen_rect = pygame.Rect((tile_pos[0] * 64) - self.position_offset[0],
+                                       (tile_pos[1] * 64) - self.position_offset[1], 64, 64)
+        if tile is not None:
+            return [tile_screen_rect, tile.tile_image, tile.tile_id, False, tile]
+        else:
+            return [tile_screen_rect, None, "", False, None]
 
     def set_tile_at_pos(self, click_pos, tile_id, tile_angle, layer):
-        tile_to_set = None
-        tile_click_x = 0
-        tile_click_y = 0
-        for tileX in range(self.zero_tile_x, self.end_tile_x):
-            for tileY in range(self.zero_tile_y, self.end_tile_y):
-                if layer == 0:
-                    tile = self.tile_grid[tileX][tileY]
-                    tile_screen_min = [(tileX*64) - self.position_offset[0],
-                                       (tileY * 64) - self.position_offset[1]]
-                    tile_screen_max = [(tileX*64) + 64 - self.position_offset[0],
-                                       (tileY * 64) + 64 - self.position_offset[1]]
-                    if tile_screen_min[0] <= click_pos[0] and tile_screen_min[1] <= click_pos[1]:
-                        if tile_screen_max[0] > click_pos[0] and tile_screen_max[1] > click_pos[1]:
-                            tile_to_set = tile
-                            tile_click_x = tileX
-                            tile_click_y = tileY
-                            break
-                if layer == 1:
-                    tile = self.top_tile_grid[tileX][tileY]
-                    tile_screen_min = [(tileX*64) - self.position_offset[0], (tileY * 64) - self.position_offset[1]]
-                    tile_screen_max = [(tileX*64) + 64 - self.position_offset[0],
-                                       (tileY * 64) + 64 - self.position_offset[1]]
-                    if tile_screen_min[0] <= click_pos[0] and tile_screen_min[1] <= click_pos[1]:
-                        if tile_screen_max[0] > click_pos[0] and tile_screen_max[1] > click_pos[1]:
-                            tile_to_set = tile
-                            tile_click_x = tileX
-                            tile_click_y = tileY
-                            break
-        if tile_to_set is not None:
-            if layer == 0:
-                if tile_to_set.collidable:
-                    self.collidable_tiles.remove(tile_to_set)
-                else:
-                    self.walkable_tiles.remove(tile_to_set)
-            
-            self.tiles.remove(tile_to_set)
-
-            new_tile = Tile(tile_to_set.world_position, tile_angle, self.all_tile_data[tile_id], layer)
-            self.tiles.append(new_tile)
-
-            if layer == 0:
-                x_grid_pos = int((new_tile.world_position[0] - 32) / 64)
-                y_grid_pos = int((new_tile.world_position[1] - 32) / 64)
-                self.tile_grid[x_grid_pos][y_grid_pos] = new_tile
-                if new_tile.collidable:
-                    self.collidable_tiles.append(new_tile)
-                else:
-                    self.walkable_tiles.append(new_tile)
-            if layer == 1:
-                x_grid_pos = int((new_tile.world_position[0] - 32) / 64)
-                y_grid_pos = int((new_tile.world_position[1] - 32) / 64)
-                self.top_tile_grid[x_grid_pos][y_grid_pos] = new_tile
-        else:
-            new_tile_world_position = [(tile_click_x*64)+32, (tile_click_y*64)+32]
-            new_tile = Tile(new_tile_world_position, tile_angle, self.all_tile_data[tile_id], layer)
-            self.tiles.append(new_tile)
-            if layer == 0:
-                x_grid_pos = int((new_tile.world_position[0] - 32) / 64)
-                y_grid_pos = int((new_tile.world_position[1] - 32) / 64)
-                self.tile_grid[x_grid_pos][y_grid_pos] = new_tile
-                if new_tile.collidable:
-                    self.collidable_tiles.append(new_tile)
-                else:
-                    self.walkable_tiles.append(new_tile)
-            if layer == 1:
-                x_grid_pos = int((new_tile.world_position[0] - 32) / 64)
-                y_grid_pos = int((new_tile.world_position[1] - 32) / 64)
-                self.top_tile_grid[x_grid_pos][y_grid_pos] = new_tile
-
-        self.all_tile_sprites.empty()
-        for tileX in range(self.zero_tile_x, self.end_tile_x):
-            for tileY in range(self.zero_tile_y, self.end_tile_y):
-                tile = self.tile_grid[tileX][tileY]
-                if tile is None:
-                    print("No tile at grid: " + str(tileX) + ", " + str(tileY))
-                else:
-                    tile.update_offset_position(self.position_offset, self.screen_data)
-                    self.all_tile_sprites.add(tile)
-
-                top_tile = self.top_tile_grid[tileX][tileY]
-                if top_tile is not None:
-                    top_tile.update_offset_position(self.position_offset, self.screen_data)
-                    self.all_top_tile_sprites.add(top_tile)
+        tile_pos = self.get_tile_pos_at_screen_pos(click_pos)
+        if tile_pos is None:
+            return
+
+        # painting with the mouse held sets the same tile every frame, so leave a tile that is already right alone
+        tile = self.get_tile(tile_pos[0], tile_pos[1], layer)
+        if tile is not None and tile.tile_id == tile_id and tile.angle == tile_angle % 360:
+            return
+        new_tile = self.place_tile(tile_id, [(tile_pos[0] * 64) + 32, (tile_pos[1] * 64) + 32], tile_angle, layer)
+        if new_tile is not None:
+            self.get_region_at_tile(tile_pos[0], tile_pos[1]).is_modified = True
+            self.record_tile(tile_pos[0], tile_pos[1], new_tile)
 
     def save_tiles(self):
-        with open(self.file_name, "w", newline='') as tileFile:
-            writer = csv.writer(tileFile)
-            for tile in self.tiles:
-                writer.writerow(["tile", tile.tile_id, str(tile.world_position[0]),
-                                 str(tile.world_position[1]), str(tile.angle)])
-
-            for ai_spawn in self.ai_spawns:
-                writer.writerow(["aiSpawn", ai_spawn.type_id, str(ai_spawn.world_position[0]),
-                                 str(ai_spawn.world_position[1])])
+        if self.region_loader is not None:
+            # only the regions that have been changed are written back to a streamed level
+            for region in self.regions.values():
+                if region.is_modified:
+                    write_level_file(get_region_file_name(self.regions_directory, region.region_x, region.region_y),
+                                     region.to_level_data())
+                    region.is_modified = False
+            return
+
+        # copying the region arrays is quick, the level file is put together and written on the journal's thread
+        regions = [(region.first_tile, region.to_level_data()) for region in self.regions.values()]
+        spawns = [(ai_spawn.type_id, list(ai_spawn.world_position)) for ai_spawn in self.ai_spawns.values()]
+        if self.level_journal is None:
+            self.level_journal = LevelJournal(self.file_name)
+        self.level_journal.compact(self.level_tile_size, regions, spawns)
 
     def load_tiles(self):
-        if os.path.isfile(self.file_name):
-            self.tiles[:] = []
-            self.collidable_tiles[:] = []
-            self.walkable_tiles[:] = []
-            
-            with open(self.file_name, "r") as tileFile:
-                reader = csv.reader(tileFile)
-                for line in reader:
-                    line_type = line[0]
-                    
-                    if line_type == "tile":
-                        tile_id = line[1]
-                        tile_x_pos = int(line[2])
-                        tile_y_pos = int(line[3])
-                        tile_angle = int(line[4])
-                        tile_layer = 0
-                        if len(line) == 6:
-                            tile_layer = int(line[5])
-                            
-                        loaded_tile = Tile([tile_x_pos, tile_y_pos], tile_angle,
-                                           self.all_tile_data[tile_id], tile_layer)
-                        self.tiles.append(loaded_tile)
-
-                        self.tile_grid[int((tile_x_pos - 32) / 64)][int((tile_y_pos - 32) / 64)] = loaded_tile
-
-                        if loaded_tile.collidable:
-                            self.collidable_tiles.append(loaded_tile)
-                        else:
-                            self.walkable_tiles.append(loaded_tile)
-                            
-                    elif line_type == "aiSpawn":
-                        type_id = line[1]
-                        tile_x_pos = int(line[2])
-                        tile_y_pos = int(line[3])
-                        new_ai_spawn = AISpawn(self.guards_sprite_map[0][1], [tile_x_pos, tile_y_pos], type_id)
-                        self.ai_spawns.append(new_ai_spawn)
+        self.close()
+        self.region_tiles = REGION_TILES
+        self.forget_baked_level()
+        if os.path.isfile(os.path.join(self.regions_directory, REGION_MANIFEST_FILE)):
+            # the regions are read in as the camera gets near them
+            level_tile_size, self.region_tiles = read_region_manifest(self.regions_directory)
+            self.reset_level(level_tile_size)
+            self.region_loader = RegionLoader(self.regions_directory)
+
+        elif os.path.isfile(self.file_name):
+            level_data = read_level_file(self.file_name)
+            self.reset_level(level_data.level_tile_size)
+            self.bake_level_file_name = self.file_name
+            for layer in range(0, len(level_data.layer_tile_indices)):
+                for tile_x, tile_y, tile_id, tile_angle in level_data.get_tiles(layer):
+                    self.place_tile(tile_id, [(tile_x * 64) + 32, (tile_y * 64) + 32], tile_angle, layer)
+            for type_id, x_pos, y_pos in level_data.spawns:
+                self.add_ai_spawn(AISpawn(self.guards_sprite_map[0][1], [x_pos, y_pos], type_id), True)
+
+        elif os.path.isfile(self.csv_file_name):
+            self.reset_level(self.level_tile_size)
+            for line in asset_bundle.read_csv_rows(self.csv_file_name):
+                line_type = line[0]
+
+                if line_type == "tile":
+                    tile_id = line[1]
+                    tile_x_pos = int(line[2])
+                    tile_y_pos = int(line[3])
+                    tile_angle = int(line[4])
+                    tile_layer = 0
+                    if len(line) == 6:
+                        tile_layer = int(line[5])
+
+                    self.place_tile(tile_id, [tile_x_pos, tile_y_pos], tile_angle, tile_layer)
+
+                elif line_type == "aiSpawn":
+                    type_id = line[1]
+                    tile_x_pos = int(line[2])
+                    tile_y_pos = int(line[3])
+                    new_ai_spawn = AISpawn(self.guards_sprite_map[0][1], [tile_x_pos, tile_y_pos], type_id)
+                    self.add_ai_spawn(new_ai_spawn, True)
         else:
+            self.reset_level(self.level_tile_size)
             self.clear_level_to_default_tile()
 
+        if self.region_loader is None:
+            self.level_journal = LevelJournal(self.file_name)
+            self.replay_level_journal()
+
+    def get_baked_level(self):
+        # the data baked by bake_level.py for the level file that was loaded, or None when it hasn't been baked or the
+        # level has changed since it was loaded
+        if self.baked_level is None and self.bake_level_file_name is not None:
+            self.baked_level = load_baked_level(self.bake_level_file_name, self.bake_directory)
+            self.bake_level_file_name = None
+        return self.baked_level
+
+    def forget_baked_level(self):
+        self.bake_level_file_name = None
+        self.baked_level = None
+
+    def replay_level_journal(self):
+        # puts back the edits made since the level was last saved, if the editor was closed before it could save
+        records = self.level_journal.read_records()
+        if len(records) > 0:
+            self.forget_baked_level()  # baked from the level file without these edits
+        for record in records:
+            if record[0] == JOURNAL_TILE_RECORD:
+                record_type, layer, tile_x, tile_y, tile_id, tile_angle = record
+                if tile_id in self.all_tile_data:
+                    self.place_tile(tile_id, [(tile_x * 64) + 32, (tile_y * 64) + 32], tile_angle, layer)
+            elif record[0] == JOURNAL_SPAWN_RECORD:
+                record_type, type_id, x_pos, y_pos = record
+                self.remove_ai_spawn((int(x_pos / 64), int(y_pos / 64)))
+                self.add_ai_spawn(AISpawn(self.guards_sprite_map[0][1], [x_pos, y_pos], type_id), True)
+            else:
+                record_type, x_pos, y_pos = record
+                self.remove_ai_spawn((int(x_pos / 64), int(y_pos / 64)))
+
+    def record_tile(self, tile_x, tile_y, tile):
+        self.forget_baked_level()  # the level no longer matches its bake
+        if self.level_journal is not None:
+            self.level_journal.record_tile(tile.layer, tile_x, tile_y, tile.tile_id, tile.angle)
+
+    def place_tile(self, tile_id, world_position, tile_angle, layer):
+        # puts a tile in its grid square, replacing any tile already there. Returns None when the square is in a region
+        # of a streamed level that isn't in memory.
+        x_grid_pos = int((world_position[0] - 32) / 64)
+        y_grid_pos = int((world_position[1] - 32) / 64)
+        region = self.get_region_at_tile(x_grid_pos, y_grid_pos)
+        if region is None:
+            return None
+
+        new_tile = Tile(world_position, self.tile_variants.get_variant(tile_id, tile_angle), layer)
+        old_tile = region.set_tile(x_grid_pos, y_grid_pos, layer, new_tile)
+        if old_tile is not None and layer == 1:
+            old_tile.kill()
+        self.show_tile(x_grid_pos, y_grid_pos, new_tile)
+        return new_tile
+
+    def show_tile(self, tile_x, tile_y, tile):
+        # brings the drawing and collision of the level up to date with a tile that has just been set
+        if tile.layer == 0:
+            self.tile_chunks.update_tile(tile_x, tile_y)
+            self.collision_index.set_tile(tile_x, tile_y, tile)
+        if tile.layer == 1:
+            self.all_top_tile_sprites.add(tile)
+
+    def rotate_tile(self, tile, angle_change):
+        # turns a tile in place by swapping it to the variant at its new angle
+        tile.variant = self.tile_variants.get_variant(tile.tile_id, tile.angle + angle_change)
+        x_grid_pos = int((tile.world_position[0] - 32) / 64)
+        y_grid_pos = int((tile.world_position[1] - 32) / 64)
+        region = self.get_region_at_tile(x_grid_pos, y_grid_pos)
+        region.set_tile(x_grid_pos, y_grid_pos, tile.layer, tile)
+        region.is_modified = True
+        self.show_tile(x_grid_pos, y_grid_pos, tile)
+        self.record_tile(x_grid_pos, y_grid_pos, tile)
+
+    def add_ai_spawn(self, ai_spawn, spawn_guard):
+        # there can be one spawn in each grid square. Returns False when the square already has one, or when it is in
+        # a region of a streamed level that isn't in memory.
+        spawn_cell = get_spawn_cell(ai_spawn)
+        region = self.get_region_at_tile(spawn_cell[0], spawn_cell[1])
+        if region is None or spawn_cell in self.ai_spawns:
+            return False
+        region.ai_spawns[spawn_cell] = ai_spawn
+        self.ai_spawns[spawn_cell] = ai_spawn
+        if spawn_guard and self.guards_active and spawn_cell not in self.defeated_spawn_cells:
+            self.spawn_guard(ai_spawn)
+        return True
+
     def add_ai_spawn_at_pos(self, click_pos, ai_spawn):
-        tile_to_set = None
-        for tile in self.tiles:
-            if tile.rect[0] <= click_pos[0] and tile.rect[1] <= click_pos[1]:
-                if tile.rect[0] + tile.rect[2] > click_pos[0] and\
-                        tile.rect[1] + tile.rect[3] > click_pos[1]:
-                    tile_to_set = tile
-        already_placed = False
-
-        if tile_to_set is not None:
-            for spawn in self.ai_spawns:
-                if spawn.world_position[0] == tile_to_set.world_position[0] and\
-                        spawn.world_position[1] == tile_to_set.world_position[1]:
-                    already_placed = True
-
-            if not already_placed:
-                new_ai_spawn = AISpawn(ai_spawn.tile_image, tile_to_set.world_position, ai_spawn.type_id)
-                new_ai_spawn.update_offset_position(self.position_offset)
-                self.ai_spawns.append(new_ai_spawn)
+        # spawns go in the middle of a grid square with a tile in it
+        tile_pos = self.get_tile_pos_at_screen_pos(click_pos)
+        if tile_pos is None or (self.get_tile(tile_pos[0], tile_pos[1], 0) is None and
+                                self.get_tile(tile_pos[0], tile_pos[1], 1) is None):
+            return
+        new_ai_spawn = AISpawn(ai_spawn.tile_image, [(tile_pos[0] * 64) + 32, (tile_pos[1] * 64) + 32],
+                               ai_spawn.type_id)
+        if self.add_ai_spawn(new_ai_spawn, False):
+            self.get_region_at_tile(tile_pos[0], tile_pos[1]).is_modified = True
+            if self.level_journal is not None:
+                self.level_journal.record_spawn(new_ai_spawn.type_id, new_ai_spawn.world_position)
 
     def remove_ai_spawn_at_pos(self, click_pos):
-        tile_to_set = None
-        for tile in self.tiles:
-            if tile.rect[0] <= click_pos[0] and tile.rect[1] <= click_pos[1]:
-                if tile.rect[0] + tile.rect[2] > click_pos[0] and\
-                        tile.rect[1] + tile.rect[3] > click_pos[1]:
-                    tile_to_set = tile
-        spawn_to_remove = None
-        for spawn in self.ai_spawns:
-            if spawn.world_position[0] == tile_to_set.world_position[0] and\
-                    spawn.world_position[1] == tile_to_set.world_position[1]:
-                spawn_to_remove = spawn
-
-        if spawn_to_remove is not None:
-            self.ai_spawns.remove(spawn_to_remove)
+        tile_pos = self.get_tile_pos_at_screen_pos(click_pos)
+        if tile_pos is None:
+            return
+        spawn = self.remove_ai_spawn(tile_pos)
+        if spawn is not None:
+            self.get_region_at_tile(tile_pos[0], tile_pos[1]).is_modified = True
+            if self.level_journal is not None:
+                self.level_journal.record_spawn_removed(spawn.world_position)
+
+    def remove_ai_spawn(self, spawn_cell):
+        # returns the spawn taken out of the grid square, if there was one
+        spawn = self.ai_spawns.pop(spawn_cell, None)
+        if spawn is not None:
+            del self.regions[(int(spawn_cell[0] / self.region_tiles),
+                              int(spawn_cell[1] / self.region_tiles))].ai_spawns[spawn_cell]
+            self.despawn_guard(spawn)
+        return spawn
+
+    def draw_ai_spawns(self, screen):
+        # looks up the spawns in the grid squares on screen, rather than going through them all
+        for tile_x in range(self.zero_tile_x, self.end_tile_x):
+            for tile_y in range(self.zero_tile_y, self.end_tile_y):
+                spawn = self.ai_spawns.get((tile_x, tile_y))
+                if spawn is not None:
+                    screen.blit(spawn.image, spawn.rect.move(-self.position_offset[0], -self.position_offset[1]))
+
+
+def get_spawn_cell(ai_spawn):
+    return int(ai_spawn.world_position[0] / 64), int(ai_spawn.world_position[1] / 64)
+
+
+def load_all_tile_data(tile_map):
+    # the TileData of every tile file, by tile id, and the first one found, which is the tile a new level is filled with
+    all_tile_data = {}
+    tile_data_files = [file for file in os.listdir("data/tiles/")
+                       if os.path.isfile(os.path.join("data/tiles/", file))]
+
+    default_tile = None
+    for file_name in tile_data_files:
+        new_tile_data = TileData(os.path.join("data/tiles/", file_name), tile_map)
+        new_tile_data.load_tile_data()
+        all_tile_data[new_tile_data.tile_id] = new_tile_data
+        if default_tile is None:
+            default_tile = new_tile_data
+    return all_tile_data, default_tile
@@ -1,6 +1,8 @@
 import pygame
 from pygame.locals import *
 
+from game.text_cache import text_cache
+
 
 class UTTextButton:
     def __init__(self, rect, button_text, fonts, font_size):
@@ -16,7 +18,7 @@ class UTTextButton:
         self.button_colour = pygame.Color("#444444")
         self.text_colour = pygame.Color("#FFFFFF")
 
-        self.button_text_render = self.fonts[self.font_size].render(self.button_text, True, self.text_colour)
+        self.button_text_render = text_cache.render(self.fonts[self.font_size], self.button_text, self.text_colour)
 
     def handle_input_event(self, event):
         if self.is_enabled and self.is_inside(pygame.mouse.get_pos()):
@@ -41,7 +43,7 @@ class UTTextButton:
 
     def set_text(self, text):
         self.button_text = text
-        self.button_text_render = self.fonts[self.font_size].render(self.button_text, True, self.text_colour)
+        self.button_text_render = text_cache.render(self.fonts[self.font_size], self.button_text, self.text_colour)
     
     def update(self):
         if self.is_enabled and self.is_inside(pygame.mouse.get_pos()):
@@ -0,0 +1,177 @@
+import pygame
+
+from game.tiled_level import TiledLevel
+from game.pick_up import PickUpSpawner
+from game.player import Player
+from game.monster_ai_worker import MonsterAIWorker
+from game.spatial_hash import SpatialHash
+from game.render_interpolation import get_interpolation_shift, draw_sprites_interpolated
+
+
+class World:
+    def __init__(self, level_tile_size, screen_data, explosions_sprite_sheet):
+        self.screen_data = screen_data
+        self.explosions_sprite_sheet = explosions_sprite_sheet
+
+        self.player_sprites = pygame.sprite.OrderedUpdates()
+        self.all_top_tile_sprites = pygame.sprite.Group()
+        self.all_monster_sprites = pygame.sprite.OrderedUpdates()
+        self.all_pick_up_sprites = pygame.sprite.Group()
+        self.all_explosion_sprites = pygame.sprite.Group()
+        self.all_projectile_sprites = pygame.sprite.Group()
+
+        # each kind of entity keeps its own components, so these are lists of objects. Dead entities are filtered out
+        # after their update, which keeps the order they are updated in the same from step to step.
+        self.players = []
+        self.monsters = []
+        self.pick_ups = []
+        self.projectiles = []
+        self.explosions = []
+        self.new_explosions = []
+
+        self.player = None
+        self.time_multiplier = 1.0
+
+        self.tiled_level = TiledLevel(level_tile_size, self.all_top_tile_sprites, self.all_monster_sprites,
+                                      self.monsters, self.screen_data, self.explosions_sprite_sheet)
+        self.pick_up_spawner = PickUpSpawner(self.pick_ups, self.all_pick_up_sprites)
+        # where the players and monsters are on screen this step, for projectiles to look up what they might hit
+        self.player_hash = SpatialHash()
+        self.monster_hash = SpatialHash()
+        self.monster_ai_worker = None
+
+    def start_monster_ai_worker(self):
+        # the worker takes a copy of the level's collision shapes, so start it once the level is loaded. It hears about
+        # the regions of a streamed level as they come in.
+        self.monster_ai_worker = MonsterAIWorker(self.tiled_level)
+        self.tiled_level.region_listeners.append(self.monster_ai_worker)
+
+    def close(self):
+        if self.monster_ai_worker is not None:
+            self.tiled_level.region_listeners.remove(self.monster_ai_worker)
+            self.monster_ai_worker.close()
+            self.monster_ai_worker = None
+        self.tiled_level.close()
+
+    def spawn_player(self, control_scheme, hud_buttons):
+        self.player = Player(self.tiled_level.find_player_start(), self.tiled_level, control_scheme,
+                             self.explosions_sprite_sheet, hud_buttons)
+        self.players.append(self.player)
+        return self.player
+
+    def clear(self):
+        if self.monster_ai_worker is not None:
+            self.monster_ai_worker.release_all_slots()
+        self.players[:] = []
+        self.monsters[:] = []
+        self.pick_ups[:] = []
+        self.projectiles[:] = []
+        self.explosions[:] = []
+        self.new_explosions[:] = []
+        self.player_sprites.empty()
+        self.all_monster_sprites.empty()
+        self.all_pick_up_sprites.empty()
+        self.all_projectile_sprites.empty()
+        self.all_explosion_sprites.empty()
+
+    def update(self, time_delta, mouse_rel_move, frame_timer):
+        # moves the game simulation forward by one step, running each system over its entities in turn
+        self.tiled_level.update_offset_position(self.player.position)
+        frame_timer.lap("level_offset")
+
+        self.update_pick_ups()
+        frame_timer.lap("pick_ups")
+
+        self.update_players(time_delta, mouse_rel_move)
+        frame_timer.lap("players")
+
+        self.update_monsters(time_delta)
+        frame_timer.lap("monsters")
+
+        self.update_projectiles(time_delta)
+        frame_timer.lap("projectiles")
+
+        self.update_explosions(time_delta)
+        frame_timer.lap("explosions")
+
+    def update_pick_ups(self):
+        for pick_up in self.pick_ups:
+            pick_up.update_movement_and_collision(self.player, self.tiled_level)
+        # pick ups take themselves out of their sprite group
+        self.pick_ups[:] = [pick_up for pick_up in self.pick_ups if not pick_up.should_die]
+
+    def update_players(self, time_delta, mouse_rel_move):
+        for player in self.players:
+            player.update_movement_and_collision(time_delta, self.projectiles, self.tiled_level, self.monsters,
+                                                 self.new_explosions, mouse_rel_move)
+            self.player_sprites = player.update_sprite(self.player_sprites, time_delta)
+            self.time_multiplier = player.calculate_time_multipliers()
+            if player.should_die:
+                self.player_sprites.remove(player, player.flash_sprite)
+        self.players[:] = [player for player in self.players if not player.should_die]
+
+    def update_monsters(self, time_delta):
+        if self.monster_ai_worker is not None:
+            self.monster_ai_worker.update(self.tiled_level, self.monsters, self.player)
+        for monster in self.monsters:
+            monster.update_movement_and_collision(time_delta, self.time_multiplier, self.player,
+                                                  self.new_explosions, self.tiled_level,
+                                                  self.projectiles, self.pick_up_spawner)
+            monster.update_sprite(time_delta, self.time_multiplier)
+        # monsters take themselves out of their sprite group
+        self.monsters[:] = [monster for monster in self.monsters if not monster.should_die]
+        self.new_explosions[:] = []
+
+    def update_projectiles(self, time_delta):
+        # projectiles fired during this step were appended to the end of the list, so they get their first update too.
+        # Nothing moves the players or monsters while the projectiles update, so their grids are filled once here.
+        if len(self.projectiles) > 0:
+            self.player_hash.rebuild(self.players)
+            self.monster_hash.rebuild(self.monsters)
+        for projectile in self.projectiles:
+            projectile.update_movement_and_collision(self.tiled_level, self.player_hash, self.monster_hash, time_delta,
+                                                     self.time_multiplier, self.new_explosions, self.explosions)
+            self.all_projectile_sprites = projectile.update_sprite(self.all_projectile_sprites)
+            if projectile.should_die:
+                self.all_projectile_sprites.remove(projectile.sprite)
+        self.projectiles[:] = [projectile for projectile in self.projectiles if not projectile.should_die]
+
+    def update_explosions(self, time_delta):
+        for explosion in self.explosions:
+            self.all_explosion_sprites = explosion.update_sprite(self.all_explosion_sprites, time_delta,
+                                                                 self.time_multiplier, self.tiled_level)
+            if explosion.should_die:
+                self.all_explosion_sprites.remove(explosion)
+        self.explosions[:] = [explosion for explosion in self.explosions if not explosion.should_die]
+
+    def draw(self, screen, interpolation_alpha, frame_timer):
+        # draw everything part way between the last two simulation steps
+        offset_shift = get_interpolation_shift(self.tiled_level.previous_position_offset,
+                                               self.tiled_level.position_offset, interpolation_alpha)
+        camera_shift = [-offset_shift[0], -offset_shift[1]]
+        sprite_shifts = {}
+        for player in self.players:
+            player_shift = get_interpolation_shift(player.previous_position, player.position, interpolation_alpha)
+            sprite_shifts[player] = player_shift
+            sprite_shifts[player.flash_sprite] = player_shift
+        for monster in self.monsters:
+            monster_shift = get_interpolation_shift(monster.previous_position, monster.position, interpolation_alpha)
+            sprite_shifts[monster] = monster_shift
+            sprite_shifts[monster.flash_sprite] = monster_shift
+        for projectile in self.projectiles:
+            sprite_shifts[projectile.sprite] = get_interpolation_shift(projectile.previous_position,
+                                                                       projectile.world_position,
+                                                                       interpolation_alpha)
+
+        self.tiled_level.tile_chunks.draw(screen, self.tiled_level.position_offset, camera_shift)
+        frame_timer.lap("draw_tiles")
+        draw_sprites_interpolated(screen, self.all_pick_up_sprites, camera_shift, sprite_shifts)
+        frame_timer.lap("draw_pick_ups")
+        draw_sprites_interpolated(screen, self.all_monster_sprites, camera_shift, sprite_shifts)
+        frame_timer.lap("draw_monsters")
+        draw_sprites_interpolated(screen, self.player_sprites, camera_shift, sprite_shifts)
+        frame_timer.lap("draw_players")
+        draw_sprites_interpolated(screen, self.all_explosion_sprites, camera_shift, sprite_shifts)
+        frame_timer.lap("draw_explosions")
+        draw_sprites_interpolated(screen, self.all_projectile_sprites, camera_shift, sprite_shifts)
+        frame_timer.lap("draw_projectiles")
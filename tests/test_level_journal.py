@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from game.level_file import LevelData, read_level_file
+from game.level_journal import LevelJournal, JOURNAL_TILE_RECORD, JOURNAL_SPAWN_RECORD
+
+
+class TestLevelJournalRecovery(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.level_file_name = os.path.join(self.directory, "level.trl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_edits(self):
+        journal = LevelJournal(self.level_file_name)
+        journal.record_tile(0, 3, 4, "tile_pillar_1", 90)
+        journal.record_spawn("rifle", [160, 224])
+        journal.close()
+
+    def append_to_journal(self, garbage):
+        with open(self.level_file_name + ".journal", "ab") as journal_file:
+            journal_file.write(garbage)
+
+    def assert_edits_recovered(self, records):
+        self.assertEqual(records, [(JOURNAL_TILE_RECORD, 0, 3, 4, "tile_pillar_1", 90),
+                                   (JOURNAL_SPAWN_RECORD, "rifle", 160, 224)])
+
+    def test_zero_filled_tail_is_cut_off(self):
+        self.write_edits()
+        journal_length = os.path.getsize(self.level_file_name + ".journal")
+        self.append_to_journal(bytes(64))
+
+        self.assert_edits_recovered(LevelJournal(self.level_file_name).read_records())
+        self.assertEqual(os.path.getsize(self.level_file_name + ".journal"), journal_length)
+
+    def test_garbage_tail_is_cut_off(self):
+        self.write_edits()
+        self.append_to_journal(b"\xff\x13\x37garbage")
+
+        self.assert_edits_recovered(LevelJournal(self.level_file_name).read_records())
+
+    def test_records_after_garbage_tail_are_read(self):
+        self.write_edits()
+        self.append_to_journal(b"\xfe\x00\x00")
+        journal = LevelJournal(self.level_file_name)
+        journal.read_records()
+        journal.record_tile(1, 5, 6, "tile_floor_1", 0)
+        journal.close()
+
+        records = LevelJournal(self.level_file_name).read_records()
+        self.assertEqual(records[-1], (JOURNAL_TILE_RECORD, 1, 5, 6, "tile_floor_1", 0))
+
+
+class TestLevelJournalCompaction(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.level_file_name = os.path.join(self.directory, "level.trl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def compact(self, journal):
+        level_data = LevelData([4, 4])
+        level_data.set_tile(0, 1, 2, "tile_floor_1", 0)
+        return journal.compact([4, 4], [([0, 0], level_data)], [("rifle", [96, 160])])
+
+    def test_failed_write_keeps_edits_and_is_reported(self):
+        # a directory where the new level file is written stands in for a full disk
+        os.mkdir(self.level_file_name + ".tmp")
+        journal = LevelJournal(self.level_file_name)
+        journal.record_tile(0, 1, 2, "tile_floor_1", 0)
+        output = StringIO()
+        with redirect_stdout(output):
+            self.assertTrue(self.compact(journal))
+            journal.close()
+        self.assertIn("Couldn't save the level", output.getvalue())
+        self.assertFalse(os.path.isfile(self.level_file_name))
+        self.assertEqual(len(LevelJournal(self.level_file_name).read_records()), 1)
+
+        os.rmdir(self.level_file_name + ".tmp")
+        journal = LevelJournal(self.level_file_name)
+        self.assertTrue(self.compact(journal))
+        self.assertTrue(journal.finish_compaction())
+        self.assertEqual(read_level_file(self.level_file_name).spawns, [["rifle", 96, 160]])
+        self.assertEqual(LevelJournal(self.level_file_name).read_records(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
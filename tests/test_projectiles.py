@@ -0,0 +1,62 @@
+import os
+import unittest
+import pygame
+
+REPO_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestProjectileTileCollision(unittest.TestCase):
+    def setUp(self):
+        # the game loads its images and tile files relative to the repository
+        self.previous_directory = os.getcwd()
+        os.chdir(REPO_DIRECTORY)
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.init()
+        pygame.display.set_mode((1024, 768))
+
+        from time_runs import ScreenData
+        from game.world import World
+        from game.asset_cache import asset_cache
+        from game.spatial_hash import SpatialHash
+        screen_data = ScreenData([1024, 112], [1024, 184], [1024, 768])
+        self.explosions_sprite_sheet = asset_cache.get_image("images/explosions.png")
+        self.world = World([8, 8], screen_data, self.explosions_sprite_sheet)
+        self.tiled_level = self.world.tiled_level
+        self.tiled_level.reset_level([8, 8])
+        for tile_x in range(0, 8):
+            for tile_y in range(0, 8):
+                self.tiled_level.place_tile("tile_floor_1", [(tile_x * 64) + 32, (tile_y * 64) + 32], 0, 0)
+        # a wall corner with a collision rect at world (0, 0), well away from the projectiles
+        self.tiled_level.place_tile("tile_tl_corner_1", [32, 32], 0, 0)
+        self.empty_hash = SpatialHash()
+
+    def tearDown(self):
+        self.world.close()
+        pygame.quit()
+        os.chdir(self.previous_directory)
+
+    def update_projectile(self, projectile):
+        projectile.update_movement_and_collision(self.tiled_level, self.empty_hash, self.empty_hash, 1.0 / 60.0, 1.0,
+                                                 [], [])
+
+    def test_bullet_over_open_floor_survives_first_step(self):
+        from game.bullet import Bullet
+        bullet = Bullet([288.0, 288.0], [1.0, 0.0], 10, self.explosions_sprite_sheet)
+        self.update_projectile(bullet)
+        self.assertFalse(bullet.should_die)
+
+    def test_missile_over_open_floor_survives_first_step(self):
+        from game.missile import Missile
+        missile = Missile([288.0, 288.0], [1.0, 0.0], 10, self.explosions_sprite_sheet)
+        self.update_projectile(missile)
+        self.assertFalse(missile.should_die)
+
+    def test_bullet_fired_into_wall_dies(self):
+        from game.bullet import Bullet
+        bullet = Bullet([20.0, 20.0], [1.0, 0.0], 10, self.explosions_sprite_sheet)
+        self.update_projectile(bullet)
+        self.assertTrue(bullet.should_die)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,23 @@
 import os
+import random
+import argparse
 import pygame
 from pygame.locals import *
 
 from game.map_editor import MapEditor
 from game.main_menu import MainMenu
-from game.player import Player, Scheme
+from game.player import Scheme
 from game.player_health_bar import HealthBar
 from game.player_guns_ui import GunsUI
-from game.tiled_level import TiledLevel
-from game.pick_up import PickUpSpawner
 from game.hud_button import HUDButton
+from game.frame_timer import FrameTimer
+from game.frame_profiler_overlay import FrameProfilerOverlay
+from game.input_sources import LiveInput, ScriptedInput, InputRecorder, ReplayInput
+from game.world import World
+from game.asset_cache import asset_cache
+from game.asset_bundle import asset_bundle
+from game.explosion import explosion_frame_cache
+from game.text_cache import text_cache
 
 
 class ScreenData:
@@ -23,8 +31,30 @@ class ScreenData:
         self.play_area = [self.screen_size[0], self.screen_size[1] - self.editor_hud_dimensions[1]]
 
 
-def main():
-    
+def main(headless=False, frame_limit=None, fixed_time_delta=None, seed=None, input_script_path=None,
+         record_path=None, replay_path=None, timings_path=None, ai_worker=False):
+
+    if headless:
+        # no window, so run the game loop on SDL's dummy video driver
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        if fixed_time_delta is None:
+            fixed_time_delta = 1.0 / 60.0
+
+    if replay_path is not None:
+        input_source = ReplayInput(replay_path)
+        seed = input_source.seed
+    elif input_script_path is not None:
+        input_source = ScriptedInput(input_script_path)
+    else:
+        input_source = LiveInput()
+    if record_path is not None:
+        # a replay needs the same random numbers as the recorded game, so recordings always have a seed
+        if seed is None:
+            seed = random.randrange(0, 2 ** 31)
+        input_source = InputRecorder(input_source, record_path, seed)
+    if seed is not None:
+        random.seed(seed)
+
     pygame.init()
     os.environ['SDL_VIDEO_CENTERED'] = '1'
     pygame.key.set_repeat()
@@ -38,40 +68,33 @@ def main():
     background = background.convert(screen)
     background.fill((95, 140, 95))
 
-    player_sprites = pygame.sprite.OrderedUpdates()
-    all_tile_sprites = pygame.sprite.Group()
-    all_top_tile_sprites = pygame.sprite.Group()
-    all_monster_sprites = pygame.sprite.OrderedUpdates()
-    all_pick_up_sprites = pygame.sprite.Group()
-    all_explosion_sprites = pygame.sprite.Group()
-    all_projectile_sprites = pygame.sprite.Group()
     hud_sprites = pygame.sprite.Group()
 
     fonts = []
-    small_font = pygame.font.Font(None, 16)
+    small_font = text_cache.get_font(None, 16)
 
-    font = pygame.font.Font(None, 32)
-    large_font = pygame.font.Font("data/HennyPenny-Regular.ttf", 90)
+    font = text_cache.get_font(None, 32)
+    large_font = text_cache.get_font("data/HennyPenny-Regular.ttf", 90)
 
     fonts.append(small_font)
     fonts.append(font)
     fonts.append(large_font)
+    hud_text_colour = pygame.Color("#FFFFFF")
     
-    explosions_sprite_sheet = pygame.image.load("images/explosions.png").convert_alpha()
-
-    players = []
-    monsters = []
-    pick_ups = []
-    projectiles = []
-    explosions = []
-    new_explosions = []
+    asset_bundle.load()  # rebuilds the bundle first if any of the asset files have changed
+    asset_cache.load_atlas()
+    explosions_sprite_sheet = asset_cache.get_image("images/explosions.png")
+    explosion_frame_cache.prewarm(explosions_sprite_sheet, 96)  # the size of a missile explosion
+
     hud_buttons = []
 
-    tiled_level = TiledLevel([32, 64], all_tile_sprites, all_top_tile_sprites, all_monster_sprites,
-                             monsters, screen_data, explosions_sprite_sheet)
+    world = World([32, 64], screen_data, explosions_sprite_sheet)
+    tiled_level = world.tiled_level
 
     tiled_level.load_tiles()
     tiled_level.reset_guards()
+    if ai_worker:
+        world.start_monster_ai_worker()
     main_menu = MainMenu(fonts)
     
     hud_rect = pygame.Rect(0, screen_data.screen_size[1] - screen_data.hud_dimensions[1],
@@ -98,25 +121,42 @@ def main():
     hud_buttons.append(shotgun_button)
     hud_buttons.append(launcher_button)
 
-    pick_up_spawner = PickUpSpawner(pick_ups, all_pick_up_sprites)
-
     player = None
-    
+
+    frame_timer = FrameTimer(keep_frame_records=timings_path is not None)
+    frame_profiler_overlay = FrameProfilerOverlay(screen_data.screen_size)
+
     clock = pygame.time.Clock()
 
-    time_multiplier = 1.0
+    # the game simulation always moves forward in steps of this size, however long the rendered frames take
+    simulation_step = 1.0 / 60.0
+    max_simulation_steps_per_frame = 5
+    simulation_time_acc = 0.0
+    max_frame_rate = 144
+
     running = True
     
-    is_main_menu = True
+    start_in_game = headless or replay_path is not None
+    is_main_menu = not start_in_game
     is_editor = False
     
     is_game_over = False
     restart_game = False
     win_message = ""
 
+    if start_in_game:
+        # skip the menu and go straight into the game
+        player = world.spawn_player(Scheme(), hud_buttons)
+
     while running:
-        frame_time = clock.tick(60)
-        time_delta = frame_time/1000.0
+        is_game_frame = False
+        if fixed_time_delta is not None:
+            if not headless:
+                clock.tick(max_frame_rate)
+            time_delta = fixed_time_delta
+        else:
+            frame_time = clock.tick(max_frame_rate)
+            time_delta = frame_time/1000.0
 
         if is_main_menu:
             is_main_menu_and_index = main_menu.run(screen, fonts, screen_data)
@@ -131,37 +171,29 @@ def main():
             if not is_main_menu and not is_editor:
                 # spawn player
                 default_scheme = Scheme()
-                player = Player(tiled_level.find_player_start(), tiled_level, default_scheme,
-                                explosions_sprite_sheet, hud_buttons)
-                players.append(player)
+                player = world.spawn_player(default_scheme, hud_buttons)
                 pygame.mouse.set_visible(False)
                 pygame.event.set_grab(True)
                          
         elif is_editor:
             screen_data.set_editor_active()
-            running = editor.run(screen, background, all_tile_sprites, editor_hud_rect, time_delta)
+            running = editor.run(screen, background, editor_hud_rect, time_delta)
 
         else:
+            is_game_frame = True
+            frame_timer.begin_frame()
+            time_delta = input_source.get_time_delta(time_delta)
             if restart_game:
                 restart_game = False
 
                 # clear all stuff
-                players[:] = []
-                monsters[:] = []
-                pick_ups[:] = []
-                projectiles[:] = []
-                explosions[:] = []
-                new_explosions[:] = []
-                all_monster_sprites.empty()
-                all_pick_up_sprites.empty()
+                world.clear()
 
                 is_game_over = False
                 
                 tiled_level.reset_guards()
                 default_scheme = Scheme()
-                player = Player(tiled_level.find_player_start(), tiled_level, default_scheme,
-                                explosions_sprite_sheet, hud_buttons)
-                players.append(player)
+                player = world.spawn_player(default_scheme, hud_buttons)
                   
             elif is_game_over:
                 pass
@@ -171,27 +203,25 @@ def main():
             if player is not None and player.health <= 0:
                 is_game_over = True
                 win_message = "You have been defeated!"
-            if len(monsters) == 0 and player.health > 0:
+            if len(world.monsters) == 0 and player.health > 0:
                 is_game_over = True
                 win_message = "You are victorious!"
 
-            all_projectile_sprites.empty()
-            all_explosion_sprites.empty()
-            player_sprites.empty()
-                   
             # handle UI and inout events
-            for event in pygame.event.get():
+            for event in input_source.get_events():
                 if event.type == QUIT:
                     running = False
 
                 if event.type == KEYDOWN:
                     if event.key == K_ESCAPE:
                         running = False
+                    if event.key == K_F3:
+                        frame_profiler_overlay.toggle()
                     if is_game_over:
                         if event.key == K_y:
                             restart_game = True
 
-                for player in players:
+                for player in world.players:
                     player.process_event(event)
 
             if player is not None:
@@ -199,46 +229,25 @@ def main():
                 if player.active_weapon is not None:
                     guns_ui.update(player.active_weapon.fire_rate_acc,
                                    player.active_weapon.fire_rate, player.active_weapon.ammo_count)
+            frame_timer.lap("events")
+
+            # run as many fixed simulation steps as fit in the time that has passed, dropping any time beyond the
+            # step limit so one slow frame can't snowball into ever more simulation work
+            simulation_time_acc = min(simulation_time_acc + time_delta,
+                                      simulation_step * max_simulation_steps_per_frame)
+            mouse_rel_move = input_source.get_mouse_rel()
+            while simulation_time_acc >= simulation_step:
+                simulation_time_acc -= simulation_step
+
+                world.update(simulation_step, mouse_rel_move, frame_timer)
+                mouse_rel_move = (0, 0)  # the mouse movement for this frame has been used up by the first step
+
+            interpolation_alpha = simulation_time_acc / simulation_step
 
-            tiled_level.update_offset_position(player.position, all_tile_sprites)
-
-            for pick_up in pick_ups:
-                pick_up.update_movement_and_collision(player, tiled_level)
-            pick_ups[:] = [pick_up for pick_up in pick_ups if not pick_up.should_die]
-
-            for player in players:
-                player.update_movement_and_collision(time_delta, projectiles, tiled_level, monsters, new_explosions)
-                player_sprites = player.update_sprite(player_sprites, time_delta)
-                time_multiplier = player.calculate_time_multipliers()
-            players[:] = [player for player in players if not player.should_die]
-
-            for monster in monsters:
-                monster.update_movement_and_collision(time_delta, time_multiplier, player,
-                                                      new_explosions, tiled_level,
-                                                      projectiles, pick_up_spawner)
-                monster.update_sprite(time_delta, time_multiplier)
-            monsters[:] = [monster for monster in monsters if not monster.should_die]
-            new_explosions[:] = []
-
-            for projectile in projectiles:
-                projectile.update_movement_and_collision(tiled_level, tiled_level.collidable_tiles, players, monsters,
-                                                         time_delta, time_multiplier, new_explosions, explosions)
-                all_projectile_sprites = projectile.update_sprite(all_projectile_sprites)
-            projectiles[:] = [projectile for projectile in projectiles if not projectile.should_die]
-
-            for explosion in explosions:
-                all_explosion_sprites = explosion.update_sprite(all_explosion_sprites, time_delta,
-                                                                time_multiplier, tiled_level)
-            explosions[:] = [explosion for explosion in explosions if not explosion.should_die]
-            
             screen.blit(background, (0, 0))  # draw the background
+            frame_timer.lap("draw_background")
 
-            all_tile_sprites.draw(screen)
-            all_pick_up_sprites.draw(screen)
-            all_monster_sprites.draw(screen)
-            player_sprites.draw(screen)
-            all_explosion_sprites.draw(screen)
-            all_projectile_sprites.draw(screen)
+            world.draw(screen, interpolation_alpha, frame_timer)
 
             # ------------------------------------
             # Uncomment For Collision shape debugging
@@ -264,44 +273,80 @@ def main():
                         button.update_text_values(player.launcher_weapon.ammo_count)
                     button.draw_text(screen)
 
-            for player in players:
+            for player in world.players:
                 if player.time_crystal_active:
                     crystal_countdown = player.time_crystal_time - player.time_crystal_acc
                     time_stop_string = "Time Crystal Active: " + "{:.2f}".format(crystal_countdown)
-                    time_stop_text_render = font.render(time_stop_string, True, pygame.Color("#FFFFFF"))
+                    time_stop_text_render = text_cache.render(font, time_stop_string, hud_text_colour)
                     screen.blit(time_stop_text_render, time_stop_text_render.get_rect(x=32, centery=32))
 
-            time_string = "Speed of time: " + str(int(time_multiplier/1.0 * 100.0)) + "%"
-            time_text_render = small_font.render(time_string, True, pygame.Color("#FFFFFF"))
+            time_string = "Speed of time: " + str(int(world.time_multiplier/1.0 * 100.0)) + "%"
+            time_text_render = text_cache.render(small_font, time_string, hud_text_colour)
             time_text_x_pos = screen_data.hud_dimensions[0] * 0.85
             time_text_y_pos = screen_data.screen_size[1] - (screen_data.hud_dimensions[1] * 0.15)
             screen.blit(time_text_render,
                         time_text_render.get_rect(centerx=time_text_x_pos,
                                                   centery=time_text_y_pos))
             
-            if time_delta > 0.0:
-                fps_string = "FPS: " + "{:.2f}".format(1.0/time_delta)
-                fps_text_render = font.render(fps_string, True, pygame.Color("#FFFFFF"))
-                fps_text_x_pos = screen_data.hud_dimensions[0] * 0.9
-                fps_text_y_pos = screen_data.screen_size[1] - (screen_data.screen_size[1] * 0.95)
-                screen.blit(fps_text_render,
-                            fps_text_render.get_rect(centerx=fps_text_x_pos,
-                                                     centery=fps_text_y_pos))
-            
             if is_game_over:
-                win_message_text_render = large_font.render(win_message, True, pygame.Color("#FFFFFF"))
+                win_message_text_render = text_cache.render(large_font, win_message, hud_text_colour)
                 win_message_text_render_rect = win_message_text_render.get_rect(centerx=x_screen_size/2,
                                                                                 centery=(y_screen_size/2)-128)
-                play_again_text_render = font.render("Play Again? Press 'Y' to restart", True, pygame.Color("#FFFFFF"))
+                play_again_text_render = text_cache.render(font, "Play Again? Press 'Y' to restart",
+                                                           hud_text_colour)
                 play_again_text_render_rect = play_again_text_render.get_rect(centerx=x_screen_size/2,
                                                                               centery=(y_screen_size/2)-64)
                 screen.blit(win_message_text_render, win_message_text_render_rect)
                 screen.blit(play_again_text_render, play_again_text_render_rect)
+            frame_timer.lap("hud")
+
+            frame_profiler_overlay.draw(screen, frame_timer, time_delta, font, small_font)
+            frame_timer.lap("profiler")
 
         pygame.display.flip()  # flip all our drawn stuff onto the screen
 
+        if is_game_frame:
+            frame_timer.lap("flip")
+            frame_timer.end_frame()
+            input_source.end_frame()
+            if frame_limit is not None and frame_timer.frame_count >= frame_limit:
+                running = False
+            if input_source.is_finished():
+                running = False
+
     pygame.quit()  # exited game loop so quit pygame
 
+    world.close()
+    input_source.close()
+    if timings_path is not None:
+        frame_timer.save_frame_records(timings_path)
+    if headless or frame_limit is not None or replay_path is not None:
+        frame_timer.print_report()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Time Runs")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the game loop without a window, starting straight in the game")
+    parser.add_argument("--frames", type=int, default=None,
+                        help="quit after this many game frames and print the per-phase frame timings")
+    parser.add_argument("--time-delta", type=float, default=None,
+                        help="use this fixed time step in seconds instead of the measured frame time")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random number generator")
+    parser.add_argument("--input-script", default=None, help="csv script of input events to play instead of "
+                                                             "reading the keyboard and mouse")
+    parser.add_argument("--record", default=None,
+                        help="record the seed, frame times and input of the game to this file")
+    parser.add_argument("--replay", default=None,
+                        help="replay a recording made with --record, starting straight in the game")
+    parser.add_argument("--timings", default=None,
+                        help="write the time of each phase of every game frame to this csv file")
+    parser.add_argument("--ai-worker", action="store_true",
+                        help="make the guards' AI decisions on a second process")
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
-    main()
+    arguments = parse_arguments()
+    main(arguments.headless, arguments.frames, arguments.time_delta, arguments.seed, arguments.input_script,
+         arguments.record, arguments.replay, arguments.timings, arguments.ai_worker)